@@ -1,38 +1,57 @@
 import logging
 import json
-from datetime import datetime
+import time
+from datetime import datetime, timedelta
 import requests
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, and_, or_, update
 from sqlalchemy.orm import sessionmaker
 import sendgrid
 from sendgrid.helpers.mail import Mail, Content, Email
 
 from app.config.settings import (
     DATABASE_URL, SLACK_WEBHOOK_URL, 
-    SENDGRID_API_KEY, NOTIFICATION_EMAIL, SENDER_EMAIL
+    SENDGRID_API_KEY, NOTIFICATION_EMAIL, SENDER_EMAIL, ALERT_MIN_SCORE, ALERT_CLAIM_TIMEOUT_SECONDS
 )
 from app.models.models import Match, NotificationSetting, Source, Keyword
 
 # Configure logger
 logger = logging.getLogger(__name__)
 
+# Seconds to stop sending after a failed alert, doubling with each further failure
+RETRY_BACKOFF_SECONDS = 60
+MAX_RETRY_BACKOFF_SECONDS = 3600
+
 class AlertSystem:
     """
     Alert system for sending notifications via Slack and email
     """
     
-    def __init__(self):
-        """Initialize the alert system and database connection"""
-        self.engine = create_engine(DATABASE_URL)
+    def __init__(self, engine=None):
+        """
+        Initialize the alert system and database connection
+        
+        Args:
+            engine (Engine): Database engine to share, e.g. the scheduler's; one is created by default
+        """
+        self.engine = engine or create_engine(DATABASE_URL)
         self.Session = sessionmaker(bind=self.engine)
         
         # Initialize notification clients
         self.sendgrid_client = None
         if SENDGRID_API_KEY:
             self.sendgrid_client = sendgrid.SendGridAPIClient(api_key=SENDGRID_API_KEY)
+        
+        # Consecutive failed alerts, and when sending may be tried again
+        self._failures = 0
+        self._retry_at = 0
     
     def process_new_matches(self):
-        """Process all new matches that haven't been notified yet"""
+        """
+        Process all new matches that haven't been notified yet
+        
+        Returns:
+            list: Seconds from each alerted post being seen to its alert being sent
+        """
         logger.info("Processing new matches for notifications")
         
         try:
@@ -40,70 +59,25 @@ class AlertSystem:
             session = self.Session()
             
             # Get notification settings
-            settings = session.query(NotificationSetting).first()
-            if not settings:
-                # Create default settings if none exist
-                settings = NotificationSetting(
-                    email_enabled=bool(NOTIFICATION_EMAIL),
-                    email_address=NOTIFICATION_EMAIL,
-                    slack_enabled=bool(SLACK_WEBHOOK_URL),
-                    slack_webhook=SLACK_WEBHOOK_URL
-                )
-                session.add(settings)
-                session.commit()
+            settings = self._notification_settings(session)
+            if not self._can_send(settings):
+                session.close()
+                return []
             
-            # Get all unnotified matches
-            unnotified_matches = session.query(Match).filter_by(is_notified=False).all()
+            # Get all unnotified matches, and the ones whose claim went stale before their alerts were sent
+            query = session.query(Match.id).filter(self._claimable())
+            match_ids = [match_id for (match_id,) in query.order_by(Match.id)]
             
-            if not unnotified_matches:
+            if not match_ids:
                 logger.info("No new matches to notify")
                 session.close()
-                return
-            
-            logger.info(f"Found {len(unnotified_matches)} new matches to notify")
+                return []
             
-            # Process each match
-            for match in unnotified_matches:
-                try:
-                    # Get source and keyword information
-                    source = session.query(Source).filter_by(id=match.source_id).first()
-                    keyword = session.query(Keyword).filter_by(id=match.keyword_id).first()
-                    
-                    if not source or not keyword:
-                        logger.error(f"Missing source or keyword for match ID {match.id}")
-                        continue
-                    
-                    # Send notifications based on settings
-                    notification_sent = False
-                    
-                    if settings.slack_enabled and settings.slack_webhook:
-                        slack_sent = self.send_slack_notification(
-                            settings.slack_webhook,
-                            match,
-                            source,
-                            keyword
-                        )
-                        notification_sent = notification_sent or slack_sent
-                    
-                    if settings.email_enabled and settings.email_address:
-                        email_sent = self.send_email_notification(
-                            settings.email_address,
-                            match,
-                            source,
-                            keyword
-                        )
-                        notification_sent = notification_sent or email_sent
-                    
-                    # Mark as notified if at least one notification was sent
-                    if notification_sent:
-                        match.is_notified = True
-                        session.commit()
-                    
-                except Exception as e:
-                    logger.error(f"Error processing match ID {match.id}: {str(e)}")
-                    session.rollback()
+            logger.info(f"Found {len(match_ids)} new matches to notify")
             
+            latencies = self._notify(session, settings, match_ids)
             session.close()
+            return latencies
             
         except Exception as e:
             logger.error(f"Error in process_new_matches: {str(e)}")
@@ -111,7 +85,203 @@ class AlertSystem:
                 session.close()
             except:
                 pass
+            return []
+    
+    def notify_matches(self, match_ids):
+        """
+        Send alerts for specific matches, e.g. the ones a scrape just stored
+        
+        Matches that are already notified, or scored below ALERT_MIN_SCORE,
+        are skipped.
+        
+        Args:
+            match_ids (list): IDs of the matches to alert
+            
+        Returns:
+            list: Seconds from each alerted post being seen to its alert being sent
+        """
+        session = self.Session()
+        try:
+            settings = self._notification_settings(session)
+            if not self._can_send(settings):
+                return []
+            return self._notify(session, settings, match_ids)
+        except Exception as e:
+            logger.error(f"Error in notify_matches: {str(e)}")
+            session.rollback()
+            return []
+        finally:
+            session.close()
+    
+    def _notification_settings(self, session):
+        """Get the notification settings, creating them from the environment if none exist"""
+        settings = session.query(NotificationSetting).first()
+        if not settings:
+            # Create default settings if none exist
+            settings = NotificationSetting(
+                email_enabled=bool(NOTIFICATION_EMAIL),
+                email_address=NOTIFICATION_EMAIL,
+                slack_enabled=bool(SLACK_WEBHOOK_URL),
+                slack_webhook=SLACK_WEBHOOK_URL
+            )
+            session.add(settings)
+            session.commit()
+        return settings
+    
+    def _can_send(self, settings):
+        """
+        Check whether alerts can go out now, before any match is claimed
+        
+        Args:
+            settings (NotificationSetting): Channels to send on
+            
+        Returns:
+            bool: False if no channel is enabled, or sending is backing off after a failure
+        """
+        if not (settings.slack_enabled and settings.slack_webhook) and not (settings.email_enabled and settings.email_address):
+            logger.info("No notification channel is enabled, leaving matches unnotified")
+            return False
+        if time.monotonic() < self._retry_at:
+            logger.info(f"Backing off after {self._failures} failed alerts, retrying in {self._retry_at - time.monotonic():.0f} seconds")
+            return False
+        return True
+    
+    def _record_failure(self):
+        """Stop sending for a while after a failed alert, longer after each further one"""
+        self._failures += 1
+        backoff = min(MAX_RETRY_BACKOFF_SECONDS, RETRY_BACKOFF_SECONDS * 2 ** (self._failures - 1))
+        self._retry_at = time.monotonic() + backoff
+        logger.warning(f"Alert failed, not sending again for {backoff} seconds")
+    
+    def _claimable(self, now=None):
+        """
+        Filter for matches that may be claimed
+        
+        That is unnotified matches, plus claimed ones that were never sent
+        within ALERT_CLAIM_TIMEOUT_SECONDS, e.g. because the process sending
+        them died, leaving out the ones the lead model scored too low.
+        """
+        cutoff = (now or datetime.utcnow()) - timedelta(seconds=ALERT_CLAIM_TIMEOUT_SECONDS)
+        condition = or_(
+            Match.is_notified == False,
+            and_(Match.is_notified == True, Match.notified_at.is_(None), Match.claimed_at < cutoff)
+        )
+        if ALERT_MIN_SCORE > 0:
+            condition = and_(condition, or_(Match.score.is_(None), Match.score >= ALERT_MIN_SCORE))
+        return condition
+    
+    def _claim(self, session, match_id):
+        """
+        Mark a match notified before its alerts go out
+        
+        The UPDATE only succeeds while the match is still claimable, so the
+        dispatcher, its sweeps and a manual run from the dashboard never
+        alert the same match twice, even from different processes.
+        
+        Returns:
+            bool: True if this call claimed the match
+        """
+        now = datetime.utcnow()
+        statement = update(Match).where(Match.id == match_id, self._claimable(now))
+        result = session.execute(
+            statement.values(is_notified=True, claimed_at=now).execution_options(synchronize_session=False)
+        )
+        session.commit()
+        return result.rowcount == 1
     
+    def _unclaim(self, session, match_id):
+        """Mark a claimed match unnotified again, so a later run retries it"""
+        session.execute(
+            update(Match).where(Match.id == match_id).values(is_notified=False, claimed_at=None)
+            .execution_options(synchronize_session=False)
+        )
+        session.commit()
+    
+    def _notify(self, session, settings, match_ids):
+        """
+        Claim each match and send its alerts on every enabled channel
+        
+        The first match whose alerts all fail ends the pass and starts a
+        backoff, so a channel that is down is not retried for every match.
+        
+        Args:
+            session (Session): Database session
+            settings (NotificationSetting): Channels to send on
+            match_ids (list): IDs of the matches to alert
+            
+        Returns:
+            list: Seconds from each alerted post being seen to its alert being sent
+        """
+        latencies = []
+        for match_id in match_ids:
+            if not self._claim(session, match_id):
+                continue
+            
+            try:
+                match = session.get(Match, match_id)
+                
+                # Get source and keyword information
+                source = session.query(Source).filter_by(id=match.source_id).first()
+                keyword = session.query(Keyword).filter_by(id=match.keyword_id).first()
+                
+                if not source or not keyword:
+                    logger.error(f"Missing source or keyword for match ID {match.id}")
+                    self._unclaim(session, match_id)
+                    continue
+                
+                # Send notifications based on settings
+                notification_sent = False
+                
+                if settings.slack_enabled and settings.slack_webhook:
+                    slack_sent = self.send_slack_notification(
+                        settings.slack_webhook,
+                        match,
+                        source,
+                        keyword
+                    )
+                    notification_sent = notification_sent or slack_sent
+                
+                if settings.email_enabled and settings.email_address:
+                    email_sent = self.send_email_notification(
+                        settings.email_address,
+                        match,
+                        source,
+                        keyword
+                    )
+                    notification_sent = notification_sent or email_sent
+                
+                # Keep the match notified if at least one notification was sent
+                if notification_sent:
+                    match.notified_at = datetime.utcnow()
+                    if match.seen_at:
+                        latencies.append((match.notified_at - match.seen_at).total_seconds())
+                    session.commit()
+                    self._failures = 0
+                else:
+                    self._unclaim(session, match_id)
+                    self._record_failure()
+                    break
+                
+            except Exception as e:
+                logger.error(f"Error processing match ID {match_id}: {str(e)}")
+                session.rollback()
+                self._unclaim(session, match_id)
+        
+        return latencies
+
+    def _keyword_list(self, match, keyword):
+        """
+        Format every keyword found in a match's post
+
+        Args:
+            match (Match): Match object
+            keyword (Keyword): The match's first keyword, used when no others were recorded
+
+        Returns:
+            str: Comma-separated keyword texts
+        """
+        return ", ".join(match.keyword_texts) or keyword.text
+
     def send_slack_notification(self, webhook_url, match, source, keyword):
         """
         Send a notification to Slack
@@ -150,7 +320,7 @@ class AlertSystem:
                             },
                             {
                                 "type": "mrkdwn",
-                                "text": f"*Matched Keyword:*\n{keyword.text}"
+                                "text": f"*Matched Keywords:*\n{self._keyword_list(match, keyword)}"
                             }
                         ]
                     },
@@ -238,7 +408,7 @@ class AlertSystem:
             html_content = f"""
             <h1>🔍 New House Cleaning Lead Alert!</h1>
             <p><strong>Source:</strong> {source.name} ({source.source_type.capitalize()})</p>
-            <p><strong>Matched Keyword:</strong> {keyword.text}</p>
+            <p><strong>Matched Keywords:</strong> {self._keyword_list(match, keyword)}</p>
             <p><strong>Author:</strong> {match.post_author or 'Unknown'}</p>
             <p><strong>Date:</strong> {post_date_str}</p>
             <h2>Post Content:</h2>
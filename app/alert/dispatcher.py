@@ -0,0 +1,157 @@
+import math
+import time
+import queue
+import logging
+import statistics
+import threading
+from datetime import datetime, timedelta
+
+from app.config.settings import ALERT_SWEEP_SECONDS
+from app.models.models import Match
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+
+def summarize_latencies(latencies):
+    """
+    Summarize seen-to-sent latencies
+
+    Args:
+        latencies (list): Seconds from posts being seen to their alerts being sent
+
+    Returns:
+        dict: 'count', 'median', 'p95' and 'max' seconds, or None if there are none
+    """
+    if not latencies:
+        return None
+    values = sorted(latencies)
+    return {
+        'count': len(values),
+        'median': statistics.median(values),
+        'p95': values[math.ceil(0.95 * len(values)) - 1],
+        'max': values[-1]
+    }
+
+
+def alert_latency(session, hours=24, now=None):
+    """
+    Seen-to-sent latency of the alerts sent recently, from any process
+
+    Args:
+        session (Session): Database session
+        hours (float): How far back to look
+        now (datetime): Current time, for tests
+
+    Returns:
+        dict: See summarize_latencies, or None if no alerts were sent
+    """
+    now = now or datetime.utcnow()
+    rows = (
+        session.query(Match.seen_at, Match.notified_at)
+        .filter(Match.notified_at >= now - timedelta(hours=hours), Match.seen_at.isnot(None))
+        .all()
+    )
+    return summarize_latencies([(notified_at - seen_at).total_seconds() for seen_at, notified_at in rows])
+
+
+class AlertDispatcher:
+    """
+    Sends alerts for new matches as soon as a scrape stores them.
+
+    The scheduler publishes the IDs of each source's new matches right
+    after committing them, and a background thread alerts them straight
+    away, together with anything else published in the meantime, instead
+    of waiting for someone to process alerts. When it starts, and every
+    sweep_seconds after that, the thread also alerts every match that is
+    still unnotified. The sweep retries failed sends once the alert system's
+    backoff is over, and picks up matches stored while no dispatcher was
+    running.
+    """
+
+    def __init__(self, alert_system, sweep_seconds=ALERT_SWEEP_SECONDS):
+        """
+        Args:
+            alert_system (AlertSystem): Sends the alerts
+            sweep_seconds (float): Seconds between sweeps for unnotified matches
+        """
+        self.alert_system = alert_system
+        self.sweep_seconds = sweep_seconds
+        self._queue = queue.Queue()
+        self._thread = None
+
+    @property
+    def running(self):
+        """Whether the dispatcher thread is alive"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start the dispatcher thread"""
+        if self.running:
+            return
+        self._thread = threading.Thread(target=self._run, name='alert-dispatcher', daemon=True)
+        self._thread.start()
+        logger.info(f"Alert dispatcher started, sweeping for missed matches every {self.sweep_seconds} seconds")
+
+    def stop(self, timeout=30):
+        """Alert the matches already published, then stop the thread"""
+        if not self.running:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def publish(self, match_ids):
+        """
+        Queue newly stored matches for alerting
+
+        Matches published while the dispatcher is not running are left for
+        its first sweep.
+
+        Args:
+            match_ids (list): IDs of committed matches
+        """
+        if match_ids and self.running:
+            self._queue.put(list(match_ids))
+
+    def _run(self):
+        """Alert published matches as they arrive, sweeping when the queue is quiet"""
+        next_sweep = time.monotonic()
+        while True:
+            try:
+                batch = self._queue.get(timeout=max(0, next_sweep - time.monotonic()))
+            except queue.Empty:
+                self._record(self.alert_system.process_new_matches())
+                next_sweep = time.monotonic() + self.sweep_seconds
+                continue
+            if batch is None:
+                return
+
+            # Alert everything published while the last batch was being sent in one pass
+            match_ids = list(batch)
+            stopping = False
+            while True:
+                try:
+                    batch = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if batch is None:
+                    stopping = True
+                    break
+                match_ids.extend(batch)
+
+            try:
+                self._record(self.alert_system.notify_matches(match_ids))
+            except Exception as e:
+                logger.error(f"Error dispatching alerts: {str(e)}")
+            if stopping:
+                return
+
+    def _record(self, latencies):
+        """Log how long the alerts just sent took from their posts being seen"""
+        summary = summarize_latencies(latencies)
+        if summary:
+            logger.info(
+                f"Sent alerts for {summary['count']} matches, {summary['median']:.1f}s median and "
+                f"{summary['max']:.1f}s max after the posts were seen"
+            )
@@ -19,8 +19,76 @@ else:
     DATABASE_URL = f"{DB_TYPE}://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
 # Scraper configuration
+# Polling interval for sources without a post history yet; later intervals adapt to each source's post rate
 SCRAPE_INTERVAL_MINUTES = int(os.getenv("SCRAPE_INTERVAL_MINUTES", "60"))
+# Bounds for the adaptive per-source polling interval
+MIN_SCRAPE_INTERVAL_MINUTES = float(os.getenv("MIN_SCRAPE_INTERVAL_MINUTES", "5"))
+MAX_SCRAPE_INTERVAL_MINUTES = float(os.getenv("MAX_SCRAPE_INTERVAL_MINUTES", "360"))
+# New posts each scrape should find; sources that post faster are polled more often
+TARGET_NEW_POSTS_PER_SCRAPE = float(os.getenv("TARGET_NEW_POSTS_PER_SCRAPE", "5"))
+# How often the scheduler looks for sources that are due
+SCHEDULER_TICK_SECONDS = int(os.getenv("SCHEDULER_TICK_SECONDS", "60"))
+# Table the scheduler keeps its jobs and their next run times in; one running worker uses it, the others keep their schedule in memory
+SCHEDULER_JOBS_TABLE = os.getenv("SCHEDULER_JOBS_TABLE", "apscheduler_jobs")
+# How late a missed job may still run, e.g. after a restart; missed runs of a job are merged into one
+SCHEDULER_MISFIRE_GRACE_SECONDS = int(os.getenv("SCHEDULER_MISFIRE_GRACE_SECONDS", "3600"))
+# Name this worker uses when claiming sources; defaults to host, process ID and a random suffix
+WORKER_ID = os.getenv("WORKER_ID", "")
+# How long a worker's claim on a source lasts unless renewed, and how often running workers renew theirs
+LEASE_SECONDS = int(os.getenv("LEASE_SECONDS", "600"))
+LEASE_HEARTBEAT_SECONDS = int(os.getenv("LEASE_HEARTBEAT_SECONDS", "60"))
+# Sources a worker claims at a time, leaving the rest to other workers
+LEASE_BATCH_SIZE = int(os.getenv("LEASE_BATCH_SIZE", "10"))
 BROWSER_HEADLESS = os.getenv("BROWSER_HEADLESS", "True").lower() == "true"
+# Number of browsers the scheduler may run at once across all platforms
+SCRAPER_POOL_SIZE = int(os.getenv("SCRAPER_POOL_SIZE", "1"))
+# Number of browsers each platform may use at once, within SCRAPER_POOL_SIZE
+FACEBOOK_MAX_CONCURRENCY = int(os.getenv("FACEBOOK_MAX_CONCURRENCY", "4"))
+NEXTDOOR_MAX_CONCURRENCY = int(os.getenv("NEXTDOOR_MAX_CONCURRENCY", "4"))
+# Browsers a platform starts with before its concurrency controller has a saved level
+INITIAL_CONCURRENCY = int(os.getenv("INITIAL_CONCURRENCY", "1"))
+# Fraction of a platform's concurrency kept after a timeout, CAPTCHA or login failure
+CONCURRENCY_BACKOFF = float(os.getenv("CONCURRENCY_BACKOFF", "0.5"))
+# Implicit wait for login flows; probing and extraction always run with it disabled
+BROWSER_IMPLICIT_WAIT_SECONDS = int(os.getenv("BROWSER_IMPLICIT_WAIT_SECONDS", "10"))
+# Upper bound on how long one scroll step waits for new posts to appear
+FACEBOOK_SCROLL_TIMEOUT_SECONDS = float(os.getenv("FACEBOOK_SCROLL_TIMEOUT_SECONDS", "5"))
+NEXTDOOR_SCROLL_TIMEOUT_SECONDS = float(os.getenv("NEXTDOOR_SCROLL_TIMEOUT_SECONDS", "5"))
+# Browser automation backend: "selenium" (one Chrome per worker) or "playwright" (one Chromium, many contexts)
+SCRAPER_BACKEND = os.getenv("SCRAPER_BACKEND", "selenium").lower()
+# Number of browser contexts the Playwright backend keeps open at once
+PLAYWRIGHT_MAX_CONTEXTS = int(os.getenv("PLAYWRIGHT_MAX_CONTEXTS", "12"))
+# Resources the browser should not download while scraping (types: image, media, font, stylesheet)
+BLOCK_RESOURCES = os.getenv("BLOCK_RESOURCES", "True").lower() == "true"
+BLOCKED_RESOURCE_TYPES = os.getenv("BLOCKED_RESOURCE_TYPES", "image,media,font")
+BLOCKED_URL_PATTERNS = os.getenv("BLOCKED_URL_PATTERNS", "")  # Comma separated glob patterns
+ALLOWED_URL_PATTERNS = os.getenv("ALLOWED_URL_PATTERNS", "")  # Comma separated glob patterns, never blocked
+# How posts are read from the page: "script" (one execute_script per page), "webdriver" (per-element lookups),
+# "snapshot" (page_source parsed with BeautifulSoup, on a process pool when run by the scheduler)
+# or "network" (the feed's GraphQL responses read from the performance log, merged with "script" for the
+# server-rendered first page)
+SCRAPER_EXTRACTION_MODE = os.getenv("SCRAPER_EXTRACTION_MODE", "script").lower()
+# Worker processes for the snapshot parsing stage
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", str(os.cpu_count() or 2)))
+# Sources each scrape pipeline queue may hold before the stage feeding it waits (fetched pages, parsed results)
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "4"))
+# Page loads and scrolls allowed per minute across all browsers and workers of a platform, and for each logged-in account (0 = unlimited)
+FACEBOOK_REQUESTS_PER_MINUTE = float(os.getenv("FACEBOOK_REQUESTS_PER_MINUTE", "30"))
+NEXTDOOR_REQUESTS_PER_MINUTE = float(os.getenv("NEXTDOOR_REQUESTS_PER_MINUTE", "30"))
+ACCOUNT_REQUESTS_PER_MINUTE = float(os.getenv("ACCOUNT_REQUESTS_PER_MINUTE", "20"))
+# Requests a rate limit allows back to back after an idle period
+RATE_LIMIT_BURST = int(os.getenv("RATE_LIMIT_BURST", "3"))
+# Random extra delay per request, as a fraction of the platform's average request spacing
+RATE_LIMIT_JITTER = float(os.getenv("RATE_LIMIT_JITTER", "0.3"))
+# Persistent Chrome profiles (cookies, disk cache, service workers), one per platform, account and browser,
+# and per WORKER_ID when set. Set to an empty string to start every browser with a throwaway profile.
+CHROME_PROFILE_DIR = os.getenv("CHROME_PROFILE_DIR", os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'chrome_profiles')))
+# How long a verified login is trusted before the scrapers check it again
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", "1800"))
+# How long a post is remembered for spotting the same request cross-posted to other groups
+DEDUP_WINDOW_HOURS = float(os.getenv("DEDUP_WINDOW_HOURS", "72"))
+# Share of word pairs two posts must have in common (0-1) to be treated as the same post
+DEDUP_MIN_SIMILARITY = float(os.getenv("DEDUP_MIN_SIMILARITY", "0.6"))
 
 # Facebook configuration
 FACEBOOK_COOKIES = os.getenv("FACEBOOK_COOKIES", "")
@@ -37,6 +105,12 @@ SLACK_WEBHOOK_URL = os.getenv("SLACK_WEBHOOK_URL", "")
 SENDGRID_API_KEY = os.getenv("SENDGRID_API_KEY", "")
 NOTIFICATION_EMAIL = os.getenv("NOTIFICATION_EMAIL", "")
 SENDER_EMAIL = os.getenv("SENDER_EMAIL", "alerts@socialmediaalert.com")
+# Minimum lead score (0-1) for a match to be alerted once a lead model is trained; 0 alerts every match
+ALERT_MIN_SCORE = float(os.getenv("ALERT_MIN_SCORE", "0"))
+# Seconds between sweeps that alert matches the dispatcher missed, e.g. after a failed send
+ALERT_SWEEP_SECONDS = int(os.getenv("ALERT_SWEEP_SECONDS", "300"))
+# Seconds after which a match claimed for alerting but never sent, e.g. because the process died, is retried
+ALERT_CLAIM_TIMEOUT_SECONDS = int(os.getenv("ALERT_CLAIM_TIMEOUT_SECONDS", "600"))
 
 # Web application configuration
 SECRET_KEY = os.getenv("SECRET_KEY", os.urandom(24).hex())
@@ -4,13 +4,17 @@ from datetime import datetime
 from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
-from sqlalchemy import create_engine, desc
+from sqlalchemy import desc, func, or_
 from sqlalchemy.orm import sessionmaker, scoped_session
 
 from app.config.settings import DATABASE_URL, SECRET_KEY, DEBUG, HOST, PORT
-from app.models.models import Base, Source, Keyword, Match, NotificationSetting
+from app.models.models import Source, Keyword, Match, MatchKeyword, LeadModel, NotificationSetting, init_db
 from app.scraper.scheduler import ScraperScheduler
+from app.scraper.keyword_query import is_query, check_query
+from app.scraper.scoring import train_lead_model
 from app.alert.alert_system import AlertSystem
+from app.alert.dispatcher import alert_latency
+from app.scraper.rate_limit import request_stats
 from app.utils.error_handling import setup_logger, handle_errors, log_user_activity
 
 # Configure logging
@@ -25,8 +29,7 @@ app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URL
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 # Initialize database
-engine = create_engine(DATABASE_URL)
-Base.metadata.create_all(engine)
+engine = init_db(DATABASE_URL)
 db_session = scoped_session(sessionmaker(bind=engine))
 
 # Initialize login manager
@@ -65,6 +68,13 @@ def index():
     # Get notification settings
     notification_settings = db_session.query(NotificationSetting).first()
     
+    # Requests sent and time held back by the rate limits over the last day, by every worker
+    throttle_stats = request_stats(db_session, scheduler.rate_limiter.platform_rates)
+    # Browsers each platform's concurrency controller currently allows
+    concurrency_stats = {platform: controller.stats() for platform, controller in scheduler.concurrency.items()}
+    # Time from posts being scraped to their alerts going out, over the last day
+    latency_stats = alert_latency(db_session)
+    
     log_user_activity('view', 'Dashboard home page')
     
     return render_template('index.html', 
@@ -72,7 +82,10 @@ def index():
                           source_count=source_count,
                           keyword_count=keyword_count,
                           match_count=match_count,
-                          notification_settings=notification_settings)
+                          notification_settings=notification_settings,
+                          throttle_stats=throttle_stats,
+                          concurrency_stats=concurrency_stats,
+                          latency_stats=latency_stats)
 
 @app.route('/matches')
 @login_required
@@ -83,16 +96,26 @@ def matches():
     source_id = request.args.get('source_id', type=int)
     keyword_id = request.args.get('keyword_id', type=int)
     days = request.args.get('days', type=int, default=30)
+    sort = request.args.get('sort', default='date')
+    show_duplicates = request.args.get('duplicates', type=int, default=0)
     
     # Build query
     query = db_session.query(Match)
     
+    # Cross-posted copies are listed under the first match unless asked for
+    if not show_duplicates:
+        query = query.filter(Match.duplicate_of_id.is_(None))
+    
     # Apply filters
     if source_id:
         query = query.filter(Match.source_id == source_id)
     
     if keyword_id:
-        query = query.filter(Match.keyword_id == keyword_id)
+        # Any keyword found in the post, not only the first; older matches only have keyword_id
+        query = query.filter(or_(
+            Match.keywords.any(MatchKeyword.keyword_id == keyword_id),
+            Match.keyword_id == keyword_id
+        ))
     
     if days:
         date_filter = datetime.utcnow() - timedelta(days=days)
@@ -101,14 +124,34 @@ def matches():
     # Get matches with pagination
     page = request.args.get('page', type=int, default=1)
     per_page = 20
-    matches = query.order_by(desc(Match.created_at)).limit(per_page).offset((page-1)*per_page).all()
+    if sort == 'score':
+        # Highest lead score first, unscored matches last
+        order = (Match.score.is_(None), desc(Match.score), desc(Match.created_at))
+    else:
+        order = (desc(Match.created_at),)
+    matches = query.order_by(*order).limit(per_page).offset((page-1)*per_page).all()
     total = query.count()
     
+    # Number of cross-posted copies of each match on the page
+    copy_counts = dict(
+        db_session.query(Match.duplicate_of_id, func.count(Match.id))
+        .filter(Match.duplicate_of_id.in_([match.id for match in matches]))
+        .group_by(Match.duplicate_of_id)
+        .all()
+    ) if matches else {}
+    
     # Get sources and keywords for filter dropdowns
     sources = db_session.query(Source).all()
     keywords = db_session.query(Keyword).all()
     
-    log_user_activity('view', f'Matches page with filters: source_id={source_id}, keyword_id={keyword_id}, days={days}')
+    # Lead model status for the training controls
+    lead_model = db_session.query(LeadModel).filter_by(is_active=True).order_by(desc(LeadModel.id)).first()
+    label_counts = {
+        'good': db_session.query(Match).filter(Match.label == 1).count(),
+        'bad': db_session.query(Match).filter(Match.label == 0).count()
+    }
+    
+    log_user_activity('view', f'Matches page with filters: source_id={source_id}, keyword_id={keyword_id}, days={days}, sort={sort}, duplicates={show_duplicates}')
     
     return render_template('matches.html', 
                           matches=matches,
@@ -117,10 +160,53 @@ def matches():
                           current_source_id=source_id,
                           current_keyword_id=keyword_id,
                           current_days=days,
+                          current_sort=sort,
+                          show_duplicates=show_duplicates,
+                          copy_counts=copy_counts,
+                          lead_model=lead_model,
+                          label_counts=label_counts,
                           page=page,
                           per_page=per_page,
                           total=total)
 
+@app.route('/matches/<int:id>/label', methods=['POST'])
+@login_required
+@handle_errors
+def label_match(id):
+    """Mark a match as a good or bad lead for training the lead model"""
+    match = db_session.query(Match).filter_by(id=id).first_or_404()
+    
+    label = request.form.get('label')
+    match.label = {'good': 1, 'bad': 0}.get(label)
+    db_session.commit()
+    
+    log_user_activity('edit', f'Labeled match {id} as {label}')
+    
+    # Return to the same page of results
+    next_url = request.form.get('next', '')
+    if not next_url.startswith('/') or next_url.startswith('//'):
+        next_url = url_for('matches')
+    return redirect(next_url)
+
+@app.route('/matches/train', methods=['POST'])
+@login_required
+@handle_errors
+def train_lead_model_route():
+    """Train the lead model from the labeled matches and rescore every match"""
+    try:
+        model = train_lead_model(db_session)
+        db_session.commit()
+        log_user_activity('action', f'Trained lead model on {model.trained_on} labeled matches')
+        flash(f'Lead model trained on {model.trained_on} labeled matches (training accuracy {model.accuracy:.0%})', 'success')
+    except ValueError as e:
+        flash(str(e), 'warning')
+    except Exception as e:
+        db_session.rollback()
+        logger.error(f"Error training lead model: {str(e)}")
+        flash(f'Error training lead model: {str(e)}', 'danger')
+    
+    return redirect(url_for('matches', sort='score'))
+
 @app.route('/sources')
 @login_required
 @handle_errors
@@ -217,8 +303,24 @@ def delete_source(id):
 def keywords():
     """View and manage keywords"""
     keywords = db_session.query(Keyword).all()
+    
+    # Count matches per keyword, including the posts where it was not the first keyword
+    match_counts = dict(
+        db_session.query(MatchKeyword.keyword_id, func.count(MatchKeyword.id))
+        .group_by(MatchKeyword.keyword_id)
+        .all()
+    )
+    older_matches = (
+        db_session.query(Match.keyword_id, func.count(Match.id))
+        .filter(~Match.keywords.any())
+        .group_by(Match.keyword_id)
+        .all()
+    )
+    for keyword_id, count in older_matches:
+        match_counts[keyword_id] = match_counts.get(keyword_id, 0) + count
+    
     log_user_activity('view', 'Keywords page')
-    return render_template('keywords.html', keywords=keywords)
+    return render_template('keywords.html', keywords=keywords, match_counts=match_counts)
 
 @app.route('/keywords/add', methods=['GET', 'POST'])
 @login_required
@@ -232,6 +334,14 @@ def add_keyword():
             flash('Keyword text is required', 'danger')
             return redirect(url_for('add_keyword'))
         
+        # Reject malformed queries before they reach the scrapers
+        if is_query(text):
+            try:
+                check_query(text)
+            except ValueError as e:
+                flash(f'Invalid keyword query: {str(e)}', 'danger')
+                return redirect(url_for('add_keyword', text=text))
+        
         # Check if keyword already exists
         existing = db_session.query(Keyword).filter_by(text=text).first()
         if existing:
@@ -271,6 +381,14 @@ def edit_keyword(id):
             flash('Keyword text is required', 'danger')
             return redirect(url_for('edit_keyword', id=id))
         
+        # Reject malformed queries before they reach the scrapers
+        if is_query(text):
+            try:
+                check_query(text)
+            except ValueError as e:
+                flash(f'Invalid keyword query: {str(e)}', 'danger')
+                return redirect(url_for('edit_keyword', id=id))
+        
         # Check if keyword already exists
         existing = db_session.query(Keyword).filter_by(text=text).first()
         if existing and existing.id != id:
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, ForeignKey, create_engine
+from sqlalchemy import Column, Integer, BigInteger, Float, String, Text, Boolean, DateTime, ForeignKey, Index, JSON, LargeBinary, create_engine, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 import datetime
@@ -16,6 +16,13 @@ class Source(Base):
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
     last_scraped = Column(DateTime, nullable=True)
+    last_post_id = Column(String(255), nullable=True)  # Newest post seen, scraping stops when it is reached
+    last_post_date = Column(DateTime, nullable=True)
+    post_rate = Column(Float, nullable=True)  # Smoothed new posts per hour, None until scraped twice
+    last_new_post_at = Column(DateTime, nullable=True)  # Last scrape that found new posts
+    next_due_at = Column(DateTime, nullable=True, index=True)  # When the scheduler scrapes the source next, None means now
+    lease_owner = Column(String(255), nullable=True, index=True)  # Worker scraping the source, see app.scraper.leases
+    lease_expires_at = Column(DateTime, nullable=True)  # Other workers may take the source over after this
     
     # Relationships
     matches = relationship("Match", back_populates="source")
@@ -35,6 +42,7 @@ class Keyword(Base):
     
     # Relationships
     matches = relationship("Match", back_populates="keyword")
+    match_keywords = relationship("MatchKeyword", back_populates="keyword")
     
     def __repr__(self):
         return f"<Keyword(id={self.id}, text='{self.text}')>"
@@ -43,6 +51,10 @@ class Keyword(Base):
 class Match(Base):
     """Model for keyword matches found in sources"""
     __tablename__ = 'matches'
+    __table_args__ = (
+        # A post is stored once per source; scrapers insert with ON CONFLICT DO NOTHING against it
+        Index('uq_matches_source_post', 'source_id', 'post_id', unique=True),
+    )
     
     id = Column(Integer, primary_key=True)
     source_id = Column(Integer, ForeignKey('sources.id'), nullable=False)
@@ -52,18 +64,150 @@ class Match(Base):
     post_text = Column(Text, nullable=False)
     post_author = Column(String(255), nullable=True)
     post_date = Column(DateTime, nullable=True)
-    matched_text = Column(String(512), nullable=False)  # The specific text that matched
+    matched_text = Column(String(512), nullable=False)  # The first keyword that matched, see keywords for all of them
     is_notified = Column(Boolean, default=False)
+    notified_at = Column(DateTime, nullable=True)  # When the first alert for the match was sent
+    claimed_at = Column(DateTime, nullable=True)  # When an alert system started sending the match's alerts
+    score = Column(Float, nullable=True)  # Lead probability from the active lead model, None before one is trained
+    label = Column(Integer, nullable=True)  # 1 if marked a good lead, 0 if marked a bad lead
+    fingerprint = Column(LargeBinary, nullable=True)  # MinHash signature of the post text, None for short posts
+    duplicate_of_id = Column(Integer, ForeignKey('matches.id'), nullable=True, index=True)  # Earlier copy of the same post
+    seen_at = Column(DateTime, nullable=True)  # When the scrape that found the post loaded it
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
     
     # Relationships
     source = relationship("Source", back_populates="matches")
     keyword = relationship("Keyword", back_populates="matches")
+    keywords = relationship("MatchKeyword", back_populates="match", cascade="all, delete-orphan")
+    duplicate_of = relationship("Match", remote_side=[id], back_populates="duplicates")
+    duplicates = relationship("Match", back_populates="duplicate_of")
+    
+    @property
+    def keyword_texts(self):
+        """Texts of every keyword that matched, falling back to the first one for older matches"""
+        if self.keywords:
+            return [match_keyword.keyword.text for match_keyword in self.keywords]
+        return [self.keyword.text] if self.keyword else []
     
     def __repr__(self):
         return f"<Match(id={self.id}, source_id={self.source_id}, keyword_id={self.keyword_id})>"
 
 
+class MatchKeyword(Base):
+    """Model for each keyword found in a matched post"""
+    __tablename__ = 'match_keywords'
+    
+    id = Column(Integer, primary_key=True)
+    match_id = Column(Integer, ForeignKey('matches.id'), nullable=False, index=True)
+    keyword_id = Column(Integer, ForeignKey('keywords.id'), nullable=False, index=True)
+    spans = Column(JSON, nullable=True)  # [start, end] offsets of every occurrence in the post text
+    
+    # Relationships
+    match = relationship("Match", back_populates="keywords")
+    keyword = relationship("Keyword", back_populates="match_keywords")
+    
+    def __repr__(self):
+        return f"<MatchKeyword(match_id={self.match_id}, keyword_id={self.keyword_id})>"
+
+
+class PostFingerprint(Base):
+    """Model for the LSH band keys of recent original matches, used to find cross-posted duplicates"""
+    __tablename__ = 'post_fingerprints'
+    
+    id = Column(Integer, primary_key=True)
+    match_id = Column(Integer, ForeignKey('matches.id'), nullable=False, index=True)
+    band_key = Column(BigInteger, nullable=False, index=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow, index=True)
+    
+    # Relationships
+    match = relationship("Match")
+    
+    def __repr__(self):
+        return f"<PostFingerprint(match_id={self.match_id}, band_key={self.band_key})>"
+
+
+class LeadModel(Base):
+    """Model for lead scoring weights trained from labeled matches"""
+    __tablename__ = 'lead_models'
+    
+    id = Column(Integer, primary_key=True)
+    weights = Column(LargeBinary, nullable=False)  # Little-endian float32 weight per hashed feature
+    bias = Column(Float, nullable=False, default=0.0)
+    n_features = Column(Integer, nullable=False)
+    trained_on = Column(Integer, nullable=False)  # Number of labeled matches
+    accuracy = Column(Float, nullable=True)  # Accuracy on the training labels
+    is_active = Column(Boolean, default=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<LeadModel(id={self.id}, trained_on={self.trained_on}, is_active={self.is_active})>"
+
+
+class ConcurrencyState(Base):
+    """Model for the browser concurrency each worker's platform controller has settled on"""
+    __tablename__ = 'concurrency_states'
+    __table_args__ = (
+        # One row per worker, so workers never overwrite each other's level
+        Index('uq_concurrency_states_platform_worker', 'platform', 'worker', unique=True),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    platform = Column(String(50), nullable=False)  # 'facebook' or 'nextdoor'
+    worker = Column(String(255), nullable=False, default='')  # Lease owner name of the worker that saved it
+    level = Column(Float, nullable=False)  # Fractional; the browsers allowed are its integer part
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<ConcurrencyState(platform='{self.platform}', worker='{self.worker}', level={self.level})>"
+
+
+class JobStoreOwner(Base):
+    """Model for the running scheduler allowed to use a job store table"""
+    __tablename__ = 'job_store_owners'
+    
+    id = Column(Integer, primary_key=True)
+    table_name = Column(String(255), unique=True, nullable=False)
+    owner = Column(String(255), nullable=False)  # Lease owner name of the worker using the table
+    expires_at = Column(DateTime, nullable=False)  # Other workers may take the table over after this
+    
+    def __repr__(self):
+        return f"<JobStoreOwner(table_name='{self.table_name}', owner='{self.owner}')>"
+
+
+class RateLimitBucket(Base):
+    """Model for a request budget shared by every worker process"""
+    __tablename__ = 'rate_limit_buckets'
+    
+    id = Column(Integer, primary_key=True)
+    key = Column(String(512), unique=True, nullable=False)  # Platform, or platform and account
+    tokens = Column(Float, nullable=False)  # Negative while booked requests wait for their turn
+    updated = Column(Float, nullable=False)  # Unix time tokens was last computed at
+    
+    def __repr__(self):
+        return f"<RateLimitBucket(key='{self.key}', tokens={self.tokens})>"
+
+
+class RequestStat(Base):
+    """Model for the requests one worker sent to a platform in one hour, and how long it held them back"""
+    __tablename__ = 'request_stats'
+    __table_args__ = (
+        # Each worker only ever writes its own rows
+        Index('uq_request_stats_platform_worker_hour', 'platform', 'worker', 'hour', unique=True),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    platform = Column(String(50), nullable=False)  # 'facebook' or 'nextdoor'
+    worker = Column(String(255), nullable=False)  # Lease owner name of the worker that sent the requests
+    hour = Column(DateTime, nullable=False, index=True)  # Start of the hour, UTC
+    requests = Column(Integer, nullable=False, default=0)
+    page_loads = Column(Integer, nullable=False, default=0)
+    scrolls = Column(Integer, nullable=False, default=0)
+    throttled_seconds = Column(Float, nullable=False, default=0.0)
+    
+    def __repr__(self):
+        return f"<RequestStat(platform='{self.platform}', worker='{self.worker}', hour={self.hour}, requests={self.requests})>"
+
+
 class NotificationSetting(Base):
     """Model for notification settings"""
     __tablename__ = 'notification_settings'
@@ -92,8 +236,38 @@ class User(Base, UserMixin):
     def __repr__(self):
         return f"<User(id={self.id}, email='{self.email}')>"
 
+# Function to add columns and indexes introduced after a table was first created
+def upgrade_db(engine):
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+            
+            existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name in existing_indexes:
+                    continue
+                if index.name == 'uq_matches_source_post':
+                    _clear_duplicate_post_ids(connection)
+                index.create(connection)
+
+def _clear_duplicate_post_ids(connection):
+    # Older versions could store empty or repeated post IDs; keep the ID on the first match only
+    connection.execute(text("UPDATE matches SET post_id = NULL WHERE post_id = ''"))
+    connection.execute(text(
+        "UPDATE matches SET post_id = NULL WHERE post_id IS NOT NULL AND id NOT IN "
+        "(SELECT first_id FROM (SELECT MIN(id) AS first_id FROM matches WHERE post_id IS NOT NULL GROUP BY source_id, post_id) AS firsts)"
+    ))
+
 # Function to initialize the database
 def init_db(db_url):
     engine = create_engine(db_url)
     Base.metadata.create_all(engine)
+    upgrade_db(engine)
     return engine
@@ -0,0 +1,203 @@
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from app.config.settings import INITIAL_CONCURRENCY, CONCURRENCY_BACKOFF
+from app.models.models import ConcurrencyState
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# How a scrape went, as reported by the scrapers in last_outcome
+SUCCESS = 'ok'
+TIMEOUT = 'timeout'
+CAPTCHA = 'captcha'
+AUTH_FAILURE = 'auth'
+
+# Outcomes that mean the platform is pushing back and fewer browsers should run
+BACKOFF_OUTCOMES = (TIMEOUT, CAPTCHA, AUTH_FAILURE)
+
+# Saved levels older than this are only used when no worker saved a newer one, then deleted
+STATE_MAX_AGE = timedelta(days=1)
+
+
+class Slot:
+    """Permission for one scrape; the holder sets outcome before leaving the slot"""
+
+    def __init__(self, cuts):
+        self.cuts = cuts
+        self.outcome = None
+
+
+class AIMDController:
+    """
+    Additive-increase, multiplicative-decrease limit on a platform's browsers.
+
+    Every scrape holds a slot, and no more than `limit` slots are held at
+    once. Each successful scrape adds 1/limit to the level, so it grows by
+    about one browser per round of scrapes. A timeout, CAPTCHA or login
+    failure multiplies the level by the backoff factor. Scrapes that were
+    already running when the level was cut report the same overload, so
+    their failures do not cut it again. Scrapes that failed for any other
+    reason report no outcome and leave the level alone.
+    """
+
+    def __init__(self, platform, maximum, initial=INITIAL_CONCURRENCY, minimum=1, backoff=CONCURRENCY_BACKOFF):
+        """
+        Args:
+            platform (str): Platform name used in log messages and the saved state
+            maximum (int): Most browsers the platform may use
+            initial (float): Starting level until a saved one is loaded
+            minimum (int): Fewest browsers the platform keeps using
+            backoff (float): Fraction of the level kept after a failure
+        """
+        self.platform = platform
+        self.maximum = max(1, maximum)
+        self.minimum = max(1, min(minimum, self.maximum))
+        self.backoff = backoff
+        self.level = self._clamp(initial)
+        self.changed = False
+        self._active = 0
+        self._cuts = 0
+        self._condition = threading.Condition()
+
+    def _clamp(self, level):
+        """Keep a level within the controller's bounds"""
+        return float(min(max(level, self.minimum), self.maximum))
+
+    @property
+    def limit(self):
+        """Browsers allowed at once"""
+        return int(self.level)
+
+    def set_level(self, level):
+        """Replace the level, e.g. with one saved by an earlier run"""
+        with self._condition:
+            self.level = self._clamp(level)
+            self._condition.notify_all()
+
+    def acquire(self):
+        """
+        Block until another scrape may start
+
+        Returns:
+            Slot: Slot to pass to release
+        """
+        with self._condition:
+            while self._active >= self.limit:
+                self._condition.wait()
+            self._active += 1
+            return Slot(self._cuts)
+
+    def release(self, slot):
+        """
+        Free a slot and adjust the level by its outcome
+
+        Args:
+            slot (Slot): Slot returned by acquire, with outcome set to one of the
+                outcome constants, or None when the scrape says nothing about load
+        """
+        with self._condition:
+            self._active -= 1
+            if slot.outcome == SUCCESS:
+                self.level = self._clamp(self.level + 1.0 / self.limit)
+                self.changed = True
+            elif slot.outcome in BACKOFF_OUTCOMES and slot.cuts == self._cuts:
+                previous = self.limit
+                self.level = self._clamp(self.level * self.backoff)
+                self._cuts += 1
+                self.changed = True
+                logger.warning(f"{self.platform} {slot.outcome} signal: concurrency cut from {previous} to {self.limit}")
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self):
+        """Hold a slot for the duration of the block; set .outcome on the yielded Slot"""
+        slot = self.acquire()
+        try:
+            yield slot
+        finally:
+            self.release(slot)
+
+    def checkpoint(self):
+        """
+        Take the level for saving
+
+        Returns:
+            float: The level if it changed since the last checkpoint, otherwise None
+        """
+        with self._condition:
+            if not self.changed:
+                return None
+            self.changed = False
+            return self.level
+
+    def stats(self):
+        """
+        Current level and limits
+
+        Returns:
+            dict: 'level', 'limit', 'maximum' and 'active' scrapes
+        """
+        with self._condition:
+            return {'level': self.level, 'limit': self.limit, 'maximum': self.maximum, 'active': self._active}
+
+
+def load_state(session, controller, now=None):
+    """
+    Resume a controller at the level saved by an earlier run
+
+    Every worker saves its own level. A new worker starts at the lowest
+    level any worker saved within STATE_MAX_AGE, so one that was just cut
+    back is not undone by another that was not, or else at the newest
+    older level.
+
+    Args:
+        session (Session): Database session
+        controller (AIMDController): Controller to update
+        now (datetime): Current time, for tests
+
+    Returns:
+        bool: True if a saved level was found
+    """
+    now = now or datetime.utcnow()
+    states = session.query(ConcurrencyState).filter_by(platform=controller.platform).all()
+    if not states:
+        return False
+    recent = [state.level for state in states if state.updated_at and state.updated_at >= now - STATE_MAX_AGE]
+    if recent:
+        controller.set_level(min(recent))
+    else:
+        controller.set_level(max(states, key=lambda state: state.updated_at or datetime.min).level)
+    logger.info(f"Resuming {controller.platform} at concurrency {controller.limit}")
+    return True
+
+
+def save_state(session, controller, worker, now=None):
+    """
+    Add the controller's level to the session if it changed since the last save
+
+    Levels other workers saved more than STATE_MAX_AGE ago are deleted.
+
+    Args:
+        session (Session): Database session; the caller commits
+        controller (AIMDController): Controller to save
+        worker (str): Name of this worker, see leases.default_worker_id
+        now (datetime): Current time, for tests
+    """
+    level = controller.checkpoint()
+    if level is None:
+        return
+    now = now or datetime.utcnow()
+    session.query(ConcurrencyState).filter(
+        ConcurrencyState.platform == controller.platform,
+        ConcurrencyState.worker != worker,
+        ConcurrencyState.updated_at < now - STATE_MAX_AGE
+    ).delete(synchronize_session=False)
+    state = session.query(ConcurrencyState).filter_by(platform=controller.platform, worker=worker).first()
+    if state is None:
+        state = ConcurrencyState(platform=controller.platform, worker=worker)
+        session.add(state)
+    state.level = level
+    state.updated_at = now
@@ -0,0 +1,86 @@
+# Per-source high-water mark helpers. A cursor is a dict describing the newest
+# post seen in a source: {'post_id': str or None, 'post_date': datetime or None}.
+# Cursors returned by a scrape also carry 'new_posts', the number of posts the
+# scrape found past the previous cursor, which drives adaptive polling.
+
+def cursor_for_source(source):
+    """
+    Build the cursor stored on a Source
+
+    Args:
+        source (Source): Source model instance
+
+    Returns:
+        dict: Cursor, or None if the source has never been scraped
+    """
+    if not source.last_post_id and not source.last_post_date:
+        return None
+    return {'post_id': source.last_post_id, 'post_date': source.last_post_date}
+
+
+def apply_cursor_to_source(source, cursor):
+    """Persist a cursor on a Source"""
+    if cursor:
+        source.last_post_id = cursor.get('post_id')
+        source.last_post_date = cursor.get('post_date')
+
+
+def filter_new_posts(posts, cursor):
+    """
+    Drop posts at or behind the cursor
+
+    Feeds are newest first, so everything from the cursor's post onwards has
+    already been seen. Without that post on the page, posts are compared by
+    date and undated posts are kept.
+
+    Args:
+        posts (list): Post dictionaries in feed order
+        cursor (dict): Cursor from the previous scrape
+
+    Returns:
+        list: Posts newer than the cursor
+    """
+    if not cursor:
+        return posts
+
+    post_id = cursor.get('post_id')
+    if post_id:
+        for index, post in enumerate(posts):
+            if post.get('id') == post_id:
+                return posts[:index]
+
+    post_date = cursor.get('post_date')
+    if post_date:
+        return [post for post in posts if not post.get('date') or post['date'] > post_date]
+
+    return posts
+
+
+def advance_cursor(posts, cursor=None):
+    """
+    Move the cursor to the newest post on the page
+
+    Args:
+        posts (list): Post dictionaries in feed order
+        cursor (dict): Cursor from the previous scrape
+
+    Returns:
+        dict: Updated cursor, or the previous one if nothing newer was seen
+    """
+    new_posts = len(filter_new_posts(posts, cursor))
+    dated = [post for post in posts if post.get('date')]
+    if dated:
+        newest = max(dated, key=lambda post: post['date'])
+    elif posts:
+        newest = posts[0]
+    else:
+        return dict(cursor, new_posts=0) if cursor else None
+
+    if cursor and cursor.get('post_date') and newest.get('date') and newest['date'] <= cursor['post_date']:
+        return dict(cursor, new_posts=new_posts)
+
+    return {
+        'post_id': newest.get('id') or (cursor or {}).get('post_id'),
+        'post_date': newest.get('date') or (cursor or {}).get('post_date'),
+        'new_posts': new_posts
+    }
@@ -1,30 +1,171 @@
+import os
 import logging
 from datetime import datetime
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 import json
 import time
 import re
 
-from app.config.settings import BROWSER_HEADLESS, FACEBOOK_EMAIL, FACEBOOK_PASSWORD, FACEBOOK_COOKIES
+from app.config.settings import (
+    BROWSER_HEADLESS, BROWSER_IMPLICIT_WAIT_SECONDS, FACEBOOK_EMAIL, FACEBOOK_PASSWORD,
+    FACEBOOK_COOKIES, FACEBOOK_SCROLL_TIMEOUT_SECONDS, SCRAPER_EXTRACTION_MODE
+)
+from app.scraper.probing import ElementProber
+from app.scraper.resources import ResourcePolicy, measure_transfer, read_performance_log
+from app.scraper.network_capture import capture_responses, merge_posts, facebook_payload_records, FACEBOOK_FEED_PATTERNS
+from app.scraper.profiles import apply_profile
+from app.scraper.html_parser import facebook_records
+from app.scraper.cursor import filter_new_posts, advance_cursor
+from app.scraper.matcher import compile_keywords, match_post
+from app.scraper.concurrency import SUCCESS, TIMEOUT, CAPTCHA, AUTH_FAILURE
 from app.utils.error_handling import setup_logger, handle_captcha_error, handle_auth_failure, log_scraper_activity
 
 # Configure logger
 logger = setup_logger('app.scraper.facebook')
 
+# Reads every article on the page in a single WebDriver round trip.
+# Mirrors the XPath lookups in _extract_posts_webdriver.
+EXTRACT_POSTS_JS = """
+var records = [];
+var articles = document.querySelectorAll("div[role='article']");
+for (var i = 0; i < articles.length; i++) {
+    var article = articles[i];
+    var permalink = article.querySelector("a[href*='/posts/'], a[href*='/permalink/']");
+    var link = article.querySelector("a[href*='/posts/'], a[href*='/permalink/'], a[href*='/groups/']");
+
+    var text = "";
+    var contents = article.querySelectorAll("div[class*='userContent'], div[data-ad-preview*='message']");
+    if (!contents.length) {
+        contents = article.querySelectorAll("div[dir*='auto']");
+    }
+    for (var j = 0; j < contents.length; j++) {
+        var candidate = (contents[j].innerText || "").trim();
+        if (candidate && candidate.length > 10) {
+            text = candidate;
+            break;
+        }
+    }
+
+    var author = article.querySelector("h3[class*='actor'] a, strong") || article.querySelector("a[role='link']");
+    var date = article.querySelector("abbr");
+
+    records.push({
+        permalink: permalink ? permalink.href : "",
+        url: link ? link.href : "",
+        text: text,
+        author: author ? (author.innerText || "").trim() : "",
+        utime: date ? date.getAttribute("data-utime") : null
+    });
+}
+return records;
+"""
+
+# Checks whether the page already shows the newest post from the previous scrape.
+# arguments[0] is the post ID and arguments[1] its Unix timestamp, either may be null.
+KNOWN_POST_JS = r"""
+var postId = arguments[0];
+var utime = arguments[1];
+if (postId) {
+    // Compare whole IDs, so the cursor 123 is not found in a link to post 1234
+    var links = document.querySelectorAll("div[role='article'] a[href*='/posts/'], div[role='article'] a[href*='/permalink/']");
+    for (var i = 0; i < links.length; i++) {
+        var found = /\/posts\/(\d+)|\/permalink\/(\d+)/.exec(links[i].getAttribute("href"));
+        if (found && (found[1] || found[2]) === String(postId)) {
+            return true;
+        }
+    }
+}
+if (utime) {
+    var dates = document.querySelectorAll("div[role='article'] abbr[data-utime]");
+    for (var i = 0; i < dates.length; i++) {
+        if (parseInt(dates[i].getAttribute("data-utime"), 10) <= utime) {
+            return true;
+        }
+    }
+}
+return false;
+"""
+
+
+def cursor_timestamp(cursor):
+    """Unix timestamp of a cursor's post date, as compared with data-utime"""
+    return int(cursor['post_date'].timestamp()) if cursor.get('post_date') else None
+
+
+def build_posts(records):
+    """
+    Convert raw article records into post dictionaries
+    
+    Args:
+        records (list): Dictionaries returned by EXTRACT_POSTS_JS, html_parser or
+            network_capture.facebook_payload_records
+        
+    Returns:
+        list: Post dictionaries in the same shape as _extract_posts_webdriver
+    """
+    posts = []
+    for record in records or []:
+        try:
+            # Network records carry the ID; DOM records only have the permalink
+            post_id = record.get('post_id') or ""
+            post_id_match = None if post_id else re.search(r'/posts/(\d+)|/permalink/(\d+)', record.get('permalink') or "")
+            if post_id_match:
+                post_id = post_id_match.group(1) or post_id_match.group(2)
+            
+            post_date = None
+            if record.get('utime'):
+                post_date = datetime.fromtimestamp(int(record['utime']))
+            
+            # Only add posts with text content
+            if record.get('text'):
+                posts.append({
+                    'id': post_id,
+                    'url': record.get('url') or "",
+                    'text': record['text'],
+                    'author': record.get('author') or "",
+                    'date': post_date,
+                    'source_type': 'facebook'
+                })
+        except Exception as e:
+            logger.error(f"Error building post from record: {str(e)}")
+    
+    return posts
+
 class FacebookScraper:
     """
     Scraper for Facebook Groups to extract posts and check for keywords
     """
     
-    def __init__(self, headless=BROWSER_HEADLESS):
-        """Initialize the Facebook scraper with browser options"""
+    def __init__(self, headless=BROWSER_HEADLESS, extraction_mode=SCRAPER_EXTRACTION_MODE, resource_policy=None,
+                 profile_dir=None, session_manager=None, rate_limiter=None):
+        """
+        Initialize the Facebook scraper with browser options
+        
+        Args:
+            profile_dir (str): Persistent Chrome profile to reuse between runs,
+                see app.scraper.profiles.profile_dir. None starts a fresh profile.
+            session_manager (SessionManager): Shared cache of verified logins; without
+                one the login is checked before every scrape
+            rate_limiter (RateLimiter): Shared request budget every page load and scroll
+                waits for; None sends requests unthrottled
+        """
         self.headless = headless
+        self.extraction_mode = extraction_mode
+        self.resource_policy = resource_policy or ResourcePolicy.from_settings()
         self.driver = None
+        self._prober = None
+        self.profile_dir = profile_dir
+        self.session_manager = session_manager
+        self.rate_limiter = rate_limiter
+        self.scrape_stats = {}
+        self.startup_stats = {}
+        self._network_messages = []
+        self.last_cursor = None
+        self.last_outcome = None  # How the last scrape went, for the concurrency controller
         self.cookies_file = os.path.join(os.path.dirname(__file__), '..', '..', 'facebook_cookies.json')
         
     def _setup_driver(self):
@@ -40,14 +181,27 @@ class FacebookScraper:
             options.add_argument('--disable-infobars')
             options.add_argument('--window-size=1920,1080')
             options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/90.0.4430.212 Safari/537.36')
+            self.resource_policy.apply_to_options(options)
+            warm = apply_profile(options, self.profile_dir) if self.profile_dir else False
             
+            started = time.perf_counter()
             self.driver = webdriver.Chrome(options=options)
-            self.driver.implicitly_wait(10)
+            self.driver.implicitly_wait(BROWSER_IMPLICIT_WAIT_SECONDS)
+            self.resource_policy.apply_to_driver(self.driver)
+            self.startup_stats = {'warm_profile': warm, 'driver_seconds': time.perf_counter() - started}
+            logger.info(f"Started Chrome in {self.startup_stats['driver_seconds']:.2f}s with a {'warm' if warm else 'fresh'} profile")
             logger.info("WebDriver set up successfully")
         except Exception as e:
             logger.error(f"Error setting up WebDriver: {str(e)}")
             raise
         
+    @property
+    def prober(self):
+        """Fast-fail element prober bound to the current driver"""
+        if self._prober is None or self._prober.driver is not self.driver:
+            self._prober = ElementProber(self.driver)
+        return self._prober
+    
     def _load_cookies(self):
         """Load Facebook cookies from file if available"""
         if os.path.exists(self.cookies_file):
@@ -77,20 +231,44 @@ class FacebookScraper:
             logger.error(f"Error saving cookies: {str(e)}")
     
     def login(self):
-        """Log in to Facebook using credentials or cookies"""
+        """
+        Log in to Facebook, reusing the browser profile's session when it is still valid
+        
+        Returns:
+            bool: True if logged in
+        """
+        started = time.perf_counter()
+        logged_in = self._login()
+        self.startup_stats['login_seconds'] = time.perf_counter() - started
+        logger.info(f"Facebook login took {self.startup_stats['login_seconds']:.2f}s"
+                    f" (browser start {self.startup_stats.get('driver_seconds', 0):.2f}s)")
+        if logged_in and self.session_manager:
+            self.session_manager.mark_valid(self.session_key)
+        return logged_in
+    
+    def _login(self):
+        """Log in to Facebook using the profile's session, cookies or credentials"""
         try:
             if not self.driver:
                 self._setup_driver()
             
+            self._throttle('navigate')
+            
             self.driver.get('https://www.facebook.com/')
             logger.info("Navigating to Facebook login page")
             
+            # A warm profile is usually still logged in
+            if self.startup_stats.get('warm_profile') and self._is_logged_in():
+                logger.info("Logged in using the browser profile")
+                return True
+            
             # Try to use cookies first
             if FACEBOOK_COOKIES:
                 try:
                     cookies = json.loads(FACEBOOK_COOKIES)
                     for cookie in cookies:
                         self.driver.add_cookie(cookie)
+                    self._throttle('navigate')
                     self.driver.refresh()
                     logger.info("Logged in using provided cookies")
                     return True
@@ -99,6 +277,7 @@ class FacebookScraper:
             
             # Try to load cookies from file
             if self._load_cookies():
+                self._throttle('navigate')
                 self.driver.refresh()
                 # Check if login was successful
                 if self._is_logged_in():
@@ -109,8 +288,8 @@ class FacebookScraper:
             if FACEBOOK_EMAIL and FACEBOOK_PASSWORD:
                 try:
                     # Find email and password fields
-                    email_field = WebDriverWait(self.driver, 10).until(
-                        EC.presence_of_element_located((By.ID, "email"))
+                    email_field = self.prober.wait_until(
+                        EC.presence_of_element_located((By.ID, "email")), 10, 'login_form'
                     )
                     password_field = self.driver.find_element(By.ID, "pass")
                     
@@ -135,12 +314,15 @@ class FacebookScraper:
                         # Check for captcha
                         if "captcha" in self.driver.page_source.lower() or "security check" in self.driver.page_source.lower():
                             handle_captcha_error("Facebook", "facebook")
+                            self.last_outcome = CAPTCHA
                         else:
                             handle_auth_failure("Facebook", "facebook", "Login verification failed")
+                            self.last_outcome = AUTH_FAILURE
                         return False
                 except Exception as e:
                     logger.error(f"Login error: {str(e)}")
                     handle_auth_failure("Facebook", "facebook", str(e))
+                    self.last_outcome = AUTH_FAILURE
                     return False
             else:
                 logger.error("No login credentials provided")
@@ -151,100 +333,245 @@ class FacebookScraper:
     
     def _is_logged_in(self):
         """Check if the user is logged in to Facebook"""
-        try:
-            # Look for elements that are only visible when logged in
-            self.driver.find_element(By.XPATH, "//div[@aria-label='Your profile' or @aria-label='Account' or contains(@aria-label, 'profile')]")
-            return True
-        except NoSuchElementException:
-            return False
+        # Look for elements that are only visible when logged in
+        return self.prober.exists(By.XPATH, "//div[@aria-label='Your profile' or @aria-label='Account' or contains(@aria-label, 'profile')]")
     
-    def scrape_group(self, group_url, keywords, max_posts=20):
+    @property
+    def session_key(self):
+        """Key of this scraper's login in the shared session cache"""
+        return ('facebook', FACEBOOK_EMAIL)
+    
+    def _ensure_logged_in(self):
+        """Log in if needed, trusting the shared session cache while it is fresh"""
+        if self.session_manager:
+            return self.session_manager.ensure(self)
+        return self._is_logged_in() or self.login()
+    
+    def _throttle(self, action):
+        """Wait for the shared rate limiter before a page load or scroll"""
+        if self.rate_limiter:
+            seconds = self.rate_limiter.wait(self.session_key, action)
+            if seconds:
+                self.prober.record_wait('throttle', seconds)
+    
+    def _session_expired(self):
+        """Check whether Facebook sent the browser back to its login page"""
+        current_url = self.driver.current_url or ""
+        return '/login' in current_url or '/checkpoint' in current_url
+    
+    def scrape_group(self, group_url, keywords, max_posts=20, cursor=None):
         """
         Scrape a Facebook group for posts containing specified keywords
         
         Args:
             group_url (str): URL of the Facebook group
-            keywords (list): List of keywords to search for
+            keywords (list or KeywordMatcher): Keywords to search for, or a matcher
+                compiled once for the whole job
             max_posts (int): Maximum number of posts to scrape
+            cursor (dict): Newest post seen by the previous scrape; scrolling
+                stops once it is on the page and only newer posts are matched.
+                The updated cursor is left in self.last_cursor.
             
         Returns:
             list: List of dictionaries containing matched posts
         """
+        # Extract group name from URL for logging
+        group_name = group_url.split('/')[-1] if '/' in group_url else group_url
+        
         try:
-            if not self.driver:
-                self._setup_driver()
-                
-            if not self._is_logged_in():
-                if not self.login():
-                    logger.error("Failed to log in to Facebook")
-                    return []
-            
-            # Extract group name from URL for logging
-            group_name = group_url.split('/')[-1] if '/' in group_url else group_url
-            
-            # Navigate to the group
-            self.driver.get(group_url)
-            logger.info(f"Navigating to Facebook group: {group_url}")
-            log_scraper_activity(group_name, "facebook", "navigate", "success")
-            
-            # Wait for posts to load
-            try:
-                WebDriverWait(self.driver, 20).until(
-                    EC.presence_of_element_located((By.XPATH, "//div[@role='article']"))
-                )
-            except TimeoutException:
-                logger.error(f"Timeout waiting for posts to load in group: {group_url}")
-                log_scraper_activity(group_name, "facebook", "load_posts", "timeout")
+            if not self._load_group(group_url, group_name, max_posts, cursor):
                 return []
             
-            # Scroll to load more posts
-            self._scroll_to_load_posts(max_posts)
-            
-            # Extract posts
+            # Extract posts and skip the ones seen by the previous scrape
             posts = self._extract_posts()
-            log_scraper_activity(group_name, "facebook", "extract_posts", f"found {len(posts)} posts")
+            self.last_cursor = advance_cursor(posts, cursor)
+            posts = filter_new_posts(posts, cursor)
+            log_scraper_activity(group_name, "facebook", "extract_posts", f"found {len(posts)} new posts")
             
-            # Match posts against keywords
+            # Match posts against every keyword, one scan per post
+            matcher = compile_keywords(keywords)
             matched_posts = []
             for post in posts[:max_posts]:
-                for keyword in keywords:
-                    if self._match_keyword(post['text'], keyword):
-                        post['matched_keyword'] = keyword
-                        matched_posts.append(post)
-                        log_scraper_activity(group_name, "facebook", "match", f"keyword '{keyword}' matched in post {post.get('id', 'unknown')}")
-                        break  # Stop checking keywords once a match is found
+                keyword = match_post(matcher, post)
+                if keyword:
+                    matched_posts.append(post)
+                    log_scraper_activity(group_name, "facebook", "match", f"keyword '{keyword}' matched in post {post.get('id', 'unknown')}")
             
             logger.info(f"Found {len(matched_posts)} posts matching keywords in group: {group_url}")
             return matched_posts
             
         except Exception as e:
+            self.last_outcome = TIMEOUT if isinstance(e, TimeoutException) else None
             logger.error(f"Error scraping Facebook group {group_url}: {str(e)}")
-            log_scraper_activity(group_name if 'group_name' in locals() else "unknown", "facebook", "scrape", f"error: {str(e)}")
+            log_scraper_activity(group_name, "facebook", "scrape", f"error: {str(e)}")
             return []
+        finally:
+            self._finish_scrape(group_name)
+    
+    def snapshot_group(self, group_url, max_posts=20, cursor=None):
+        """
+        Load a Facebook group and return its HTML for offline parsing
+        
+        The browser is free for the next source as soon as this returns;
+        parsing, cursor handling and keyword matching happen in parse_pool.
+        
+        Args:
+            group_url (str): URL of the Facebook group
+            max_posts (int): Maximum number of posts to load
+            cursor (dict): Newest post seen by the previous scrape
+            
+        Returns:
+            str: page_source of the loaded group, or None if it could not be loaded
+        """
+        group_name = group_url.split('/')[-1] if '/' in group_url else group_url
+        
+        try:
+            if not self._load_group(group_url, group_name, max_posts, cursor):
+                return None
+            return self.driver.page_source
+        except Exception as e:
+            self.last_outcome = TIMEOUT if isinstance(e, TimeoutException) else None
+            logger.error(f"Error loading Facebook group {group_url}: {str(e)}")
+            log_scraper_activity(group_name, "facebook", "snapshot", f"error: {str(e)}")
+            return None
+        finally:
+            self._finish_scrape(group_name)
+    
+    def _load_group(self, group_url, group_name, max_posts, cursor):
+        """
+        Open a group and scroll until enough posts or already-seen posts are loaded
+        
+        Returns:
+            bool: True if posts are on the page
+        """
+        if not self.driver:
+            self._setup_driver()
+        
+        self.prober.reset()
+        measure_transfer(self.driver)  # Discard traffic from earlier pages
+        self._network_messages = []
+        self.last_cursor = cursor
+        self.last_outcome = SUCCESS
+            
+        if not self._ensure_logged_in():
+            logger.error("Failed to log in to Facebook")
+            if self.last_outcome == SUCCESS:
+                self.last_outcome = AUTH_FAILURE
+            return False
+        
+        # Navigate to the group
+        self._throttle('navigate')
+        self.driver.get(group_url)
+        logger.info(f"Navigating to Facebook group: {group_url}")
+        log_scraper_activity(group_name, "facebook", "navigate", "success")
+        
+        # Wait for posts to load
+        try:
+            self.prober.wait_until(
+                EC.presence_of_element_located((By.XPATH, "//div[@role='article']")), 20, 'load_posts'
+            )
+        except TimeoutException:
+            if self._session_expired():
+                # Trust nothing until the next scrape has checked the login again
+                logger.error(f"Facebook session expired while loading group: {group_url}")
+                # A checkpoint is Facebook's security check, the same signal as a CAPTCHA
+                self.last_outcome = CAPTCHA if '/checkpoint' in (self.driver.current_url or "") else AUTH_FAILURE
+                log_scraper_activity(group_name, "facebook", "load_posts", "session expired")
+                if self.session_manager:
+                    self.session_manager.invalidate(self.session_key)
+                return False
+            logger.error(f"Timeout waiting for posts to load in group: {group_url}")
+            self.last_outcome = TIMEOUT
+            log_scraper_activity(group_name, "facebook", "load_posts", "timeout")
+            return False
+        
+        # Scroll to load more posts
+        self._scroll_to_load_posts(max_posts, cursor)
+        return True
     
-    def _scroll_to_load_posts(self, max_posts):
-        """Scroll down to load more posts"""
+    def _finish_scrape(self, group_name):
+        """Record and log the waits and traffic of the scrape that just ended"""
+        if not self.driver:
+            return
+        self.scrape_stats = self.prober.stats()
+        self.scrape_stats.update(measure_transfer(self.driver, self._network_messages))
+        self._network_messages = []
+        log_scraper_activity(group_name, "facebook", "waits", f"{self.scrape_stats['wait_seconds']:.2f}s spent waiting, scroll steps {self.scrape_stats['scroll_waits']}")
+        log_scraper_activity(group_name, "facebook", "transfer", f"{self.scrape_stats['bytes_downloaded']} bytes in {self.scrape_stats['requests']} requests, {self.scrape_stats['blocked_requests']} blocked")
+    
+    def _scroll_to_load_posts(self, max_posts, cursor=None):
+        """Scroll down to load more posts, stopping early at already-seen content"""
         try:
-            posts_found = 0
             max_scrolls = 10  # Limit scrolling to prevent infinite loops
+            empty_scrolls = 0
+            
+            # Count current posts
+            posts_found = len(self.prober.find_all(By.XPATH, "//div[@role='article']"))
             
             for i in range(max_scrolls):
-                # Count current posts
-                posts = self.driver.find_elements(By.XPATH, "//div[@role='article']")
-                posts_found = len(posts)
                 logger.debug(f"Scroll {i+1}/{max_scrolls}: Found {posts_found} posts")
                 
                 if posts_found >= max_posts:
                     break
+                
+                if cursor and self._reached_cursor(cursor):
+                    logger.debug(f"Scroll {i+1}/{max_scrolls}: Reached already-seen posts")
+                    break
                     
-                # Scroll down
-                self.driver.execute_script("window.scrollBy(0, 1000);")
-                time.sleep(2)  # Wait for new content to load
+                # Scroll down and wait until new posts are attached to the page
+                self._throttle('scroll')
+                result = self.prober.scroll_and_wait("div[role='article']", FACEBOOK_SCROLL_TIMEOUT_SECONDS)
+                posts_found = result['count']
+                
+                # Two timeouts in a row without new posts means the feed has ended
+                empty_scrolls = empty_scrolls + 1 if result['timed_out'] and result['count'] <= result['before'] else 0
+                if empty_scrolls >= 2:
+                    break
         except Exception as e:
             logger.error(f"Error while scrolling: {str(e)}")
     
+    def _reached_cursor(self, cursor):
+        """Check whether the newest post from the previous scrape is loaded"""
+        return bool(self.driver.execute_script(KNOWN_POST_JS, cursor.get('post_id'), cursor_timestamp(cursor)))
+    
     def _extract_posts(self):
         """Extract post data from the current page"""
+        if self.extraction_mode == 'snapshot':
+            return build_posts(facebook_records(self.driver.page_source, self.driver.current_url))
+        
+        if self.extraction_mode == 'network':
+            # The server renders the first page, so its posts are only on the page
+            return merge_posts(self._extract_posts_network(), self._extract_posts_page())
+        
+        return self._extract_posts_page()
+    
+    def _extract_posts_page(self):
+        """Read posts from the rendered page in one script call, or with WebDriver lookups"""
+        if self.extraction_mode in ('script', 'network'):
+            try:
+                started = time.perf_counter()
+                records = self.driver.execute_script(EXTRACT_POSTS_JS)
+                posts = build_posts(records)
+                logger.debug(f"Extracted {len(posts)} posts in {(time.perf_counter() - started) * 1000:.1f} ms")
+                return posts
+            except Exception as e:
+                logger.error(f"Script extraction failed, falling back to WebDriver lookups: {str(e)}")
+        
+        # Missing optional fields must not cost the implicit wait
+        with self.prober.fast_fail():
+            return self._extract_posts_webdriver()
+    
+    def _extract_posts_network(self):
+        """Build posts from the feed's GraphQL responses captured in the performance log"""
+        messages = read_performance_log(self.driver)
+        self._network_messages.extend(messages)  # Still counted by _finish_scrape
+        bodies = capture_responses(self.driver, FACEBOOK_FEED_PATTERNS, messages)
+        posts = build_posts(facebook_payload_records(bodies))
+        logger.debug(f"Extracted {len(posts)} posts from {len(bodies)} feed responses")
+        return posts
+    
+    def _extract_posts_webdriver(self):
+        """Extract post data from the current page with one WebDriver call per field"""
         posts = []
         try:
             post_elements = self.driver.find_elements(By.XPATH, "//div[@role='article']")
@@ -0,0 +1,129 @@
+import re
+from urllib.parse import urljoin
+from bs4 import BeautifulSoup, NavigableString, Tag
+from bs4.element import PreformattedString
+
+# Offline equivalents of the scrapers' EXTRACT_POSTS_JS. They read a page_source
+# snapshot and return the same raw records, so the scrapers' build_posts turns
+# them into the same post dictionaries as live extraction.
+
+PARSER = 'html.parser'
+
+# Elements innerText puts on lines of their own; text in any other element runs on
+BLOCK_TAGS = {
+    'address', 'article', 'aside', 'blockquote', 'dd', 'div', 'dl', 'dt', 'figcaption', 'figure',
+    'footer', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hr', 'li', 'main', 'nav',
+    'ol', 'p', 'pre', 'section', 'table', 'tr', 'ul'
+}
+
+# Elements whose content is never rendered
+HIDDEN_TAGS = {'script', 'style', 'template', 'noscript'}
+
+# Whitespace collapsed by CSS white-space: normal; non-breaking spaces are kept
+COLLAPSIBLE_WHITESPACE = re.compile(r'[ \t\n\r\f]+')
+
+
+def _collect_text(element, parts):
+    """Append an element's text runs to parts, with a newline at every block boundary"""
+    for child in element.children:
+        if isinstance(child, Tag):
+            if child.name in HIDDEN_TAGS:
+                continue
+            if child.name == 'br':
+                parts.append('\n')
+                continue
+            block = child.name in BLOCK_TAGS
+            if block:
+                parts.append('\n')
+            _collect_text(child, parts)
+            if block:
+                parts.append('\n')
+        elif isinstance(child, NavigableString) and not isinstance(child, PreformattedString):
+            parts.append(COLLAPSIBLE_WHITESPACE.sub(' ', child))
+
+
+def _text(element):
+    """Approximate innerText: inline text runs together, block boundaries become newlines"""
+    if element is None:
+        return ""
+    parts = []
+    _collect_text(element, parts)
+    lines = (line.strip(' ') for line in ''.join(parts).split('\n'))
+    return '\n'.join(line for line in lines if line)
+
+
+def _first_long_text(elements):
+    """Return the first text longer than 10 characters, like the scrapers do"""
+    for element in elements:
+        text = _text(element)
+        if text and len(text) > 10:
+            return text
+    return ""
+
+
+def _href(element, base_url):
+    """Absolute link target, like the DOM's element.href"""
+    if element is None or not element.get('href'):
+        return ""
+    return urljoin(base_url or "", element['href'])
+
+
+def facebook_records(html, base_url=None):
+    """
+    Read Facebook group articles from an HTML snapshot
+
+    Args:
+        html (str): page_source of a Facebook group
+        base_url (str): URL the snapshot was taken from, for relative links
+
+    Returns:
+        list: Records in the format returned by facebook_scraper.EXTRACT_POSTS_JS
+    """
+    soup = BeautifulSoup(html or "", PARSER)
+    records = []
+    for article in soup.select("div[role='article']"):
+        permalink = article.select_one("a[href*='/posts/'], a[href*='/permalink/']")
+        link = article.select_one("a[href*='/posts/'], a[href*='/permalink/'], a[href*='/groups/']")
+
+        contents = article.select("div[class*='userContent'], div[data-ad-preview*='message']")
+        if not contents:
+            contents = article.select("div[dir*='auto']")
+
+        author = article.select_one("h3[class*='actor'] a, strong") or article.select_one("a[role='link']")
+        date = article.select_one("abbr")
+
+        records.append({
+            'permalink': _href(permalink, base_url),
+            'url': _href(link, base_url),
+            'text': _first_long_text(contents),
+            'author': _text(author),
+            'utime': date.get('data-utime') if date is not None else None
+        })
+    return records
+
+
+def nextdoor_records(html, base_url=None):
+    """
+    Read Nextdoor feed items from an HTML snapshot
+
+    Args:
+        html (str): page_source of a Nextdoor neighborhood feed
+        base_url (str): URL the snapshot was taken from, for relative links
+
+    Returns:
+        list: Records in the format returned by nextdoor_scraper.EXTRACT_POSTS_JS
+    """
+    soup = BeautifulSoup(html or "", PARSER)
+    records = []
+    for item in soup.select("div[class*='post-list-item']"):
+        link = item.select_one("a[href*='/post/']")
+        author = item.select_one("div[class*='post-byline'] a")
+        date = item.select_one("div[class*='post-byline'] time")
+
+        records.append({
+            'url': _href(link, base_url),
+            'text': _first_long_text(item.select("div[class*='post-content']")),
+            'author': _text(author),
+            'datetime': (date.get('datetime') or _text(date)) if date is not None else None
+        })
+    return records
@@ -0,0 +1,379 @@
+import re
+
+# Words are runs of letters and digits, keeping apostrophes inside words ("don't")
+WORD_PATTERN = re.compile(r"\w+(?:'\w+)*")
+
+# Operators are only recognized in upper case, so "not" in a plain keyword stays text
+LEXER_PATTERN = re.compile(r'\s*(?:(\()|(\))|"([^"]*)"|(NEAR/\d+)\b|(AND|OR|NOT)\b|([^\s()"]+))')
+
+OPERATORS = ('AND', 'OR', 'NOT')
+
+
+def is_query(text):
+    """
+    Check whether a keyword uses the query syntax rather than plain substring matching
+
+    Args:
+        text (str): Keyword text
+
+    Returns:
+        bool: True if the keyword contains quotes, parentheses, a wildcard or an operator
+    """
+    if any(char in text for char in '"()*'):
+        return True
+    return any(word in OPERATORS or re.fullmatch(r'NEAR/\d+', word) for word in text.split())
+
+
+def tokenize(text):
+    """
+    Split lowercased text into words
+
+    Args:
+        text (str): Lowercased text
+
+    Returns:
+        list: (word, start, end) tuples
+    """
+    return [(match.group(), match.start(), match.end()) for match in WORD_PATTERN.finditer(text)]
+
+
+def _lex(text):
+    """Split a query into (kind, value) tokens"""
+    tokens = []
+    position = 0
+    text = text.strip()
+    while position < len(text):
+        match = LEXER_PATTERN.match(text, position)
+        if not match:
+            raise ValueError(f"Unterminated quote in query: {text}")
+        position = match.end()
+        opening, closing, phrase, near, operator, bare = match.groups()
+        if opening:
+            tokens.append(('(', None))
+        elif closing:
+            tokens.append((')', None))
+        elif phrase is not None:
+            tokens.append(('phrase', _words(phrase, text)))
+        elif near:
+            tokens.append(('near', int(near.split('/')[1])))
+        elif operator:
+            tokens.append((operator, None))
+        elif WORD_PATTERN.search(bare) or '*' in bare:
+            tokens.append(('words', _words(bare, text)))
+        # Bare punctuation between terms carries no meaning and is skipped
+    return tokens
+
+
+def _words(fragment, query):
+    """Turn a query fragment into (word, is_prefix) pairs; a trailing * makes a word a prefix"""
+    words = []
+    for part in re.split(r'(\*)', fragment.lower()):
+        if part == '*':
+            if not words or words[-1][1]:
+                raise ValueError(f"Wildcard must follow a word: {query}")
+            words[-1] = (words[-1][0], True)
+        else:
+            words.extend((word, False) for word in WORD_PATTERN.findall(part))
+    if not words:
+        raise ValueError(f"Empty term in query: {query}")
+    return words
+
+
+class _Parser:
+    """
+    Recursive descent parser for keyword queries.
+
+    Precedence from loosest to tightest: OR, AND, NOT, NEAR/n. Adjacent bare
+    words form one phrase, the same as a quoted phrase.
+    """
+
+    def __init__(self, text, leaves):
+        self.text = text
+        self.tokens = _lex(text)
+        self.position = 0
+        self.leaves = leaves
+
+    def parse(self):
+        node = self._or()
+        if self.position < len(self.tokens):
+            raise ValueError(f"Unexpected '{self._describe()}' in query: {self.text}")
+        if not _has_positive_term(node):
+            raise ValueError(f"Query needs at least one term that is not negated: {self.text}")
+        return node
+
+    def _peek(self):
+        return self.tokens[self.position][0] if self.position < len(self.tokens) else None
+
+    def _describe(self):
+        kind, value = self.tokens[self.position]
+        if kind in ('words', 'phrase'):
+            return " ".join(word + ('*' if prefix else '') for word, prefix in value)
+        return f"NEAR/{value}" if kind == 'near' else kind
+
+    def _or(self):
+        children = [self._and()]
+        while self._peek() == 'OR':
+            self.position += 1
+            children.append(self._and())
+        return children[0] if len(children) == 1 else ('or', children)
+
+    def _and(self):
+        children = [self._not()]
+        while self._peek() == 'AND':
+            self.position += 1
+            children.append(self._not())
+        return children[0] if len(children) == 1 else ('and', children)
+
+    def _not(self):
+        if self._peek() == 'NOT':
+            self.position += 1
+            return ('not', self._not())
+        return self._near()
+
+    def _near(self):
+        node = self._primary()
+        while self._peek() == 'near':
+            distance = self.tokens[self.position][1]
+            self.position += 1
+            right = self._primary()
+            if node[0] not in ('term', 'near') or right[0] not in ('term', 'near'):
+                raise ValueError(f"NEAR/{distance} only joins terms and phrases: {self.text}")
+            node = ('near', distance, node, right)
+        return node
+
+    def _primary(self):
+        kind = self._peek()
+        if kind == '(':
+            self.position += 1
+            node = self._or()
+            if self._peek() != ')':
+                raise ValueError(f"Missing closing parenthesis in query: {self.text}")
+            self.position += 1
+            return node
+        if kind in ('words', 'phrase'):
+            words = list(self.tokens[self.position][1])
+            self.position += 1
+            # Bare words run together into one phrase
+            while kind == 'words' and self._peek() == 'words':
+                words.extend(self.tokens[self.position][1])
+                self.position += 1
+            return ('term', self.leaves.setdefault(tuple(words), len(self.leaves)))
+        if kind is None:
+            raise ValueError(f"Query ends unexpectedly: {self.text}")
+        raise ValueError(f"Unexpected '{self._describe()}' in query: {self.text}")
+
+
+def _has_positive_term(node):
+    """Check that a query can only match when some term is present"""
+    kind = node[0]
+    if kind in ('term', 'near'):
+        return True
+    if kind == 'not':
+        return False
+    if kind == 'and':
+        return any(_has_positive_term(child) for child in node[1])
+    return all(_has_positive_term(child) for child in node[1])
+
+
+def check_query(text):
+    """
+    Check that a keyword query is well formed
+
+    Args:
+        text (str): Keyword query
+
+    Raises:
+        ValueError: If the query is malformed, with a message fit for the user
+    """
+    _Parser(text, {}).parse()
+
+
+class QuerySet:
+    """
+    Keyword queries compiled into one evaluation plan.
+
+    Every distinct term of every query becomes a leaf, indexed by its first
+    word (or, for a prefix, by the prefix). A post is tokenized once and
+    each token is looked up in those indexes, which records where every
+    leaf occurs. Only the queries containing a leaf that occurred are then
+    evaluated, from those positions alone.
+
+    Syntax: "quoted phrases" or bare words (adjacent words are a phrase),
+    AND, OR, NOT, a NEAR/n b (at most n words between a and b, either
+    order), clean* (words starting with "clean") and parentheses. Terms
+    match whole words, case-insensitively.
+    """
+
+    def __init__(self, queries):
+        """
+        Compile queries
+
+        Args:
+            queries (list): (keyword index, query text) pairs
+
+        Raises:
+            ValueError: If a query is malformed
+        """
+        leaves = {}
+        self._queries = []
+        for index, text in queries:
+            self._queries.append((index, _Parser(text, leaves).parse()))
+        self._queries.sort(key=lambda query: query[0])
+
+        self._leaves = [None] * len(leaves)
+        for words, leaf in leaves.items():
+            self._leaves[leaf] = words
+
+        # Leaves by the exact first word, and by prefix for wildcard first words
+        self._by_word = {}
+        self._by_prefix = {}
+        for leaf, words in enumerate(self._leaves):
+            word, prefix = words[0]
+            (self._by_prefix if prefix else self._by_word).setdefault(word, []).append(leaf)
+        self._prefix_lengths = sorted({len(prefix) for prefix in self._by_prefix})
+
+        # Queries to evaluate when a leaf occurs, by position in self._queries
+        self._queries_by_leaf = {}
+        for position, (_, node) in enumerate(self._queries):
+            for leaf in _node_leaves(node):
+                self._queries_by_leaf.setdefault(leaf, set()).add(position)
+
+    def __len__(self):
+        return len(self._queries)
+
+    def scan(self, text_lower):
+        """
+        Find where every leaf occurs in one pass over the words
+
+        Args:
+            text_lower (str): Lowercased post text
+
+        Returns:
+            tuple: (words, {leaf: [(first word, end word), ...]})
+        """
+        words = tokenize(text_lower)
+        occurrences = {}
+        by_word, by_prefix, prefix_lengths = self._by_word, self._by_prefix, self._prefix_lengths
+        for position, (word, _, _) in enumerate(words):
+            candidates = list(by_word.get(word, ()))
+            for length in prefix_lengths:
+                if length > len(word):
+                    break
+                candidates.extend(by_prefix.get(word[:length], ()))
+            for leaf in candidates:
+                terms = self._leaves[leaf]
+                end = position + len(terms)
+                if end > len(words):
+                    continue
+                if all(
+                    words[position + offset][0].startswith(term) if prefix else words[position + offset][0] == term
+                    for offset, (term, prefix) in enumerate(terms[1:], 1)
+                ):
+                    occurrences.setdefault(leaf, []).append((position, end))
+        return words, occurrences
+
+    def _candidates(self, occurrences):
+        """Positions in self._queries of the queries that contain an occurring leaf"""
+        positions = set()
+        for leaf in occurrences:
+            positions.update(self._queries_by_leaf.get(leaf, ()))
+        return sorted(positions)
+
+    def first_index(self, text_lower, below=float('inf')):
+        """
+        Return the lowest keyword index among the matching queries
+
+        Args:
+            text_lower (str): Lowercased post text
+            below (int): Only look for keyword indexes lower than this
+
+        Returns:
+            int: Keyword index, or None if no query below the limit matches
+        """
+        _, occurrences = self.scan(text_lower)
+        for position in self._candidates(occurrences):
+            index, node = self._queries[position]
+            if index >= below:
+                break
+            if _evaluate(node, occurrences) is not None:
+                return index
+        return None
+
+    def match_spans(self, text_lower):
+        """
+        Evaluate every query against a post
+
+        Args:
+            text_lower (str): Lowercased post text
+
+        Returns:
+            dict: Keyword index to the sorted (start, end) character spans of its matched terms
+        """
+        words, occurrences = self.scan(text_lower)
+        matches = {}
+        for position in self._candidates(occurrences):
+            index, node = self._queries[position]
+            ranges = _evaluate(node, occurrences)
+            if ranges is not None:
+                matches[index] = sorted({(words[first][1], words[end - 1][2]) for first, end in ranges})
+        return matches
+
+
+def _node_leaves(node):
+    """Leaves used anywhere in a syntax tree"""
+    kind = node[0]
+    if kind == 'term':
+        return {node[1]}
+    if kind == 'near':
+        return _node_leaves(node[2]) | _node_leaves(node[3])
+    if kind == 'not':
+        return _node_leaves(node[1])
+    leaves = set()
+    for child in node[1]:
+        leaves |= _node_leaves(child)
+    return leaves
+
+
+def _evaluate(node, occurrences):
+    """
+    Evaluate a syntax tree against leaf occurrences
+
+    Returns:
+        list: Word ranges of the terms that made it match (empty for a match
+            through NOT alone), or None if it does not match
+    """
+    kind = node[0]
+    if kind == 'term':
+        return occurrences.get(node[1])
+    if kind == 'not':
+        return [] if _evaluate(node[1], occurrences) is None else None
+    if kind == 'and':
+        ranges = []
+        for child in node[1]:
+            child_ranges = _evaluate(child, occurrences)
+            if child_ranges is None:
+                return None
+            ranges.extend(child_ranges)
+        return ranges
+    if kind == 'or':
+        ranges = None
+        for child in node[1]:
+            child_ranges = _evaluate(child, occurrences)
+            if child_ranges is not None:
+                ranges = (ranges or []) + child_ranges
+        return ranges
+
+    # NEAR: pairs of non-overlapping occurrences with at most `distance` words between them
+    _, distance, left, right = node
+    left_ranges = _evaluate(left, occurrences)
+    right_ranges = _evaluate(right, occurrences) if left_ranges else None
+    if not right_ranges:
+        return None
+    ranges = []
+    for left_first, left_end in left_ranges:
+        for right_first, right_end in right_ranges:
+            gap = max(right_first - left_end, left_first - right_end)
+            if 0 <= gap <= distance:
+                ranges.append((left_first, left_end))
+                ranges.append((right_first, right_end))
+    return ranges or None
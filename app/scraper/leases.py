@@ -0,0 +1,212 @@
+import os
+import uuid
+import socket
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import or_, update
+from sqlalchemy.exc import IntegrityError
+
+from app.config.settings import WORKER_ID, LEASE_SECONDS
+from app.models.models import Source, JobStoreOwner
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+
+def default_worker_id():
+    """Name for this process that is unique across hosts and restarts"""
+    return WORKER_ID or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+
+class SourceLeases:
+    """
+    Claims on sources that let several scheduler processes share the work.
+
+    A worker leases the sources it is about to scrape by writing its name
+    and an expiry time on their rows, and other workers skip leased
+    sources. On PostgreSQL the candidates are locked with
+    SELECT ... FOR UPDATE SKIP LOCKED, so workers claiming at the same time
+    get disjoint batches without waiting for each other. Other databases
+    claim with a single UPDATE that re-checks that each source is still
+    free and due, which SQLite runs atomically. A running worker renews its leases
+    with heartbeat(); the leases of a worker that died expire and other
+    workers take the sources over.
+    """
+
+    def __init__(self, owner=None, lease_seconds=LEASE_SECONDS):
+        """
+        Args:
+            owner (str): Name of this worker, see default_worker_id
+            lease_seconds (float): How long a claim lasts without a heartbeat
+        """
+        self.owner = owner or default_worker_id()
+        self.lease = timedelta(seconds=lease_seconds)
+
+    def _available(self, now):
+        """Filter for sources nobody else holds a live lease on"""
+        return or_(Source.lease_owner.is_(None), Source.lease_owner == self.owner, Source.lease_expires_at < now)
+
+    def claim(self, session, platform, limit, due_only=False, exclude=(), now=None):
+        """
+        Lease the next sources of a platform and commit the claim
+
+        Args:
+            session (Session): Database session
+            platform (str): 'facebook' or 'nextdoor'
+            limit (int): Most sources to claim
+            due_only (bool): Only claim sources whose next scrape is due
+            exclude (iterable): IDs of sources not to claim, e.g. ones this job already scraped
+            now (datetime): Current time, for tests
+
+        Returns:
+            list: Claimed Source objects, most overdue first
+        """
+        now = now or datetime.utcnow()
+        order = (Source.next_due_at.isnot(None), Source.next_due_at, Source.id)
+        conditions = [Source.source_type == platform, Source.is_active == True, self._available(now)]
+        if due_only:
+            conditions.append(or_(Source.next_due_at.is_(None), Source.next_due_at <= now))
+        if exclude:
+            conditions.append(Source.id.notin_(list(exclude)))
+        query = session.query(Source).filter(*conditions).order_by(*order).limit(limit)
+        expires_at = now + self.lease
+
+        if session.get_bind().dialect.name == 'postgresql':
+            # Rows locked by a worker claiming at the same time are skipped, not waited for
+            sources = query.with_for_update(skip_locked=True, of=Source).all()
+            taken_over = sum(1 for source in sources if source.lease_owner not in (None, self.owner))
+            for source in sources:
+                source.lease_owner = self.owner
+                source.lease_expires_at = expires_at
+            session.commit()
+        else:
+            candidates = query.with_entities(Source.id, Source.lease_owner).all()
+            if not candidates:
+                return []
+            ids = [source_id for source_id, _ in candidates]
+            taken_over = sum(1 for _, owner in candidates if owner not in (None, self.owner))
+
+            # Re-checking every condition in the UPDATE drops sources another worker
+            # claimed, or even scraped and released, since the SELECT
+            session.execute(
+                update(Source)
+                .where(Source.id.in_(ids), *conditions)
+                .values(lease_owner=self.owner, lease_expires_at=expires_at)
+                .execution_options(synchronize_session=False)
+            )
+            session.commit()
+            sources = session.query(Source).filter(Source.id.in_(ids), Source.lease_owner == self.owner).order_by(*order).all()
+
+        if taken_over:
+            logger.warning(f"Took over {taken_over} {platform} sources from workers whose leases expired")
+        return sources
+
+    def heartbeat(self, session, now=None):
+        """
+        Extend every lease this worker still holds; the caller commits
+
+        Returns:
+            int: Number of leases renewed
+        """
+        now = now or datetime.utcnow()
+        result = session.execute(
+            update(Source)
+            .where(Source.lease_owner == self.owner)
+            .values(lease_expires_at=now + self.lease)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount
+
+    def release(self, session, source_ids=None):
+        """
+        Give up leases so other workers may claim the sources; the caller commits
+
+        Leases another worker has taken over in the meantime are left alone.
+
+        Args:
+            session (Session): Database session
+            source_ids (list): Sources to release, or None for every lease this worker holds
+
+        Returns:
+            int: Number of leases released
+        """
+        statement = update(Source).where(Source.lease_owner == self.owner)
+        if source_ids is not None:
+            if not source_ids:
+                return 0
+            statement = statement.where(Source.id.in_(list(source_ids)))
+        result = session.execute(
+            statement.values(lease_owner=None, lease_expires_at=None).execution_options(synchronize_session=False)
+        )
+        return result.rowcount
+
+
+class JobStoreLease:
+    """
+    Claim on a scheduler job store table.
+
+    APScheduler 3 does not support several running schedulers on one job
+    store: each of them runs every job, and they race to update the saved
+    run times. A worker only keeps its schedule in the table while it holds
+    this lease. It renews the lease along with its source leases, and the
+    lease of a worker that died expires after lease_seconds.
+    """
+
+    def __init__(self, table_name, owner=None, lease_seconds=LEASE_SECONDS):
+        """
+        Args:
+            table_name (str): Job store table
+            owner (str): Name of this worker, see default_worker_id
+            lease_seconds (float): How long the claim lasts without being renewed
+        """
+        self.table_name = table_name
+        self.owner = owner or default_worker_id()
+        self.lease = timedelta(seconds=lease_seconds)
+
+    def claim(self, session, now=None):
+        """
+        Take or renew the lease and commit the claim
+
+        Args:
+            session (Session): Database session
+            now (datetime): Current time, for tests
+
+        Returns:
+            bool: True if this worker holds the table, False if another running worker does
+        """
+        now = now or datetime.utcnow()
+        result = session.execute(
+            update(JobStoreOwner)
+            .where(
+                JobStoreOwner.table_name == self.table_name,
+                or_(JobStoreOwner.owner == self.owner, JobStoreOwner.expires_at < now)
+            )
+            .values(owner=self.owner, expires_at=now + self.lease)
+            .execution_options(synchronize_session=False)
+        )
+        session.commit()
+        if result.rowcount == 1:
+            return True
+        if session.query(JobStoreOwner.id).filter_by(table_name=self.table_name).first():
+            return False
+
+        session.add(JobStoreOwner(table_name=self.table_name, owner=self.owner, expires_at=now + self.lease))
+        try:
+            session.commit()
+        except IntegrityError:
+            # Another worker claimed the table first
+            session.rollback()
+            return False
+        return True
+
+    def release(self, session):
+        """
+        Give up the lease so another worker may use the table; the caller commits
+
+        Returns:
+            int: Number of leases released
+        """
+        return session.query(JobStoreOwner).filter_by(
+            table_name=self.table_name, owner=self.owner
+        ).delete(synchronize_session=False)
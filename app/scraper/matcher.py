@@ -0,0 +1,249 @@
+import logging
+from collections import deque, namedtuple
+from functools import lru_cache
+
+from app.scraper.keyword_query import QuerySet, is_query, check_query
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# A keyword found in a post: the keyword as configured and where it occurs
+Hit = namedtuple('Hit', ['keyword', 'start', 'end'])
+
+# Every occurrence of one keyword in a post, as (start, end) offsets
+KeywordMatch = namedtuple('KeywordMatch', ['keyword', 'spans'])
+
+# Below this many keywords CPython's C substring search beats a Python-level
+# scan, so first_match checks the lowercased keywords one by one instead
+AUTOMATON_MIN_KEYWORDS = 64
+
+NO_MATCH = float('inf')
+
+
+class KeywordMatcher:
+    """
+    Case-insensitive multi-keyword matcher (Aho-Corasick).
+
+    The active keywords are compiled once into a single automaton, so each
+    post is lowercased once and scanned once no matter how many keywords
+    there are. Matching is plain substring matching, the same as the
+    scrapers' _match_keyword.
+
+    The automaton is a full transition table, so the scan never follows
+    failure links; at 1000 keywords it takes a few megabytes.
+
+    Keywords written in the query syntax (see keyword_query.QuerySet) are
+    compiled separately into one evaluation plan and checked in a single
+    pass over the post's words; find_all only reports plain keywords.
+
+    Offsets refer to the lowercased text, which lines up with the original
+    text except for the rare characters whose lowercase form has a
+    different length.
+    """
+
+    def __init__(self, keywords):
+        """
+        Compile keywords into the automaton
+
+        Args:
+            keywords (list): Keyword texts; empty ones never match, and
+                malformed queries are matched as plain text
+        """
+        self.keywords = list(keywords)
+        self._lengths = [len(keyword.lower()) for keyword in self.keywords]
+
+        # Split off the queries; the rest are plain substrings
+        queries = []
+        plain = set()
+        for index, keyword in enumerate(self.keywords):
+            if not keyword:
+                continue
+            if is_query(keyword):
+                try:
+                    check_query(keyword)
+                    queries.append((index, keyword))
+                    continue
+                except ValueError as e:
+                    logger.warning(f"Matching malformed keyword query as plain text: {str(e)}")
+            plain.add(index)
+        self._queries = QuerySet(queries) if queries else None
+        self._lowered = [(index, self.keywords[index].lower()) for index in sorted(plain)]
+
+        # Trie of the lowercased plain keywords; duplicates share a node
+        goto = [{}]
+        outputs = [[]]
+        for index, keyword in enumerate(self.keywords):
+            if index not in plain:
+                continue
+            node = 0
+            for char in keyword.lower():
+                if char not in goto[node]:
+                    goto.append({})
+                    outputs.append([])
+                    goto[node][char] = len(goto) - 1
+                node = goto[node][char]
+            outputs[node].append(index)
+
+        # Breadth-first failure links folded into a full transition table;
+        # each node also reports the keywords of its failure chain
+        fail = [0] * len(goto)
+        transitions = [dict(goto[0])] + [None] * (len(goto) - 1)
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            transitions[node] = dict(transitions[fail[node]])
+            transitions[node].update(goto[node])
+            outputs[node].extend(outputs[fail[node]])
+            for char, child in goto[node].items():
+                fail[child] = transitions[fail[node]].get(char, 0)
+                queue.append(child)
+
+        self._transitions = transitions
+        self._out = [tuple(sorted(indexes)) for indexes in outputs]
+        self._best = [indexes[0] if indexes else NO_MATCH for indexes in self._out]
+
+    def __len__(self):
+        return len(self.keywords)
+
+    def __reduce__(self):
+        # Ship only the keywords to parse pool workers, which keep compiled copies
+        return (_cached_matcher, (tuple(self.keywords),))
+
+    def find_all(self, text):
+        """
+        Find every occurrence of every keyword
+
+        Args:
+            text (str): Post text
+
+        Returns:
+            list: Hit tuples ordered by end offset, then keyword order
+        """
+        transitions, out, lengths = self._transitions, self._out, self._lengths
+        hits = []
+        node = 0
+        for position, char in enumerate((text or "").lower()):
+            node = transitions[node].get(char, 0)
+            for index in out[node]:
+                hits.append(Hit(self.keywords[index], position + 1 - lengths[index], position + 1))
+        return hits
+
+    def match_all(self, text):
+        """
+        Return every keyword found in a post with all of its spans
+
+        Args:
+            text (str): Post text
+
+        Returns:
+            list: KeywordMatch tuples in the configured keyword order, so the
+                first one is the keyword first_match would return
+        """
+        if not text:
+            return []
+        text_lower = text.lower()
+
+        spans_by_index = {}
+        if len(self._lowered) < AUTOMATON_MIN_KEYWORDS:
+            for index, keyword_lower in self._lowered:
+                start = text_lower.find(keyword_lower)
+                while start != -1:
+                    spans_by_index.setdefault(index, []).append((start, start + len(keyword_lower)))
+                    start = text_lower.find(keyword_lower, start + 1)
+        else:
+            transitions, out, lengths = self._transitions, self._out, self._lengths
+            node = 0
+            for position, char in enumerate(text_lower):
+                node = transitions[node].get(char, 0)
+                for index in out[node]:
+                    spans_by_index.setdefault(index, []).append((position + 1 - lengths[index], position + 1))
+
+        if self._queries:
+            spans_by_index.update(self._queries.match_spans(text_lower))
+        return [KeywordMatch(self.keywords[index], spans_by_index[index]) for index in sorted(spans_by_index)]
+
+    def first_match(self, text):
+        """
+        Return the keyword a post is attributed to
+
+        Like the scrapers' keyword loop, this is the earliest keyword in the
+        configured order that occurs anywhere in the text, not the one that
+        occurs first in the text.
+
+        Args:
+            text (str): Post text
+
+        Returns:
+            str: The matching keyword, or None
+        """
+        if not text:
+            return None
+        text_lower = text.lower()
+
+        best = NO_MATCH
+        if len(self._lowered) < AUTOMATON_MIN_KEYWORDS:
+            for index, keyword_lower in self._lowered:
+                if keyword_lower in text_lower:
+                    best = index
+                    break
+        else:
+            transitions, best_at = self._transitions, self._best
+            node = 0
+            for char in text_lower:
+                node = transitions[node].get(char, 0)
+                if best_at[node] < best:
+                    best = best_at[node]
+                    if best == 0:
+                        break
+
+        # A query configured before the best plain keyword takes precedence
+        if self._queries and best > 0:
+            index = self._queries.first_index(text_lower, below=best)
+            if index is not None:
+                best = index
+        return self.keywords[best] if best != NO_MATCH else None
+
+
+@lru_cache(maxsize=8)
+def _cached_matcher(keywords):
+    """Compile each version of the keyword set once per process"""
+    return KeywordMatcher(keywords)
+
+
+def compile_keywords(keywords):
+    """
+    Return a matcher for keywords, reusing one that is already compiled
+
+    Args:
+        keywords (list or KeywordMatcher): Keyword texts or a compiled matcher
+
+    Returns:
+        KeywordMatcher: Matcher for the keywords
+    """
+    if isinstance(keywords, KeywordMatcher):
+        return keywords
+    return _cached_matcher(tuple(keywords or []))
+
+
+def match_post(matcher, post):
+    """
+    Tag a post with every keyword it matches
+
+    Sets post['matched_keywords'] to a list of {'keyword', 'spans'} dictionaries
+    and post['matched_keyword'] to the first of them.
+
+    Args:
+        matcher (KeywordMatcher): Compiled keywords
+        post (dict): Post dictionary with a 'text' entry
+
+    Returns:
+        str: The first matched keyword, or None if nothing matched
+    """
+    matches = matcher.match_all(post['text'])
+    if not matches:
+        return None
+    post['matched_keyword'] = matches[0].keyword
+    post['matched_keywords'] = [
+        {'keyword': match.keyword, 'spans': [list(span) for span in match.spans]} for match in matches
+    ]
+    return matches[0].keyword
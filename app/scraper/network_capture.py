@@ -0,0 +1,235 @@
+import json
+import base64
+import logging
+from datetime import datetime, timezone
+from fnmatch import fnmatch
+
+from app.scraper.resources import read_performance_log
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# XHR endpoints that carry feed data
+FACEBOOK_FEED_PATTERNS = ['*/api/graphql/*', '*/api/graphql']
+NEXTDOOR_FEED_PATTERNS = ['*/api/gql/*']
+
+# Prefix Facebook puts in front of some JSON responses to stop them being run as scripts
+JSON_GUARD = 'for (;;);'
+
+
+def capture_responses(driver, url_patterns, messages=None):
+    """
+    Fetch the bodies of finished responses whose URL matches a pattern
+
+    Args:
+        driver (WebDriver): Chrome driver started with performance logging
+        url_patterns (list): Glob patterns of feed endpoints
+        messages (list): Performance log messages; read from the driver if not given
+
+    Returns:
+        list: Response bodies as text, in the order the requests were made
+    """
+    if messages is None:
+        messages = read_performance_log(driver)
+
+    urls = {}
+    finished = set()
+    for message in messages:
+        params = message.get('params', {})
+        if message.get('method') == 'Network.responseReceived':
+            url = params.get('response', {}).get('url', '')
+            if any(fnmatch(url, pattern) for pattern in url_patterns):
+                urls[params.get('requestId')] = url
+        elif message.get('method') == 'Network.loadingFinished':
+            finished.add(params.get('requestId'))
+
+    bodies = []
+    for request_id, url in urls.items():
+        if request_id not in finished:
+            continue
+        try:
+            response = driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
+            body = response.get('body', '')
+            if response.get('base64Encoded'):
+                body = base64.b64decode(body).decode('utf-8', errors='replace')
+            bodies.append(body)
+        except Exception as e:
+            # Bodies are dropped once the page navigates away or the buffer is full
+            logger.debug(f"Response body unavailable for {url}: {str(e)}")
+    return bodies
+
+
+def load_payloads(body):
+    """
+    Decode a feed response into JSON objects
+
+    Handles the for (;;); guard and responses that stream one JSON object per line.
+
+    Returns:
+        list: Decoded objects; undecodable lines are skipped
+    """
+    body = (body or '').strip()
+    if body.startswith(JSON_GUARD):
+        body = body[len(JSON_GUARD):]
+    try:
+        return [json.loads(body)]
+    except ValueError:
+        pass
+
+    payloads = []
+    for line in body.splitlines():
+        try:
+            payloads.append(json.loads(line))
+        except ValueError:
+            continue
+    return payloads
+
+
+def _find(value, key):
+    """Return the first value stored under key anywhere in a JSON structure"""
+    if isinstance(value, dict):
+        if key in value:
+            return value[key]
+        children = value.values()
+    elif isinstance(value, list):
+        children = value
+    else:
+        return None
+    for child in children:
+        found = _find(child, key)
+        if found is not None:
+            return found
+    return None
+
+
+def _nodes(value, is_post):
+    """Yield the outermost dictionaries for which is_post is true"""
+    if isinstance(value, dict):
+        if is_post(value):
+            yield value
+            return
+        children = value.values()
+    elif isinstance(value, list):
+        children = value
+    else:
+        return
+    for child in children:
+        yield from _nodes(child, is_post)
+
+
+def _unique(records, key):
+    """Drop records whose key was already seen, keeping feed order"""
+    seen = set()
+    unique = []
+    for record in records:
+        if record[key] and record[key] in seen:
+            continue
+        seen.add(record[key])
+        unique.append(record)
+    return unique
+
+
+def merge_posts(network_posts, page_posts):
+    """
+    Combine posts built from feed responses with the posts read from the page
+
+    The first page of a feed is rendered by the server and never passes
+    through a feed request, so neither list has every post. Posts are
+    de-duplicated by ID, preferring the network copy. Page posts keep their
+    feed order, and posts only seen in responses follow in response order.
+    When every post is dated the result is ordered newest first, like the feed.
+
+    Args:
+        network_posts (list): Post dictionaries from captured responses
+        page_posts (list): Post dictionaries from the rendered page, in feed order
+
+    Returns:
+        list: Every post once
+    """
+    from_network = {post['id']: post for post in network_posts if post.get('id')}
+    seen = set()
+    merged = []
+    for post in list(page_posts) + list(network_posts):
+        post_id = post.get('id')
+        if post_id:
+            if post_id in seen:
+                continue
+            seen.add(post_id)
+            post = from_network.get(post_id, post)
+        merged.append(post)
+    if all(post.get('date') for post in merged):
+        merged.sort(key=lambda post: post['date'], reverse=True)
+    return merged
+
+
+def _is_facebook_story(node):
+    """Stories are the nodes with a post_id; attached stories inside them are skipped"""
+    return isinstance(node.get('post_id'), str)
+
+
+def facebook_payload_records(bodies):
+    """
+    Read group feed stories from Facebook GraphQL responses
+
+    Args:
+        bodies (list): Response bodies from capture_responses
+
+    Returns:
+        list: Records for facebook_scraper.build_posts
+    """
+    records = []
+    for body in bodies:
+        for payload in load_payloads(body):
+            for story in _nodes(payload, _is_facebook_story):
+                message = _find(story, 'message')
+                actors = story.get('actors') or _find(story, 'actors') or []
+                url = story.get('url') or story.get('permalink_url') or ""
+                records.append({
+                    'post_id': story['post_id'],
+                    'permalink': url,
+                    'url': url,
+                    'text': (message.get('text') if isinstance(message, dict) else message) or "",
+                    'author': actors[0].get('name', "") if actors and isinstance(actors[0], dict) else "",
+                    'utime': _find(story, 'creation_time')
+                })
+    return _unique(records, 'post_id')
+
+
+def _iso_datetime(value):
+    """Normalize a Nextdoor timestamp to the format of the time element's datetime attribute"""
+    if isinstance(value, dict):
+        value = value.get('asDateTime') or value.get('epochSeconds') or value.get('epochMillis')
+    if isinstance(value, (int, float)):
+        seconds = value / 1000.0 if value > 10 ** 11 else value
+        return datetime.fromtimestamp(seconds, tz=timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+    return value
+
+
+def _is_nextdoor_post(node):
+    """Feed posts are the nodes with a text body and an author or creation time"""
+    return isinstance(node.get('body'), str) and ('author' in node or 'createdAt' in node)
+
+
+def nextdoor_payload_records(bodies):
+    """
+    Read feed posts from Nextdoor GraphQL responses
+
+    Args:
+        bodies (list): Response bodies from capture_responses
+
+    Returns:
+        list: Records for nextdoor_scraper.build_posts
+    """
+    records = []
+    for body in bodies:
+        for payload in load_payloads(body):
+            for post in _nodes(payload, _is_nextdoor_post):
+                author = post.get('author') or {}
+                records.append({
+                    'post_id': str(post.get('legacyId') or post.get('id') or ""),
+                    'url': post.get('permalinkUrl') or post.get('shareLink') or post.get('url') or "",
+                    'text': post['body'],
+                    'author': (author.get('displayName') or author.get('name') or "") if isinstance(author, dict) else str(author),
+                    'datetime': _iso_datetime(post.get('createdAt'))
+                })
+    return _unique(records, 'post_id')
@@ -1,30 +1,171 @@
 import os
 import logging
-from datetime import datetime
+from datetime import datetime, timezone
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 import json
 import time
 import re
 
-from app.config.settings import BROWSER_HEADLESS, NEXTDOOR_EMAIL, NEXTDOOR_PASSWORD, NEXTDOOR_COOKIES
+from app.config.settings import (
+    BROWSER_HEADLESS, BROWSER_IMPLICIT_WAIT_SECONDS, NEXTDOOR_EMAIL, NEXTDOOR_PASSWORD,
+    NEXTDOOR_COOKIES, NEXTDOOR_SCROLL_TIMEOUT_SECONDS, SCRAPER_EXTRACTION_MODE
+)
+from app.scraper.probing import ElementProber
+from app.scraper.resources import ResourcePolicy, measure_transfer, read_performance_log
+from app.scraper.network_capture import capture_responses, merge_posts, nextdoor_payload_records, NEXTDOOR_FEED_PATTERNS
+from app.scraper.profiles import apply_profile
+from app.scraper.html_parser import nextdoor_records
+from app.scraper.cursor import filter_new_posts, advance_cursor
+from app.scraper.matcher import compile_keywords, match_post
+from app.scraper.concurrency import SUCCESS, TIMEOUT, CAPTCHA, AUTH_FAILURE
 
 # Configure logger
 logger = logging.getLogger(__name__)
 
+# Reads every post on the page in a single WebDriver round trip.
+# Mirrors the XPath lookups in _extract_posts_webdriver.
+EXTRACT_POSTS_JS = """
+var records = [];
+var items = document.querySelectorAll("div[class*='post-list-item']");
+for (var i = 0; i < items.length; i++) {
+    var item = items[i];
+    var link = item.querySelector("a[href*='/post/']");
+
+    var text = "";
+    var contents = item.querySelectorAll("div[class*='post-content']");
+    for (var j = 0; j < contents.length; j++) {
+        var candidate = (contents[j].innerText || "").trim();
+        if (candidate && candidate.length > 10) {
+            text = candidate;
+            break;
+        }
+    }
+
+    var author = item.querySelector("div[class*='post-byline'] a");
+    var date = item.querySelector("div[class*='post-byline'] time");
+
+    records.push({
+        url: link ? link.href : "",
+        text: text,
+        author: author ? (author.innerText || "").trim() : "",
+        datetime: date ? (date.getAttribute("datetime") || date.innerText) : null
+    });
+}
+return records;
+"""
+
+# Checks whether the page already shows the newest post from the previous scrape.
+# arguments[0] is the post ID and arguments[1] its Unix timestamp, either may be null.
+KNOWN_POST_JS = r"""
+var postId = arguments[0];
+var utime = arguments[1];
+if (postId) {
+    // Compare whole IDs, so the cursor 123 is not found in a link to post 1234
+    var links = document.querySelectorAll("div[class*='post-list-item'] a[href*='/post/']");
+    for (var i = 0; i < links.length; i++) {
+        var found = /\/post\/(\d+)/.exec(links[i].getAttribute("href"));
+        if (found && found[1] === String(postId)) {
+            return true;
+        }
+    }
+}
+if (utime) {
+    var dates = document.querySelectorAll("div[class*='post-list-item'] div[class*='post-byline'] time[datetime]");
+    for (var i = 0; i < dates.length; i++) {
+        var parsed = Date.parse(dates[i].getAttribute("datetime"));
+        if (!isNaN(parsed) && parsed / 1000 <= utime) {
+            return true;
+        }
+    }
+}
+return false;
+"""
+
+
+def cursor_timestamp(cursor):
+    """Unix timestamp of a cursor's post date; Nextdoor dates are parsed from UTC"""
+    return int(cursor['post_date'].replace(tzinfo=timezone.utc).timestamp()) if cursor.get('post_date') else None
+
+
+def build_posts(records):
+    """
+    Convert raw post records into post dictionaries
+    
+    Args:
+        records (list): Dictionaries returned by EXTRACT_POSTS_JS, html_parser or
+            network_capture.nextdoor_payload_records
+        
+    Returns:
+        list: Post dictionaries in the same shape as _extract_posts_webdriver
+    """
+    posts = []
+    for record in records or []:
+        try:
+            post_url = record.get('url') or ""
+            # Network records carry the ID; DOM records only have the URL
+            post_id = record.get('post_id') or ""
+            post_id_match = None if post_id else re.search(r'/post/(\d+)', post_url)
+            if post_id_match:
+                post_id = post_id_match.group(1)
+            
+            post_date = None
+            if record.get('datetime'):
+                try:
+                    post_date = datetime.strptime(record['datetime'], "%Y-%m-%dT%H:%M:%S.%fZ")
+                except ValueError:
+                    # Handle relative dates like "2 hours ago"
+                    pass
+            
+            # Only add posts with text content
+            if record.get('text'):
+                posts.append({
+                    'id': post_id,
+                    'url': post_url,
+                    'text': record['text'],
+                    'author': record.get('author') or "",
+                    'date': post_date,
+                    'source_type': 'nextdoor'
+                })
+        except Exception as e:
+            logger.error(f"Error building post from record: {str(e)}")
+    
+    return posts
+
 class NextdoorScraper:
     """
     Scraper for Nextdoor neighborhoods to extract posts and check for keywords
     """
     
-    def __init__(self, headless=BROWSER_HEADLESS):
-        """Initialize the Nextdoor scraper with browser options"""
+    def __init__(self, headless=BROWSER_HEADLESS, extraction_mode=SCRAPER_EXTRACTION_MODE, resource_policy=None,
+                 profile_dir=None, session_manager=None, rate_limiter=None):
+        """
+        Initialize the Nextdoor scraper with browser options
+        
+        Args:
+            profile_dir (str): Persistent Chrome profile to reuse between runs,
+                see app.scraper.profiles.profile_dir. None starts a fresh profile.
+            session_manager (SessionManager): Shared cache of verified logins; without
+                one the login is checked before every scrape
+            rate_limiter (RateLimiter): Shared request budget every page load and scroll
+                waits for; None sends requests unthrottled
+        """
         self.headless = headless
+        self.extraction_mode = extraction_mode
+        self.resource_policy = resource_policy or ResourcePolicy.from_settings()
         self.driver = None
+        self._prober = None
+        self.profile_dir = profile_dir
+        self.session_manager = session_manager
+        self.rate_limiter = rate_limiter
+        self.scrape_stats = {}
+        self.startup_stats = {}
+        self._network_messages = []
+        self.last_cursor = None
+        self.last_outcome = None  # How the last scrape went, for the concurrency controller
         self.cookies_file = os.path.join(os.path.dirname(__file__), '..', '..', 'nextdoor_cookies.json')
         
     def _setup_driver(self):
@@ -39,9 +180,22 @@ class NextdoorScraper:
         options.add_argument('--disable-infobars')
         options.add_argument('--window-size=1920,1080')
         options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/90.0.4430.212 Safari/537.36')
+        self.resource_policy.apply_to_options(options)
+        warm = apply_profile(options, self.profile_dir) if self.profile_dir else False
         
+        started = time.perf_counter()
         self.driver = webdriver.Chrome(options=options)
-        self.driver.implicitly_wait(10)
+        self.driver.implicitly_wait(BROWSER_IMPLICIT_WAIT_SECONDS)
+        self.resource_policy.apply_to_driver(self.driver)
+        self.startup_stats = {'warm_profile': warm, 'driver_seconds': time.perf_counter() - started}
+        logger.info(f"Started Chrome in {self.startup_stats['driver_seconds']:.2f}s with a {'warm' if warm else 'fresh'} profile")
+        
+    @property
+    def prober(self):
+        """Fast-fail element prober bound to the current driver"""
+        if self._prober is None or self._prober.driver is not self.driver:
+            self._prober = ElementProber(self.driver)
+        return self._prober
         
     def _load_cookies(self):
         """Load Nextdoor cookies from file if available"""
@@ -72,18 +226,42 @@ class NextdoorScraper:
             logger.error(f"Error saving cookies: {str(e)}")
     
     def login(self):
-        """Log in to Nextdoor using credentials or cookies"""
+        """
+        Log in to Nextdoor, reusing the browser profile's session when it is still valid
+        
+        Returns:
+            bool: True if logged in
+        """
+        started = time.perf_counter()
+        logged_in = self._login()
+        self.startup_stats['login_seconds'] = time.perf_counter() - started
+        logger.info(f"Nextdoor login took {self.startup_stats['login_seconds']:.2f}s"
+                    f" (browser start {self.startup_stats.get('driver_seconds', 0):.2f}s)")
+        if logged_in and self.session_manager:
+            self.session_manager.mark_valid(self.session_key)
+        return logged_in
+    
+    def _login(self):
+        """Log in to Nextdoor using the profile's session, cookies or credentials"""
         if not self.driver:
             self._setup_driver()
         
+        self._throttle('navigate')
+        
         self.driver.get('https://nextdoor.com/login')
         
+        # A warm profile is usually still logged in
+        if self.startup_stats.get('warm_profile') and self._is_logged_in():
+            logger.info("Logged in using the browser profile")
+            return True
+        
         # Try to use cookies first
         if NEXTDOOR_COOKIES:
             try:
                 cookies = json.loads(NEXTDOOR_COOKIES)
                 for cookie in cookies:
                     self.driver.add_cookie(cookie)
+                self._throttle('navigate')
                 self.driver.refresh()
                 logger.info("Logged in using provided cookies")
                 return True
@@ -92,6 +270,7 @@ class NextdoorScraper:
         
         # Try to load cookies from file
         if self._load_cookies():
+            self._throttle('navigate')
             self.driver.refresh()
             # Check if login was successful
             if self._is_logged_in():
@@ -102,8 +281,8 @@ class NextdoorScraper:
         if NEXTDOOR_EMAIL and NEXTDOOR_PASSWORD:
             try:
                 # Find email field and enter email
-                email_field = WebDriverWait(self.driver, 10).until(
-                    EC.presence_of_element_located((By.ID, "id_email"))
+                email_field = self.prober.wait_until(
+                    EC.presence_of_element_located((By.ID, "id_email")), 10, 'login_form'
                 )
                 email_field.send_keys(NEXTDOOR_EMAIL)
                 
@@ -112,8 +291,8 @@ class NextdoorScraper:
                 continue_button.click()
                 
                 # Wait for password field to appear
-                password_field = WebDriverWait(self.driver, 10).until(
-                    EC.presence_of_element_located((By.ID, "id_password"))
+                password_field = self.prober.wait_until(
+                    EC.presence_of_element_located((By.ID, "id_password")), 10, 'password_field'
                 )
                 password_field.send_keys(NEXTDOOR_PASSWORD)
                 
@@ -131,9 +310,11 @@ class NextdoorScraper:
                     return True
                 else:
                     logger.error("Login failed - could not verify successful login")
+                    self.last_outcome = AUTH_FAILURE
                     return False
             except Exception as e:
                 logger.error(f"Login error: {str(e)}")
+                self.last_outcome = AUTH_FAILURE
                 return False
         else:
             logger.error("No login credentials provided")
@@ -141,83 +322,228 @@ class NextdoorScraper:
     
     def _is_logged_in(self):
         """Check if the user is logged in to Nextdoor"""
-        try:
-            # Look for elements that are only visible when logged in
-            self.driver.find_element(By.XPATH, "//div[contains(@class, 'user-profile')]//img | //button[contains(@aria-label, 'User menu')]")
-            return True
-        except NoSuchElementException:
-            return False
+        # Look for elements that are only visible when logged in
+        return self.prober.exists(By.XPATH, "//div[contains(@class, 'user-profile')]//img | //button[contains(@aria-label, 'User menu')]")
     
-    def scrape_neighborhood(self, neighborhood_url, keywords, max_posts=20):
+    @property
+    def session_key(self):
+        """Key of this scraper's login in the shared session cache"""
+        return ('nextdoor', NEXTDOOR_EMAIL)
+    
+    def _ensure_logged_in(self):
+        """Log in if needed, trusting the shared session cache while it is fresh"""
+        if self.session_manager:
+            return self.session_manager.ensure(self)
+        return self._is_logged_in() or self.login()
+    
+    def _throttle(self, action):
+        """Wait for the shared rate limiter before a page load or scroll"""
+        if self.rate_limiter:
+            seconds = self.rate_limiter.wait(self.session_key, action)
+            if seconds:
+                self.prober.record_wait('throttle', seconds)
+    
+    def _session_expired(self):
+        """Check whether Nextdoor sent the browser back to its login page"""
+        current_url = self.driver.current_url or ""
+        return '/login' in current_url or '/checkpoint' in current_url
+    
+    def scrape_neighborhood(self, neighborhood_url, keywords, max_posts=20, cursor=None):
         """
         Scrape a Nextdoor neighborhood for posts containing specified keywords
         
         Args:
             neighborhood_url (str): URL of the Nextdoor neighborhood
-            keywords (list): List of keywords to search for
+            keywords (list or KeywordMatcher): Keywords to search for, or a matcher
+                compiled once for the whole job
             max_posts (int): Maximum number of posts to scrape
+            cursor (dict): Newest post seen by the previous scrape; scrolling
+                stops once it is on the page and only newer posts are matched.
+                The updated cursor is left in self.last_cursor.
             
         Returns:
             list: List of dictionaries containing matched posts
         """
+        try:
+            if not self._load_neighborhood(neighborhood_url, max_posts, cursor):
+                return []
+            
+            # Extract posts and skip the ones seen by the previous scrape
+            posts = self._extract_posts()
+            self.last_cursor = advance_cursor(posts, cursor)
+            posts = filter_new_posts(posts, cursor)
+            
+            # Match posts against every keyword, one scan per post
+            matcher = compile_keywords(keywords)
+            matched_posts = []
+            for post in posts[:max_posts]:
+                keyword = match_post(matcher, post)
+                if keyword:
+                    matched_posts.append(post)
+            
+            logger.info(f"Found {len(matched_posts)} posts matching keywords in neighborhood: {neighborhood_url}")
+            return matched_posts
+        except Exception as e:
+            self.last_outcome = TIMEOUT if isinstance(e, TimeoutException) else None
+            raise
+        finally:
+            self._finish_scrape(neighborhood_url)
+    
+    def snapshot_neighborhood(self, neighborhood_url, max_posts=20, cursor=None):
+        """
+        Load a Nextdoor neighborhood and return its HTML for offline parsing
+        
+        The browser is free for the next source as soon as this returns;
+        parsing, cursor handling and keyword matching happen in parse_pool.
+        
+        Args:
+            neighborhood_url (str): URL of the Nextdoor neighborhood
+            max_posts (int): Maximum number of posts to load
+            cursor (dict): Newest post seen by the previous scrape
+            
+        Returns:
+            str: page_source of the loaded feed, or None if it could not be loaded
+        """
+        try:
+            if not self._load_neighborhood(neighborhood_url, max_posts, cursor):
+                return None
+            return self.driver.page_source
+        except Exception as e:
+            self.last_outcome = TIMEOUT if isinstance(e, TimeoutException) else None
+            raise
+        finally:
+            self._finish_scrape(neighborhood_url)
+    
+    def _load_neighborhood(self, neighborhood_url, max_posts, cursor):
+        """
+        Open a neighborhood and scroll until enough posts or already-seen posts are loaded
+        
+        Returns:
+            bool: True if posts are on the page
+        """
         if not self.driver:
             self._setup_driver()
-            
-        if not self._is_logged_in():
-            if not self.login():
-                logger.error("Failed to log in to Nextdoor")
-                return []
+        
+        self.prober.reset()
+        measure_transfer(self.driver)  # Discard traffic from earlier pages
+        self._network_messages = []
+        self.last_cursor = cursor
+        self.last_outcome = SUCCESS
+        
+        if not self._ensure_logged_in():
+            logger.error("Failed to log in to Nextdoor")
+            if self.last_outcome == SUCCESS:
+                self.last_outcome = AUTH_FAILURE
+            return False
         
         # Navigate to the neighborhood
+        self._throttle('navigate')
         self.driver.get(neighborhood_url)
         logger.info(f"Navigating to Nextdoor neighborhood: {neighborhood_url}")
         
         # Wait for posts to load
         try:
-            WebDriverWait(self.driver, 20).until(
-                EC.presence_of_element_located((By.XPATH, "//div[contains(@class, 'post-list-item')]"))
+            self.prober.wait_until(
+                EC.presence_of_element_located((By.XPATH, "//div[contains(@class, 'post-list-item')]")), 20, 'load_posts'
             )
         except TimeoutException:
+            if self._session_expired():
+                # Trust nothing until the next scrape has checked the login again
+                logger.error(f"Nextdoor session expired while loading neighborhood: {neighborhood_url}")
+                self.last_outcome = CAPTCHA if '/checkpoint' in (self.driver.current_url or "") else AUTH_FAILURE
+                if self.session_manager:
+                    self.session_manager.invalidate(self.session_key)
+                return False
             logger.error(f"Timeout waiting for posts to load in neighborhood: {neighborhood_url}")
-            return []
+            self.last_outcome = TIMEOUT
+            return False
         
         # Scroll to load more posts
-        self._scroll_to_load_posts(max_posts)
-        
-        # Extract posts
-        posts = self._extract_posts()
-        
-        # Match posts against keywords
-        matched_posts = []
-        for post in posts[:max_posts]:
-            for keyword in keywords:
-                if self._match_keyword(post['text'], keyword):
-                    post['matched_keyword'] = keyword
-                    matched_posts.append(post)
-                    break  # Stop checking keywords once a match is found
-        
-        logger.info(f"Found {len(matched_posts)} posts matching keywords in neighborhood: {neighborhood_url}")
-        return matched_posts
+        self._scroll_to_load_posts(max_posts, cursor)
+        return True
+    
+    def _finish_scrape(self, neighborhood_url):
+        """Record and log the waits and traffic of the scrape that just ended"""
+        if not self.driver:
+            return
+        self.scrape_stats = self.prober.stats()
+        self.scrape_stats.update(measure_transfer(self.driver, self._network_messages))
+        self._network_messages = []
+        logger.info(f"Downloaded {self.scrape_stats['bytes_downloaded']} bytes in {self.scrape_stats['requests']} requests ({self.scrape_stats['blocked_requests']} blocked) in neighborhood: {neighborhood_url}")
+        logger.info(f"Spent {self.scrape_stats['wait_seconds']:.2f}s waiting in neighborhood: {neighborhood_url} (scroll steps {self.scrape_stats['scroll_waits']})")
     
-    def _scroll_to_load_posts(self, max_posts):
-        """Scroll down to load more posts"""
-        posts_found = 0
+    def _scroll_to_load_posts(self, max_posts, cursor=None):
+        """Scroll down to load more posts, stopping early at already-seen content"""
         max_scrolls = 10  # Limit scrolling to prevent infinite loops
+        empty_scrolls = 0
+        
+        # Count current posts
+        posts_found = len(self.prober.find_all(By.XPATH, "//div[contains(@class, 'post-list-item')]"))
         
         for _ in range(max_scrolls):
-            # Count current posts
-            posts = self.driver.find_elements(By.XPATH, "//div[contains(@class, 'post-list-item')]")
-            posts_found = len(posts)
-            
             if posts_found >= max_posts:
                 break
+            
+            if cursor and self._reached_cursor(cursor):
+                logger.debug("Reached already-seen posts, stopping scroll")
+                break
                 
-            # Scroll down
-            self.driver.execute_script("window.scrollBy(0, 1000);")
-            time.sleep(2)  # Wait for new content to load
+            # Scroll down and wait until new posts are attached to the page
+            try:
+                self._throttle('scroll')
+                result = self.prober.scroll_and_wait("div[class*='post-list-item']", NEXTDOOR_SCROLL_TIMEOUT_SECONDS)
+            except Exception as e:
+                logger.error(f"Error while scrolling: {str(e)}")
+                break
+            posts_found = result['count']
+            
+            # Two timeouts in a row without new posts means the feed has ended
+            empty_scrolls = empty_scrolls + 1 if result['timed_out'] and result['count'] <= result['before'] else 0
+            if empty_scrolls >= 2:
+                break
+    
+    def _reached_cursor(self, cursor):
+        """Check whether the newest post from the previous scrape is loaded"""
+        return bool(self.driver.execute_script(KNOWN_POST_JS, cursor.get('post_id'), cursor_timestamp(cursor)))
     
     def _extract_posts(self):
         """Extract post data from the current page"""
+        if self.extraction_mode == 'snapshot':
+            return build_posts(nextdoor_records(self.driver.page_source, self.driver.current_url))
+        
+        if self.extraction_mode == 'network':
+            # The server renders the first page, so its posts are only on the page
+            return merge_posts(self._extract_posts_network(), self._extract_posts_page())
+        
+        return self._extract_posts_page()
+    
+    def _extract_posts_page(self):
+        """Read posts from the rendered page in one script call, or with WebDriver lookups"""
+        if self.extraction_mode in ('script', 'network'):
+            try:
+                started = time.perf_counter()
+                records = self.driver.execute_script(EXTRACT_POSTS_JS)
+                posts = build_posts(records)
+                logger.debug(f"Extracted {len(posts)} posts in {(time.perf_counter() - started) * 1000:.1f} ms")
+                return posts
+            except Exception as e:
+                logger.error(f"Script extraction failed, falling back to WebDriver lookups: {str(e)}")
+        
+        # Missing optional fields must not cost the implicit wait
+        with self.prober.fast_fail():
+            return self._extract_posts_webdriver()
+    
+    def _extract_posts_network(self):
+        """Build posts from the feed's GraphQL responses captured in the performance log"""
+        messages = read_performance_log(self.driver)
+        self._network_messages.extend(messages)  # Still counted by _finish_scrape
+        bodies = capture_responses(self.driver, NEXTDOOR_FEED_PATTERNS, messages)
+        posts = build_posts(nextdoor_payload_records(bodies))
+        logger.debug(f"Extracted {len(posts)} posts from {len(bodies)} feed responses")
+        return posts
+    
+    def _extract_posts_webdriver(self):
+        """Extract post data from the current page with one WebDriver call per field"""
         posts = []
         post_elements = self.driver.find_elements(By.XPATH, "//div[contains(@class, 'post-list-item')]")
         
@@ -0,0 +1,92 @@
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from app.config.settings import PARSE_WORKERS
+from app.scraper import facebook_scraper, nextdoor_scraper
+from app.scraper.cursor import filter_new_posts, advance_cursor
+from app.scraper.html_parser import facebook_records, nextdoor_records
+from app.scraper.matcher import compile_keywords, match_post
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+
+def parse_posts(platform, html, base_url=None):
+    """
+    Parse an HTML snapshot into post dictionaries
+
+    Args:
+        platform (str): 'facebook' or 'nextdoor'
+        html (str): page_source snapshot
+        base_url (str): URL the snapshot was taken from
+
+    Returns:
+        list: Post dictionaries, the same as the scraper's _extract_posts
+    """
+    if platform == 'facebook':
+        return facebook_scraper.build_posts(facebook_records(html, base_url))
+    return nextdoor_scraper.build_posts(nextdoor_records(html, base_url))
+
+
+def parse_and_match(platform, html, base_url, keywords, max_posts=20, cursor=None):
+    """
+    Parse a snapshot and match its new posts against keywords
+
+    Runs in a worker process, so it only takes and returns picklable values;
+    a KeywordMatcher pickles as its keywords and is compiled once per worker.
+
+    Returns:
+        tuple: (matched posts, updated cursor)
+    """
+    posts = parse_posts(platform, html, base_url)
+    new_cursor = advance_cursor(posts, cursor)
+    posts = filter_new_posts(posts, cursor)
+
+    # Match posts against every keyword, one scan per post
+    matcher = compile_keywords(keywords)
+    matched_posts = []
+    for post in posts[:max_posts]:
+        keyword = match_post(matcher, post)
+        if keyword:
+            matched_posts.append(post)
+
+    return matched_posts, new_cursor
+
+
+class ParsePool:
+    """
+    Process pool for the offline parsing stage.
+
+    The browser hands over a page_source snapshot and moves on to the next
+    source while parsing and keyword matching run on other cores.
+    """
+
+    def __init__(self, workers=PARSE_WORKERS):
+        """Initialize the pool; worker processes start on first use"""
+        self.workers = max(1, workers)
+        self._executor = None
+        # Parse-stage threads submit at once; only one of them may start the executor
+        self._lock = threading.Lock()
+
+    def submit(self, platform, html, base_url, keywords, max_posts=20, cursor=None):
+        """
+        Queue a snapshot for parsing and matching
+
+        Returns:
+            Future: Resolves to (matched posts, updated cursor)
+        """
+        with self._lock:
+            if self._executor is None:
+                # Spawned workers do not inherit the scheduler's threads or browser handles
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+                logger.info(f"Started parse pool with {self.workers} worker processes")
+            return self._executor.submit(parse_and_match, platform, html, base_url, keywords, max_posts, cursor)
+
+    def close(self):
+        """Shut the worker processes down"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
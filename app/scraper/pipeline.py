@@ -0,0 +1,146 @@
+import time
+import queue
+import logging
+import threading
+from collections import namedtuple
+
+from app.config.settings import PIPELINE_QUEUE_SIZE
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# One step of a pipeline: func(item, value) runs on `workers` threads and returns the
+# value handed to the next stage; the first stage gets the item itself as its value
+Stage = namedtuple('Stage', ['name', 'func', 'workers'])
+
+# Marks the end of a stage's input
+_DONE = object()
+
+
+class Pipeline:
+    """
+    Runs work items through stages joined by bounded queues.
+
+    Each stage has its own worker threads, so while one source is being
+    stored the next ones are already loading in browsers or being parsed.
+    When a later stage falls behind, the queue in front of it fills up and
+    the earlier stage blocks instead of piling up results in memory. An item
+    that fails in one stage skips the rest and reaches the sink with its
+    error. The sink runs in the calling thread, which owns the database
+    session.
+    """
+
+    def __init__(self, name, stages, queue_size=PIPELINE_QUEUE_SIZE):
+        """
+        Args:
+            name (str): Name used for threads and log messages
+            stages (list): Stage tuples, in order
+            queue_size (int): Items each queue between stages may hold
+        """
+        self.name = name
+        self.stages = [stage for stage in stages if stage]
+        self.queue_size = max(1, queue_size)
+
+    def run(self, items, sink, sink_name='store'):
+        """
+        Push items through every stage and hand each result to the sink
+
+        Args:
+            items (list): Work items
+            sink (callable): Called with (item, result, error) in the calling thread as items finish;
+                error is None on success
+            sink_name (str): Name of the sink in the timing stats
+
+        Returns:
+            dict: Per-stage stats, keyed by stage name: items, busy seconds
+                (time spent in the stage) and blocked seconds (time spent waiting
+                for room in the next queue)
+        """
+        stats = {stage.name: {'items': 0, 'busy': 0.0, 'blocked': 0.0} for stage in self.stages}
+        stats[sink_name] = {'items': 0, 'busy': 0.0, 'blocked': 0.0}
+        if not items:
+            return stats
+
+        lock = threading.Lock()
+        inbox = queue.Queue()
+        for item in items:
+            inbox.put((item, item, None))
+        for _ in range(self.stages[0].workers):
+            inbox.put(_DONE)
+
+        # Start each stage's workers, every stage reading the queue the previous one writes
+        threads = []
+        for index, stage in enumerate(self.stages):
+            outbox = queue.Queue(maxsize=self.queue_size)
+            next_workers = self.stages[index + 1].workers if index + 1 < len(self.stages) else 1
+            remaining = [stage.workers]
+            for number in range(stage.workers):
+                thread = threading.Thread(
+                    target=self._work,
+                    args=(stage, inbox, outbox, stats[stage.name], lock, remaining, next_workers),
+                    name=f"{self.name}-{stage.name}-{number}",
+                    daemon=True
+                )
+                thread.start()
+                threads.append(thread)
+            inbox = outbox
+
+        # Drain the last queue here
+        while True:
+            entry = inbox.get()
+            if entry is _DONE:
+                break
+            started = time.perf_counter()
+            try:
+                sink(*entry)
+            except Exception as e:
+                logger.error(f"Error in {self.name} pipeline {sink_name} stage: {str(e)}")
+            stats[sink_name]['busy'] += time.perf_counter() - started
+            stats[sink_name]['items'] += 1
+
+        for thread in threads:
+            thread.join()
+        self.log_stats(stats)
+        return stats
+
+    def _work(self, stage, inbox, outbox, stats, lock, remaining, next_workers):
+        """Worker thread: apply a stage to items until its input is exhausted"""
+        while True:
+            entry = inbox.get()
+            if entry is _DONE:
+                break
+
+            item, value, error = entry
+            busy = 0.0
+            if error is None:
+                started = time.perf_counter()
+                try:
+                    value = stage.func(item, value)
+                except Exception as e:
+                    value, error = None, e
+                busy = time.perf_counter() - started
+
+            started = time.perf_counter()
+            outbox.put((item, value, error))
+            blocked = time.perf_counter() - started
+
+            with lock:
+                stats['items'] += 1
+                stats['busy'] += busy
+                stats['blocked'] += blocked
+
+        # The last worker of a stage closes the next stage's input
+        with lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            for _ in range(next_workers):
+                outbox.put(_DONE)
+
+    def log_stats(self, stats):
+        """Log where the pipeline spent its time"""
+        summary = ", ".join(
+            f"{name} {values['items']} items {values['busy']:.1f}s busy {values['blocked']:.1f}s blocked"
+            for name, values in stats.items()
+        )
+        logger.info(f"{self.name} pipeline: {summary}")
@@ -0,0 +1,373 @@
+import os
+import json
+import asyncio
+import logging
+import threading
+
+try:
+    from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
+except ImportError:  # Optional backend, only needed when SCRAPER_BACKEND=playwright
+    async_playwright = None
+    PlaywrightTimeoutError = Exception
+
+from app.config.settings import (
+    BROWSER_HEADLESS, PLAYWRIGHT_MAX_CONTEXTS, FACEBOOK_COOKIES, NEXTDOOR_COOKIES, FACEBOOK_EMAIL, NEXTDOOR_EMAIL,
+    FACEBOOK_SCROLL_TIMEOUT_SECONDS, NEXTDOOR_SCROLL_TIMEOUT_SECONDS
+)
+from app.scraper import facebook_scraper, nextdoor_scraper
+from app.scraper.cursor import filter_new_posts, advance_cursor
+from app.scraper.concurrency import SUCCESS, TIMEOUT, CAPTCHA, AUTH_FAILURE
+from app.scraper.matcher import compile_keywords, match_post
+from app.scraper.probing import SCROLL_AND_WAIT_JS
+from app.scraper.resources import ResourcePolicy
+from app.utils.error_handling import handle_auth_failure, log_scraper_activity
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+PROJECT_DIR = os.path.join(os.path.dirname(__file__), '..', '..')
+
+# Per-platform selectors and parsers, shared with the Selenium scrapers
+PLATFORMS = {
+    'facebook': {
+        'name': 'Facebook',
+        'post_selector': "div[role='article']",
+        'logged_in_selector': "xpath=//div[@aria-label='Your profile' or @aria-label='Account' or contains(@aria-label, 'profile')]",
+        'extract_js': facebook_scraper.EXTRACT_POSTS_JS,
+        'known_post_js': facebook_scraper.KNOWN_POST_JS,
+        'build_posts': facebook_scraper.build_posts,
+        'cursor_timestamp': facebook_scraper.cursor_timestamp,
+        'scroll_timeout': FACEBOOK_SCROLL_TIMEOUT_SECONDS,
+        'cookies': FACEBOOK_COOKIES,
+        'account': FACEBOOK_EMAIL,
+        'cookies_file': os.path.join(PROJECT_DIR, 'facebook_cookies.json'),
+        'storage_state_file': os.path.join(PROJECT_DIR, 'facebook_storage_state.json')
+    },
+    'nextdoor': {
+        'name': 'Nextdoor',
+        'post_selector': "div[class*='post-list-item']",
+        'logged_in_selector': "xpath=//div[contains(@class, 'user-profile')]//img | //button[contains(@aria-label, 'User menu')]",
+        'extract_js': nextdoor_scraper.EXTRACT_POSTS_JS,
+        'known_post_js': nextdoor_scraper.KNOWN_POST_JS,
+        'build_posts': nextdoor_scraper.build_posts,
+        'cursor_timestamp': nextdoor_scraper.cursor_timestamp,
+        'scroll_timeout': NEXTDOOR_SCROLL_TIMEOUT_SECONDS,
+        'cookies': NEXTDOOR_COOKIES,
+        'account': NEXTDOOR_EMAIL,
+        'cookies_file': os.path.join(PROJECT_DIR, 'nextdoor_cookies.json'),
+        'storage_state_file': os.path.join(PROJECT_DIR, 'nextdoor_storage_state.json')
+    }
+}
+
+
+def page_function(script):
+    """Wrap a Selenium execute_script body so page.evaluate can call it with a list of arguments"""
+    return "(args) => (function () {" + script + "}).apply(null, args || [])"
+
+
+def async_page_function(script):
+    """Wrap a Selenium execute_async_script body, resolving with the value passed to its callback"""
+    return "(args) => new Promise((resolve) => (function () {" + script + "}).apply(null, (args || []).concat([resolve])))"
+
+
+def selenium_cookies_to_storage_state(cookies):
+    """
+    Convert cookies saved from Selenium into a Playwright storage state
+
+    Args:
+        cookies (list): Cookie dictionaries as returned by driver.get_cookies()
+
+    Returns:
+        dict: Storage state accepted by browser.new_context(storage_state=...)
+    """
+    converted = []
+    for cookie in cookies:
+        entry = {
+            'name': cookie['name'],
+            'value': cookie['value'],
+            'domain': cookie.get('domain', ''),
+            'path': cookie.get('path', '/'),
+            'expires': cookie.get('expiry', -1),
+            'httpOnly': cookie.get('httpOnly', False),
+            'secure': cookie.get('secure', False)
+        }
+        if cookie.get('sameSite') in ('Strict', 'Lax', 'None'):
+            entry['sameSite'] = cookie['sameSite']
+        converted.append(entry)
+    return {'cookies': converted, 'origins': []}
+
+
+class PlaywrightScraper:
+    """
+    Asyncio Playwright backend for both platforms.
+
+    One Chromium process serves every source. Each scrape runs in its own
+    isolated browser context created from the platform's saved storage state,
+    and many contexts load at once on a single event loop, never more than
+    max_contexts across both platforms. The event loop runs on a background
+    thread so the scheduler's fetch threads can call the blocking
+    scrape_source.
+    """
+
+    def __init__(self, headless=BROWSER_HEADLESS, max_contexts=PLAYWRIGHT_MAX_CONTEXTS, resource_policy=None, rate_limiter=None):
+        """
+        Initialize the backend; the browser starts on first use
+
+        Args:
+            rate_limiter (RateLimiter): Shared request budget every page load and scroll
+                waits for; None sends requests unthrottled
+        """
+        if async_playwright is None:
+            raise ImportError("The Playwright backend requires the 'playwright' package and 'playwright install chromium'")
+
+        self.headless = headless
+        self.max_contexts = max(1, max_contexts)
+        self.resource_policy = resource_policy or ResourcePolicy.from_settings()
+        self.rate_limiter = rate_limiter
+        self._loop = None
+        self._thread = None
+        self._loop_lock = threading.Lock()
+        self._playwright = None
+        self._browser = None
+        self._browser_lock = None
+        # Created on the event loop; every platform's contexts share it
+        self._context_slots = None
+        self._storage_states = {}
+
+    def _run(self, coroutine):
+        """Run a coroutine on the backend's event loop and wait for the result; safe to call from many threads"""
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name='playwright-loop', daemon=True)
+                self._thread.start()
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    async def _get_browser(self):
+        """Launch the shared Chromium process once"""
+        if self._browser_lock is None:
+            self._browser_lock = asyncio.Lock()
+
+        async with self._browser_lock:
+            if self._browser is None:
+                self._playwright = await async_playwright().start()
+                self._browser = await self._playwright.chromium.launch(
+                    headless=self.headless,
+                    args=['--no-sandbox', '--disable-dev-shm-usage', '--disable-notifications']
+                )
+                logger.info("Playwright Chromium started")
+        return self._browser
+
+    def _storage_state(self, platform):
+        """
+        Load the saved storage state shared by every context of a platform
+
+        Falls back to the cookies used by the Selenium scrapers, from the
+        environment or the saved cookies file.
+        """
+        if platform in self._storage_states:
+            return self._storage_states[platform]
+
+        config = PLATFORMS[platform]
+        state = None
+        try:
+            if os.path.exists(config['storage_state_file']):
+                with open(config['storage_state_file'], 'r') as f:
+                    state = json.load(f)
+            elif config['cookies']:
+                state = selenium_cookies_to_storage_state(json.loads(config['cookies']))
+            elif os.path.exists(config['cookies_file']):
+                with open(config['cookies_file'], 'r') as f:
+                    state = selenium_cookies_to_storage_state(json.load(f))
+        except Exception as e:
+            logger.error(f"Error loading {config['name']} storage state: {str(e)}")
+
+        self._storage_states[platform] = state
+        return state
+
+    async def _throttle(self, platform, action):
+        """Wait for the shared rate limiter without blocking the event loop"""
+        if self.rate_limiter:
+            await self.rate_limiter.wait_async((platform, PLATFORMS[platform]['account']), action)
+
+    async def _scrape(self, platform, url, keywords, max_posts=20, cursor=None):
+        """
+        Scrape one source in a fresh browser context
+
+        Returns:
+            tuple: (matched posts, updated cursor, outcome for the concurrency controller)
+        """
+        if self._context_slots is None:
+            self._context_slots = asyncio.Semaphore(self.max_contexts)
+        async with self._context_slots:
+            return await self._scrape_in_context(platform, url, keywords, max_posts, cursor)
+
+    async def _scrape_in_context(self, platform, url, keywords, max_posts=20, cursor=None):
+        """Scrape one source while holding one of the max_contexts slots, see _scrape"""
+        config = PLATFORMS[platform]
+        source_name = url.rstrip('/').split('/')[-1]
+        browser = await self._get_browser()
+        context = await browser.new_context(
+            storage_state=self._storage_state(platform),
+            viewport={'width': 1920, 'height': 1080}
+        )
+        transfer = {'bytes_downloaded': 0, 'requests': 0, 'blocked_requests': 0}
+        try:
+            async def route(request_route):
+                if self.resource_policy.should_block(request_route.request.resource_type, request_route.request.url):
+                    transfer['blocked_requests'] += 1
+                    await request_route.abort()
+                else:
+                    await request_route.continue_()
+
+            def loading_finished(event):
+                transfer['bytes_downloaded'] += int(event.get('encodedDataLength', 0))
+                transfer['requests'] += 1
+
+            if self.resource_policy.enabled:
+                await context.route('**/*', route)
+            page = await context.new_page()
+
+            # Count bytes on the wire the same way the Selenium performance log does
+            cdp = await context.new_cdp_session(page)
+            await cdp.send('Network.enable')
+            cdp.on('Network.loadingFinished', loading_finished)
+
+            await self._throttle(platform, 'navigate')
+            try:
+                await page.goto(url)
+            except PlaywrightTimeoutError:
+                log_scraper_activity(source_name, platform, "navigate", "timeout")
+                return [], cursor, TIMEOUT
+            log_scraper_activity(source_name, platform, "navigate", "success")
+
+            # Wait for posts to load
+            try:
+                await page.wait_for_selector(config['post_selector'], timeout=20000)
+            except PlaywrightTimeoutError:
+                outcome = TIMEOUT
+                if '/checkpoint' in page.url:
+                    outcome = CAPTCHA
+                elif not await page.locator(config['logged_in_selector']).count():
+                    handle_auth_failure(config['name'], platform, "Saved storage state is not logged in")
+                    outcome = AUTH_FAILURE
+                log_scraper_activity(source_name, platform, "load_posts", outcome)
+                return [], cursor, outcome
+
+            # Scroll to load more posts, stopping at already-seen content
+            posts_found = await page.locator(config['post_selector']).count()
+            empty_scrolls = 0
+            for _ in range(10):
+                if posts_found >= max_posts:
+                    break
+                if cursor and await page.evaluate(page_function(config['known_post_js']), [cursor.get('post_id'), config['cursor_timestamp'](cursor)]):
+                    break
+                await self._throttle(platform, 'scroll')
+                result = await page.evaluate(
+                    async_page_function(SCROLL_AND_WAIT_JS),
+                    [config['post_selector'], int(config['scroll_timeout'] * 1000)]
+                )
+                posts_found = result['count']
+                empty_scrolls = empty_scrolls + 1 if result['timed_out'] and result['count'] <= result['before'] else 0
+                if empty_scrolls >= 2:
+                    break
+
+            # Extract posts and skip the ones seen by the previous scrape
+            posts = config['build_posts'](await page.evaluate(page_function(config['extract_js'])))
+            new_cursor = advance_cursor(posts, cursor)
+            posts = filter_new_posts(posts, cursor)
+            log_scraper_activity(source_name, platform, "extract_posts", f"found {len(posts)} new posts")
+
+            # Match posts against every keyword, one scan per post
+            matcher = compile_keywords(keywords)
+            matched_posts = []
+            for post in posts[:max_posts]:
+                keyword = match_post(matcher, post)
+                if keyword:
+                    matched_posts.append(post)
+
+            logger.info(f"Found {len(matched_posts)} posts matching keywords in {config['name']} source: {url}")
+            return matched_posts, new_cursor, SUCCESS
+        finally:
+            await context.close()
+            log_scraper_activity(source_name, platform, "transfer", f"{transfer['bytes_downloaded']} bytes in {transfer['requests']} requests, {transfer['blocked_requests']} blocked")
+
+    def scrape_source(self, platform, job, keywords, max_posts=20):
+        """
+        Scrape one source, blocking the calling thread until it is done
+
+        Any number of threads can call this at once; up to max_contexts of
+        their pages load concurrently in the shared browser, and the rest wait
+        for a context to close.
+
+        Args:
+            platform (str): 'facebook' or 'nextdoor'
+            job (dict): Dictionary with at least 'url' and optionally 'cursor'
+            keywords (list or KeywordMatcher): Keywords to search for
+            max_posts (int): Maximum number of posts to scrape
+
+        Returns:
+            tuple: (matched posts, updated cursor, outcome); the outcome is one of
+                the app.scraper.concurrency outcome constants
+        """
+        return self._run(self._scrape(platform, job['url'], compile_keywords(keywords), max_posts, job.get('cursor')))
+
+    def scrape_group(self, group_url, keywords, max_posts=20, cursor=None):
+        """
+        Scrape a Facebook group
+
+        Unlike FacebookScraper.scrape_group, the cursor is returned rather than
+        kept in last_cursor, since many threads share this scraper.
+
+        Returns:
+            tuple: (matched posts, updated cursor); the cursor is unchanged on errors
+        """
+        try:
+            matched_posts, new_cursor, _ = self._run(self._scrape('facebook', group_url, keywords, max_posts, cursor))
+            return matched_posts, new_cursor
+        except Exception as e:
+            logger.error(f"Error scraping Facebook group {group_url}: {str(e)}")
+            return [], cursor
+
+    def scrape_neighborhood(self, neighborhood_url, keywords, max_posts=20, cursor=None):
+        """
+        Scrape a Nextdoor neighborhood
+
+        Returns:
+            tuple: (matched posts, updated cursor), see scrape_group
+        """
+        try:
+            matched_posts, new_cursor, _ = self._run(self._scrape('nextdoor', neighborhood_url, keywords, max_posts, cursor))
+            return matched_posts, new_cursor
+        except Exception as e:
+            logger.error(f"Error scraping Nextdoor neighborhood {neighborhood_url}: {str(e)}")
+            return [], cursor
+
+    async def _close(self):
+        """Close the browser and stop Playwright"""
+        if self._browser:
+            await self._browser.close()
+            self._browser = None
+        if self._playwright:
+            await self._playwright.stop()
+            self._playwright = None
+
+    def close(self):
+        """Close the browser and the event loop thread"""
+        if self._loop is None:
+            return
+        try:
+            self._run(self._close())
+            logger.info("Playwright Chromium closed successfully")
+        except Exception as e:
+            logger.error(f"Error closing Playwright: {str(e)}")
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+            if not self._loop.is_running():
+                self._loop.close()
+            self._loop = None
+            self._thread = None
+            # Both are bound to the closed loop
+            self._browser_lock = None
+            self._context_slots = None
@@ -0,0 +1,59 @@
+# Adaptive polling: each source is scraped about as often as it takes to collect
+# TARGET_NEW_POSTS_PER_SCRAPE new posts, within the configured bounds.
+from datetime import datetime, timedelta
+
+from app.config.settings import (
+    SCRAPE_INTERVAL_MINUTES, MIN_SCRAPE_INTERVAL_MINUTES, MAX_SCRAPE_INTERVAL_MINUTES, TARGET_NEW_POSTS_PER_SCRAPE
+)
+
+# Weight of the latest scrape in the smoothed post rate; a quiet source's rate halves with every empty scrape
+RATE_SMOOTHING = 0.5
+
+
+def poll_interval(source):
+    """
+    Time to wait before a source's next scrape
+
+    Args:
+        source (Source): Source model instance
+
+    Returns:
+        timedelta: Interval between MIN_ and MAX_SCRAPE_INTERVAL_MINUTES
+    """
+    if source.post_rate is None:
+        minutes = SCRAPE_INTERVAL_MINUTES
+    elif source.post_rate <= 0:
+        minutes = MAX_SCRAPE_INTERVAL_MINUTES
+    else:
+        minutes = 60 * TARGET_NEW_POSTS_PER_SCRAPE / source.post_rate
+    return timedelta(minutes=min(max(minutes, MIN_SCRAPE_INTERVAL_MINUTES), MAX_SCRAPE_INTERVAL_MINUTES))
+
+
+def record_scrape(source, cursor, now=None):
+    """
+    Update a source's post rate and schedule its next scrape after a successful scrape
+
+    Args:
+        source (Source): Source model instance, before last_scraped is updated
+        cursor (dict): Cursor returned by the scrape; its 'new_posts' counts posts newer than the previous one
+        now (datetime): Time of the scrape, for tests
+    """
+    now = now or datetime.utcnow()
+    new_posts = (cursor or {}).get('new_posts', 0)
+
+    if source.last_scraped and now > source.last_scraped:
+        observed = new_posts / ((now - source.last_scraped).total_seconds() / 3600)
+        if source.post_rate is None:
+            source.post_rate = observed
+        else:
+            source.post_rate = RATE_SMOOTHING * observed + (1 - RATE_SMOOTHING) * source.post_rate
+
+    if new_posts:
+        source.last_new_post_at = now
+    source.last_scraped = now
+    source.next_due_at = now + poll_interval(source)
+
+
+def record_failure(source, now=None):
+    """Schedule a source whose scrape failed for another try after its usual interval"""
+    source.next_due_at = (now or datetime.utcnow()) + poll_interval(source)
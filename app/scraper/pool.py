@@ -0,0 +1,143 @@
+import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from app.scraper.concurrency import AUTH_FAILURE
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+class ScraperPool:
+    """
+    Pool of logged-in browser workers for one platform.
+
+    Workers are created lazily by the factory, reused across jobs and handed
+    out one task at a time, so each browser is only ever driven by one thread.
+    """
+
+    def __init__(self, platform, factory, size, budget=None, controller=None):
+        """
+        Initialize the pool
+
+        Args:
+            platform (str): Platform name used in log messages
+            factory (callable): Called with the worker index, returns a logged-in scraper
+            size (int): Maximum number of browsers this platform may run at once
+            budget (threading.Semaphore): Browser slots shared with other platforms
+            controller (AIMDController): Adaptive limit on this platform's browsers, fed
+                with each scraper's last_outcome; None always allows all `size`
+        """
+        self.platform = platform
+        self.factory = factory
+        self.size = max(1, size)
+        self.budget = budget
+        self.controller = controller
+        self._idle = queue.LifoQueue()
+        self._workers = []
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _checkout(self):
+        """Take an idle worker, creating one if the pool is not full yet"""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            index = self._created if self._created < self.size else None
+            if index is not None:
+                self._created += 1
+
+        if index is None:
+            return self._idle.get()
+
+        try:
+            scraper = self.factory(index)
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+
+        with self._lock:
+            self._workers.append(scraper)
+        logger.info(f"Started {self.platform} worker {index + 1}/{self.size}")
+        return scraper
+
+    def run_one(self, task, item):
+        """
+        Run a task on a worker in the calling thread, holding a browser slot for its duration
+
+        Args:
+            task (callable): Called with (scraper, item)
+            item: Work item
+
+        Returns:
+            The task's result
+        """
+        if not self.controller:
+            return self._run_one(task, item)
+
+        # Wait for the platform's adaptive limit before taking a shared browser slot
+        with self.controller.slot() as slot:
+            return self._run_one(task, item, slot)
+
+    def _run_one(self, task, item, slot=None):
+        """Run a task while holding a browser slot, reporting the scraper's outcome to the controller's slot"""
+        if self.budget:
+            self.budget.acquire()
+        try:
+            try:
+                scraper = self._checkout()
+            except Exception:
+                # A browser that could not log in is a failure like any other
+                if slot:
+                    slot.outcome = AUTH_FAILURE
+                raise
+            try:
+                return task(scraper, item)
+            finally:
+                if slot:
+                    slot.outcome = getattr(scraper, 'last_outcome', None)
+                self._idle.put(scraper)
+        finally:
+            if self.budget:
+                self.budget.release()
+
+    def run(self, items, task):
+        """
+        Fan items out across the pool
+
+        Args:
+            items (list): Work items, one per source
+            task (callable): Called with (scraper, item) on a worker thread
+
+        Yields:
+            tuple: (item, result, error) in completion order; error is None on success
+        """
+        if not items:
+            return
+
+        with ThreadPoolExecutor(max_workers=min(self.size, len(items)), thread_name_prefix=f"{self.platform}-worker") as executor:
+            futures = {executor.submit(self.run_one, task, item): item for item in items}
+            for future in as_completed(futures):
+                item = futures[future]
+                try:
+                    yield item, future.result(), None
+                except Exception as e:
+                    yield item, None, e
+
+    def close(self):
+        """Close every browser in the pool"""
+        with self._lock:
+            workers = list(self._workers)
+            self._workers = []
+            self._created = 0
+        self._idle = queue.LifoQueue()
+
+        for scraper in workers:
+            try:
+                scraper.close()
+            except Exception as e:
+                logger.error(f"Error closing {self.platform} worker: {str(e)}")
@@ -0,0 +1,188 @@
+import logging
+import time
+from contextlib import contextmanager
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException
+
+from app.config.settings import BROWSER_IMPLICIT_WAIT_SECONDS
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Scrolls one step and resolves as soon as more elements match the selector.
+# arguments[0] is a CSS selector, arguments[1] the timeout in milliseconds.
+SCROLL_AND_WAIT_JS = """
+var selector = arguments[0];
+var timeoutMs = arguments[1];
+var done = arguments[arguments.length - 1];
+var before = document.querySelectorAll(selector).length;
+var started = performance.now();
+var finished = false;
+var observer = null;
+var timer = null;
+function finish(timedOut) {
+    if (finished) {
+        return;
+    }
+    finished = true;
+    if (observer) {
+        observer.disconnect();
+    }
+    clearTimeout(timer);
+    done({
+        before: before,
+        count: document.querySelectorAll(selector).length,
+        waited_ms: performance.now() - started,
+        timed_out: timedOut
+    });
+}
+observer = new MutationObserver(function () {
+    if (document.querySelectorAll(selector).length > before) {
+        finish(false);
+    }
+});
+observer.observe(document.body, {childList: true, subtree: true});
+timer = setTimeout(function () { finish(true); }, timeoutMs);
+window.scrollBy(0, 1000);
+"""
+
+class ElementProber:
+    """
+    Fast-fail element lookups and bounded explicit waits shared by the scrapers.
+
+    Selenium applies the driver's implicit wait to every lookup that finds
+    nothing, so probing for an optional field costs the full implicit wait.
+    The prober switches the implicit wait off while probing and keeps track of
+    how long explicit waits took so each scrape can report it.
+    """
+
+    def __init__(self, driver, implicit_wait=BROWSER_IMPLICIT_WAIT_SECONDS):
+        """
+        Initialize the prober
+
+        Args:
+            driver (WebDriver): Driver to probe
+            implicit_wait (int): Implicit wait restored after probing
+        """
+        self.driver = driver
+        self.implicit_wait = implicit_wait
+        self.wait_seconds = 0.0
+        self.wait_log = []
+        self.scroll_waits = []
+        self._depth = 0
+        self._script_timeout = None
+
+    @contextmanager
+    def fast_fail(self):
+        """Disable the implicit wait for the duration of the block"""
+        if self._depth == 0:
+            self.driver.implicitly_wait(0)
+        self._depth += 1
+        try:
+            yield self
+        finally:
+            self._depth -= 1
+            if self._depth == 0:
+                self.driver.implicitly_wait(self.implicit_wait)
+
+    def find(self, by, value, within=None):
+        """
+        Find the first matching element without waiting
+
+        Args:
+            by (str): Locator strategy
+            value (str): Locator value
+            within (WebElement): Element to search inside, defaults to the page
+
+        Returns:
+            WebElement: The first matching element, or None if there is none
+        """
+        elements = self.find_all(by, value, within)
+        return elements[0] if elements else None
+
+    def find_all(self, by, value, within=None):
+        """
+        Find all matching elements without waiting
+
+        Returns:
+            list: Matching elements, empty if there are none
+        """
+        with self.fast_fail():
+            return (within or self.driver).find_elements(by, value)
+
+    def exists(self, by, value, within=None):
+        """Check whether any element matches without waiting"""
+        return bool(self.find_all(by, value, within))
+
+    def wait_until(self, condition, timeout, label):
+        """
+        Wait for content that is actually loading, with an upper bound
+
+        Args:
+            condition (callable): Expected condition passed to WebDriverWait
+            timeout (float): Maximum number of seconds to wait
+            label (str): Name recorded in the wait log
+
+        Returns:
+            The value returned by the condition
+
+        Raises:
+            TimeoutException: If the condition is not met within the timeout
+        """
+        started = time.perf_counter()
+        timed_out = False
+        try:
+            with self.fast_fail():
+                return WebDriverWait(self.driver, timeout).until(condition)
+        except TimeoutException:
+            timed_out = True
+            raise
+        finally:
+            self.record_wait(label, time.perf_counter() - started, timed_out)
+
+    def scroll_and_wait(self, selector, timeout):
+        """
+        Scroll one step and wait until new elements appear, with an upper bound
+
+        Args:
+            selector (str): CSS selector for the feed items
+            timeout (float): Maximum number of seconds to wait for new items
+
+        Returns:
+            dict: Item count before and after, time waited and whether it timed out
+        """
+        # The async script must be allowed to outlive its own timeout
+        if self._script_timeout is None or self._script_timeout < timeout + 5:
+            self._script_timeout = timeout + 5
+            self.driver.set_script_timeout(self._script_timeout)
+
+        result = self.driver.execute_async_script(SCROLL_AND_WAIT_JS, selector, int(timeout * 1000))
+        seconds = result['waited_ms'] / 1000
+        self.scroll_waits.append(round(seconds, 3))
+        self.record_wait('scroll', seconds, result['timed_out'])
+        return result
+
+    def record_wait(self, label, seconds, timed_out=False):
+        """Add a wait to the per-scrape totals"""
+        self.wait_seconds += seconds
+        self.wait_log.append({'label': label, 'seconds': round(seconds, 3), 'timed_out': timed_out})
+        logger.debug(f"Waited {seconds:.2f}s for {label}{' (timed out)' if timed_out else ''}")
+
+    def reset(self):
+        """Clear the wait totals at the start of a scrape"""
+        self.wait_seconds = 0.0
+        self.wait_log = []
+        self.scroll_waits = []
+
+    def stats(self):
+        """
+        Summarize the waits recorded since the last reset
+
+        Returns:
+            dict: Total wait time, the individual waits and the wait per scroll step
+        """
+        return {
+            'wait_seconds': round(self.wait_seconds, 3),
+            'waits': list(self.wait_log),
+            'scroll_waits': list(self.scroll_waits)
+        }
@@ -0,0 +1,108 @@
+import os
+import re
+import socket
+import logging
+
+from app.config.settings import CHROME_PROFILE_DIR
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Lock files Chrome leaves behind when it is killed instead of quit
+SINGLETON_FILES = ('SingletonLock', 'SingletonSocket', 'SingletonCookie')
+
+
+def _slug(value):
+    """Make an account name safe to use as a directory name"""
+    return re.sub(r'[^A-Za-z0-9._-]+', '_', value or '').strip('_') or 'default'
+
+
+def profile_dir(platform, account=None, index=0, root=None, worker=None):
+    """
+    Directory of the persistent Chrome profile for one browser worker
+
+    Chrome will not open a profile that another Chrome is using, so every
+    browser of a platform and account gets its own directory, and so does
+    every scheduler process that has a stable name.
+
+    Args:
+        platform (str): 'facebook' or 'nextdoor'
+        account (str): Login the profile belongs to, e.g. the account email
+        index (int): Worker index within the platform's pool
+        root (str): Base directory, defaults to CHROME_PROFILE_DIR
+        worker (str): Name of the scheduler process, e.g. WORKER_ID; None shares
+            the directory between processes, see apply_profile
+
+    Returns:
+        str: Profile directory, or None if persistent profiles are disabled
+    """
+    root = CHROME_PROFILE_DIR if root is None else root
+    if not root:
+        return None
+    parts = [os.path.abspath(root), platform, _slug(account)]
+    if worker:
+        parts.append(_slug(worker))
+    return os.path.join(*parts, f"worker-{index}")
+
+
+def _locked_by_running_chrome(path):
+    """
+    Whether a profile's SingletonLock belongs to a Chrome that is still running
+
+    Chrome points the lock at "<host>-<pid>". A lock from another host is
+    treated as stale, since profiles live on a disk of their own host and a
+    different name means an earlier machine or container.
+    """
+    try:
+        target = os.readlink(os.path.join(path, 'SingletonLock'))
+    except OSError:
+        return False
+    host, _, pid = target.rpartition('-')
+    if host != socket.gethostname() or not pid.isdigit():
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Running, under another user
+        return True
+    return True
+
+
+def apply_profile(options, path):
+    """
+    Point Chrome at a persistent profile before the driver starts
+
+    Cookies, local storage, the HTTP disk cache and service workers all live in
+    the profile, so a warm profile is usually still logged in and loads the
+    feed's static assets from disk.
+
+    Args:
+        options (Options): Chrome options being built by a scraper
+        path (str): Profile directory from profile_dir()
+
+    Returns:
+        bool: True if the profile had been used before
+    """
+    warm = os.path.isdir(os.path.join(path, 'Default'))
+    os.makedirs(path, exist_ok=True)
+
+    # Another process's browser is using the profile; leave it alone and start fresh
+    if _locked_by_running_chrome(path):
+        logger.warning(f"Chrome profile {path} is in use by another browser, starting with a throwaway profile")
+        return False
+
+    # A crashed browser leaves its lock behind and Chrome then refuses the profile
+    for name in SINGLETON_FILES:
+        lock = os.path.join(path, name)
+        if os.path.lexists(lock):
+            try:
+                os.remove(lock)
+                logger.debug(f"Removed stale {name} from {path}")
+            except OSError as e:
+                logger.error(f"Error removing stale profile lock {lock}: {str(e)}")
+
+    options.add_argument(f'--user-data-dir={path}')
+    options.add_argument('--profile-directory=Default')
+    return warm
@@ -0,0 +1,331 @@
+import time
+import random
+import asyncio
+import logging
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+
+from app.config.settings import (
+    FACEBOOK_REQUESTS_PER_MINUTE, NEXTDOOR_REQUESTS_PER_MINUTE, ACCOUNT_REQUESTS_PER_MINUTE,
+    RATE_LIMIT_BURST, RATE_LIMIT_JITTER
+)
+from app.models.models import RateLimitBucket, RequestStat
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# RequestStat column counting each action
+ACTION_COLUMNS = {'navigate': 'page_loads', 'scroll': 'scrolls'}
+
+# How long saved request stats are kept
+STATS_RETENTION = timedelta(days=7)
+
+
+def request_stats(session, platform_rates, hours=24, now=None):
+    """
+    Requests and throttled time of every worker over a recent period, by platform
+
+    Args:
+        session (Session): Database session
+        platform_rates (dict): Requests per minute by platform, reported alongside
+        hours (float): How far back to look
+        now (datetime): Current time, for tests
+
+    Returns:
+        dict: Same as RateLimiter.stats, summed over the workers' saved stats
+    """
+    now = now or datetime.utcnow()
+    start = now.replace(minute=0, second=0, microsecond=0) - timedelta(hours=hours)
+    rows = (
+        session.query(
+            RequestStat.platform, func.sum(RequestStat.requests), func.sum(RequestStat.page_loads),
+            func.sum(RequestStat.scrolls), func.sum(RequestStat.throttled_seconds)
+        )
+        .filter(RequestStat.hour > start)
+        .group_by(RequestStat.platform)
+        .all()
+    )
+    return {
+        platform: {
+            'requests': requests or 0,
+            'throttled_seconds': throttled_seconds or 0.0,
+            'actions': {'navigate': page_loads or 0, 'scroll': scrolls or 0},
+            'rate_per_minute': platform_rates.get(platform)
+        }
+        for platform, requests, page_loads, scrolls, throttled_seconds in rows
+    }
+
+
+class TokenBucket:
+    """
+    Token bucket allowing rate_per_minute requests on average and burst back to back.
+
+    reserve() books the next token and says how long the caller has to wait
+    for it. The token count may go negative, so callers that arrive together
+    are spaced out in arrival order and nobody sleeps while holding the lock.
+    """
+
+    def __init__(self, rate_per_minute, burst=1, clock=time.monotonic):
+        """
+        Args:
+            rate_per_minute (float): Average requests allowed per minute
+            burst (int): Requests allowed back to back after an idle period
+            clock (callable): Monotonic time source in seconds, for tests
+        """
+        self.rate_per_minute = rate_per_minute
+        self.interval = 60.0 / rate_per_minute
+        self.burst = max(1, burst)
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._tokens = float(self.burst)
+        self._updated = clock()
+
+    def reserve(self):
+        """
+        Take a token
+
+        Returns:
+            float: Seconds to wait before the request may be sent
+        """
+        with self._lock:
+            now = self.clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) / self.interval)
+            self._updated = now
+            self._tokens -= 1
+            return max(0.0, -self._tokens * self.interval)
+
+
+class SharedTokenBucket:
+    """
+    Token bucket kept in the database, so every worker process draws on one budget.
+
+    reserve() reads the bucket's row and writes the new token count back
+    with an UPDATE that only matches if nobody reserved in between, and
+    tries again otherwise, so workers never book the same token. Times are
+    Unix timestamps, since monotonic clocks are per process.
+    """
+
+    # Reservations that keep losing to other workers give up and wait one interval
+    MAX_ATTEMPTS = 20
+
+    def __init__(self, Session, key, rate_per_minute, burst=1, clock=time.time):
+        """
+        Args:
+            Session (sessionmaker): Sessions on the shared database
+            key (str): Bucket name, the same in every worker
+            rate_per_minute (float): Average requests allowed per minute, across all workers
+            burst (int): Requests allowed back to back after an idle period
+            clock (callable): Time source in seconds since the epoch, for tests
+        """
+        self.Session = Session
+        self.key = key
+        self.rate_per_minute = rate_per_minute
+        self.interval = 60.0 / rate_per_minute
+        self.burst = max(1, burst)
+        self.clock = clock
+
+    def reserve(self):
+        """
+        Take a token
+
+        Returns:
+            float: Seconds to wait before the request may be sent
+        """
+        session = self.Session()
+        try:
+            for _ in range(self.MAX_ATTEMPTS):
+                now = self.clock()
+                row = session.query(RateLimitBucket.tokens, RateLimitBucket.updated).filter_by(key=self.key).first()
+                if row is None:
+                    session.add(RateLimitBucket(key=self.key, tokens=self.burst - 1.0, updated=now))
+                    try:
+                        session.commit()
+                        return 0.0
+                    except IntegrityError:
+                        # Another worker created the bucket first
+                        session.rollback()
+                        continue
+
+                # A worker whose clock runs behind neither refills the bucket nor moves it back in time
+                tokens = min(self.burst, row.tokens + max(0.0, now - row.updated) / self.interval) - 1
+                result = session.execute(
+                    update(RateLimitBucket)
+                    .where(RateLimitBucket.key == self.key, RateLimitBucket.tokens == row.tokens, RateLimitBucket.updated == row.updated)
+                    .values(tokens=tokens, updated=max(now, row.updated))
+                    .execution_options(synchronize_session=False)
+                )
+                session.commit()
+                if result.rowcount == 1:
+                    return max(0.0, -tokens * self.interval)
+            logger.warning(f"Could not reserve a {self.key} request after {self.MAX_ATTEMPTS} attempts")
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error reserving a {self.key} request: {str(e)}")
+        finally:
+            session.close()
+        return self.interval
+
+
+class RateLimiter:
+    """
+    Request budget for every browser of every platform.
+
+    Each page load and scroll takes a token from its platform's bucket and
+    from its account's bucket, then waits for the later of the two plus a
+    random jitter so requests do not arrive at a machine-regular pace.
+    Buckets are shared by all threads, so adding browsers spreads the same
+    budget rather than raising it. Given a database engine, the buckets
+    live in the database and are shared by every worker process as well,
+    so adding workers does not raise it either.
+    """
+
+    def __init__(self, platform_rates, account_rate=0, burst=1, jitter=0.0, engine=None, clock=None, sleep=time.sleep):
+        """
+        Args:
+            platform_rates (dict): Requests per minute by platform name; 0 or missing means unlimited
+            account_rate (float): Requests per minute for each logged-in account; 0 means unlimited
+            burst (int): Requests each bucket allows back to back
+            jitter (float): Maximum random extra delay, as a fraction of the platform's request spacing
+            engine (Engine): Database to keep the buckets in; None keeps them in this process
+            clock (callable): Time source in seconds, for tests; monotonic in memory, Unix time in the database
+            sleep (callable): Blocking sleep, for tests
+        """
+        self.platform_rates = platform_rates
+        self.account_rate = account_rate
+        self.burst = burst
+        self.jitter = jitter
+        self.Session = sessionmaker(bind=engine) if engine is not None else None
+        self.clock = clock or (time.time if self.Session else time.monotonic)
+        self.sleep = sleep
+        self._buckets = {}
+        self._stats = {}
+        self._unsaved = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, engine=None):
+        """
+        Create a limiter from the rate limit settings
+
+        Args:
+            engine (Engine): Database to share the buckets through, see RateLimiter
+        """
+        return cls(
+            {'facebook': FACEBOOK_REQUESTS_PER_MINUTE, 'nextdoor': NEXTDOOR_REQUESTS_PER_MINUTE},
+            ACCOUNT_REQUESTS_PER_MINUTE, RATE_LIMIT_BURST, RATE_LIMIT_JITTER, engine
+        )
+
+    def _bucket(self, key, rate):
+        """Get or create the bucket for a key; None when the rate is unlimited"""
+        if not rate or rate <= 0:
+            return None
+        with self._lock:
+            if key not in self._buckets:
+                if self.Session:
+                    name = key if isinstance(key, str) else '/'.join(str(part or '') for part in key)
+                    self._buckets[key] = SharedTokenBucket(self.Session, name, rate, self.burst, self.clock)
+                else:
+                    self._buckets[key] = TokenBucket(rate, self.burst, self.clock)
+            return self._buckets[key]
+
+    def delay(self, account_key, action):
+        """
+        Take tokens for one request and work out how long to hold it back
+
+        Args:
+            account_key (tuple): (platform, account), the scraper's session key
+            action (str): 'navigate' or 'scroll', for the stats
+
+        Returns:
+            float: Seconds to wait before sending the request
+        """
+        platform = account_key[0]
+        platform_bucket = self._bucket(platform, self.platform_rates.get(platform))
+        account_bucket = self._bucket(tuple(account_key), self.account_rate)
+
+        delay = 0.0
+        for bucket in (platform_bucket, account_bucket):
+            if bucket:
+                delay = max(delay, bucket.reserve())
+        if platform_bucket and self.jitter > 0:
+            delay += random.uniform(0, self.jitter * platform_bucket.interval)
+
+        with self._lock:
+            stats = self._stats.setdefault(platform, {'requests': 0, 'throttled_seconds': 0.0, 'actions': {}})
+            stats['requests'] += 1
+            stats['throttled_seconds'] += delay
+            stats['actions'][action] = stats['actions'].get(action, 0) + 1
+            unsaved = self._unsaved.setdefault(platform, {'requests': 0, 'throttled_seconds': 0.0, 'actions': {}})
+            unsaved['requests'] += 1
+            unsaved['throttled_seconds'] += delay
+            unsaved['actions'][action] = unsaved['actions'].get(action, 0) + 1
+        return delay
+
+    def wait(self, account_key, action):
+        """
+        Block until a request may be sent
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        delay = self.delay(account_key, action)
+        if delay > 0:
+            logger.debug(f"Throttling {account_key[0]} {action} for {delay:.2f}s")
+            self.sleep(delay)
+        return delay
+
+    async def wait_async(self, account_key, action):
+        """Same as wait, for coroutines on the Playwright event loop"""
+        if self.Session:
+            # Booking a shared token is a database round trip, which must not block the loop
+            delay = await asyncio.to_thread(self.delay, account_key, action)
+        else:
+            delay = self.delay(account_key, action)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return delay
+
+    def save_stats(self, session, worker, now=None):
+        """
+        Add the requests since the last save to this worker's stats for the current hour
+
+        Stats older than STATS_RETENTION are deleted. The caller commits.
+
+        Args:
+            session (Session): Database session
+            worker (str): Name of this worker, see leases.default_worker_id
+            now (datetime): Current time, for tests
+        """
+        with self._lock:
+            unsaved, self._unsaved = self._unsaved, {}
+        if not unsaved:
+            return
+        now = now or datetime.utcnow()
+        hour = now.replace(minute=0, second=0, microsecond=0)
+        session.query(RequestStat).filter(RequestStat.hour < hour - STATS_RETENTION).delete(synchronize_session=False)
+        for platform, values in unsaved.items():
+            stat = session.query(RequestStat).filter_by(platform=platform, worker=worker, hour=hour).first()
+            if stat is None:
+                stat = RequestStat(platform=platform, worker=worker, hour=hour, requests=0, page_loads=0, scrolls=0, throttled_seconds=0.0)
+                session.add(stat)
+            stat.requests += values['requests']
+            stat.throttled_seconds += values['throttled_seconds']
+            for action, column in ACTION_COLUMNS.items():
+                setattr(stat, column, getattr(stat, column) + values['actions'].get(action, 0))
+
+    def stats(self):
+        """
+        Requests and throttled time so far in this process, by platform
+
+        Returns:
+            dict: {platform: {'requests', 'throttled_seconds', 'rate_per_minute', 'actions'}}
+        """
+        with self._lock:
+            return {
+                platform: dict(values, actions=dict(values['actions']), rate_per_minute=self.platform_rates.get(platform))
+                for platform, values in self._stats.items()
+            }
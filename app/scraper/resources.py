@@ -0,0 +1,203 @@
+import json
+import logging
+from fnmatch import fnmatch
+
+from app.config.settings import (
+    BLOCK_RESOURCES, BLOCKED_RESOURCE_TYPES, BLOCKED_URL_PATTERNS, ALLOWED_URL_PATTERNS
+)
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# URL patterns used to block a resource type where the browser can only block by URL
+RESOURCE_TYPE_URL_PATTERNS = {
+    'image': ['*.png*', '*.jpg*', '*.jpeg*', '*.gif*', '*.webp*', '*.svg*', '*.ico*', '*.bmp*'],
+    'media': ['*.mp4*', '*.webm*', '*.m4a*', '*.m4v*', '*.mp3*', '*.ogg*', '*.m3u8*', '*.mpd*'],
+    'font': ['*.woff*', '*.woff2*', '*.ttf*', '*.otf*', '*.eot*'],
+    'stylesheet': ['*.css*']
+}
+
+# Chrome content settings for the resource types it can switch off natively
+RESOURCE_TYPE_CHROME_PREFS = {
+    'image': {'profile.managed_default_content_settings.images': 2}
+}
+
+# Third-party trackers that never carry post content
+DEFAULT_BLOCKED_URL_PATTERNS = [
+    '*google-analytics.com*',
+    '*googletagmanager.com*',
+    '*doubleclick.net*',
+    '*facebook.com/tr?*',
+    '*facebook.com/tr/*',
+    '*facebook.com/ajax/bz*',
+    '*nextdoor.com/ajax/track*',
+    '*sentry.io*'
+]
+
+
+def _split(value):
+    """Split a comma separated setting into a list"""
+    return [item.strip() for item in (value or '').split(',') if item.strip()]
+
+
+class ResourcePolicy:
+    """
+    Which resources the scrapers let the browser download.
+
+    The scrapers only read text, links and timestamps, so images, video,
+    fonts and trackers are dead weight. Selenium blocks them through Chrome
+    prefs and CDP URL blocking; the Playwright backend asks should_block()
+    for every request. URLs matching an allowed pattern are never blocked.
+    Chrome's URL blocking cannot make exceptions, so on Selenium allowed
+    patterns switch off blocking by resource type, and deny patterns an
+    allowed pattern falls within are dropped.
+    """
+
+    def __init__(self, enabled=True, blocked_types=None, blocked_patterns=None, allowed_patterns=None):
+        """
+        Initialize the policy
+
+        Args:
+            enabled (bool): Whether anything is blocked at all
+            blocked_types (list): Resource types to block, e.g. image, media, font
+            blocked_patterns (list): Glob patterns of URLs to block
+            allowed_patterns (list): Glob patterns of URLs that are always allowed
+        """
+        self.enabled = enabled
+        self.blocked_types = set(blocked_types or [])
+        self.blocked_patterns = list(blocked_patterns or [])
+        self.allowed_patterns = list(allowed_patterns or [])
+
+    @classmethod
+    def from_settings(cls):
+        """Build the policy configured in app.config.settings"""
+        return cls(
+            enabled=BLOCK_RESOURCES,
+            blocked_types=_split(BLOCKED_RESOURCE_TYPES),
+            blocked_patterns=DEFAULT_BLOCKED_URL_PATTERNS + _split(BLOCKED_URL_PATTERNS),
+            allowed_patterns=_split(ALLOWED_URL_PATTERNS)
+        )
+
+    def blocked_url_patterns(self):
+        """
+        URL patterns for CDP Network.setBlockedURLs
+
+        Returns:
+            list: Deny patterns plus the URL patterns of every blocked type, or only
+                the deny patterns no allowed pattern falls within when exceptions are set
+        """
+        if not self.enabled:
+            return []
+        if self.allowed_patterns:
+            # A type glob such as *.png* would also block allowed URLs
+            return [
+                pattern for pattern in self.blocked_patterns
+                if not any(fnmatch(allowed, pattern) for allowed in self.allowed_patterns)
+            ]
+        patterns = list(self.blocked_patterns)
+        for resource_type in sorted(self.blocked_types):
+            patterns.extend(RESOURCE_TYPE_URL_PATTERNS.get(resource_type, []))
+        return patterns
+
+    def chrome_prefs(self):
+        """Chrome prefs that switch off blocked resource types natively"""
+        prefs = {}
+        # Native switches cannot make exceptions, so allow patterns disable them
+        if self.enabled and not self.allowed_patterns:
+            for resource_type in self.blocked_types:
+                prefs.update(RESOURCE_TYPE_CHROME_PREFS.get(resource_type, {}))
+        return prefs
+
+    def apply_to_options(self, options):
+        """
+        Configure Chrome options before the driver starts
+
+        Performance logging is enabled even when nothing is blocked so that
+        bytes downloaded can be compared with and without blocking.
+        """
+        options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+        if not self.enabled:
+            return
+        prefs = self.chrome_prefs()
+        if prefs:
+            options.add_experimental_option('prefs', prefs)
+        if 'media' in self.blocked_types:
+            options.add_argument('--autoplay-policy=user-gesture-required')
+
+    def apply_to_driver(self, driver):
+        """Install URL blocking on a running driver through CDP"""
+        patterns = self.blocked_url_patterns()
+        if not patterns:
+            return
+        try:
+            driver.execute_cdp_cmd('Network.enable', {})
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': patterns})
+            logger.debug(f"Blocking {len(patterns)} URL patterns")
+        except Exception as e:
+            logger.error(f"Error installing resource blocking: {str(e)}")
+
+    def should_block(self, resource_type, url):
+        """
+        Decide whether a single request should be aborted
+
+        Args:
+            resource_type (str): Request resource type as reported by the browser
+            url (str): Request URL
+
+        Returns:
+            bool: True if the request should be blocked
+        """
+        if not self.enabled:
+            return False
+        if any(fnmatch(url, pattern) for pattern in self.allowed_patterns):
+            return False
+        if resource_type in self.blocked_types:
+            return True
+        return any(fnmatch(url, pattern) for pattern in self.blocked_patterns)
+
+
+def read_performance_log(driver):
+    """
+    Drain the driver's performance log
+    
+    Args:
+        driver (WebDriver): Chrome driver started with performance logging
+        
+    Returns:
+        list: DevTools messages ({'method': ..., 'params': ...}) since the last read
+    """
+    try:
+        entries = driver.get_log('performance')
+    except Exception as e:
+        logger.debug(f"Performance log unavailable: {str(e)}")
+        return []
+    
+    messages = []
+    for entry in entries:
+        try:
+            messages.append(json.loads(entry['message'])['message'])
+        except (KeyError, TypeError, ValueError):
+            continue
+    return messages
+
+
+def measure_transfer(driver, messages=None):
+    """
+    Drain the driver's performance log and total the network traffic
+    
+    Args:
+        driver (WebDriver): Chrome driver started with performance logging
+        messages (list): Messages already drained by read_performance_log, e.g. by
+            network extraction, to include in the totals
+        
+    Returns:
+        dict: Bytes downloaded, finished requests and blocked requests since the last call
+    """
+    stats = {'bytes_downloaded': 0, 'requests': 0, 'blocked_requests': 0}
+    for message in list(messages or []) + read_performance_log(driver):
+        if message.get('method') == 'Network.loadingFinished':
+            stats['bytes_downloaded'] += int(message['params'].get('encodedDataLength', 0))
+            stats['requests'] += 1
+        elif message.get('method') == 'Network.loadingFailed' and message['params'].get('blockedReason'):
+            stats['blocked_requests'] += 1
+    return stats
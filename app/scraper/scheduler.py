@@ -1,19 +1,69 @@
+import signal
 import logging
-import time
+import threading
 from datetime import datetime
 from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.jobstores.memory import MemoryJobStore
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
 from apscheduler.triggers.interval import IntervalTrigger
-from sqlalchemy import create_engine
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import sessionmaker
 
-from app.config.settings import DATABASE_URL, SCRAPE_INTERVAL_MINUTES
-from app.models.models import Base, Source, Keyword, Match
+from app.config.settings import (
+    DATABASE_URL, SCHEDULER_TICK_SECONDS, SCHEDULER_JOBS_TABLE, SCHEDULER_MISFIRE_GRACE_SECONDS, LEASE_HEARTBEAT_SECONDS, LEASE_BATCH_SIZE, SCRAPER_POOL_SIZE, SCRAPER_BACKEND, SCRAPER_EXTRACTION_MODE,
+    FACEBOOK_MAX_CONCURRENCY, NEXTDOOR_MAX_CONCURRENCY, PLAYWRIGHT_MAX_CONTEXTS, FACEBOOK_EMAIL, NEXTDOOR_EMAIL, WORKER_ID,
+    DEDUP_WINDOW_HOURS, DEDUP_MIN_SIMILARITY
+)
+from app.models.models import Keyword, Match, MatchKeyword, init_db
+from app.alert.alert_system import AlertSystem
+from app.alert.dispatcher import AlertDispatcher
+from app.scraper.cursor import cursor_for_source, apply_cursor_to_source
+from app.scraper.polling import record_scrape, record_failure
+from app.scraper.pool import ScraperPool
+from app.scraper.playwright_scraper import PlaywrightScraper
+from app.scraper.parse_pool import ParsePool
+from app.scraper.pipeline import Pipeline, Stage
+from app.scraper.profiles import profile_dir
+from app.scraper.session import SessionManager
+from app.scraper.rate_limit import RateLimiter
+from app.scraper.concurrency import AIMDController, load_state, save_state, SUCCESS
+from app.scraper.leases import SourceLeases, JobStoreLease
+from app.scraper.matcher import compile_keywords
+from app.scraper.scoring import load_scorer
+from app.scraper.dedup import DuplicateFinder, fingerprint
 from app.scraper.facebook_scraper import FacebookScraper
 from app.scraper.nextdoor_scraper import NextdoorScraper
 
 # Configure logger
 logger = logging.getLogger(__name__)
 
+# Log names per platform: (platform, source)
+PLATFORM_LABELS = {
+    'facebook': ('Facebook', 'Facebook group'),
+    'nextdoor': ('Nextdoor', 'Nextdoor neighborhood')
+}
+
+# INSERT constructs with ON CONFLICT DO NOTHING, by dialect name
+UPSERT_INSERTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+# Scheduler whose jobs run in this process, set by ScraperScheduler.start. The job
+# store saves jobs as references to the module-level functions below, which
+# survive a restart where a bound method would not.
+_active_scheduler = None
+
+
+def run_due_sources_job():
+    """Scheduled job: start scraping due sources"""
+    if _active_scheduler:
+        _active_scheduler.run_due_sources()
+
+
+def renew_leases_job():
+    """Scheduled job: renew this worker's source leases"""
+    if _active_scheduler:
+        _active_scheduler.renew_leases()
+
 class ScraperScheduler:
     """
     Scheduler for running Facebook and Nextdoor scrapers periodically
@@ -21,231 +71,603 @@ class ScraperScheduler:
     
     def __init__(self):
         """Initialize the scheduler and database connection"""
-        self.scheduler = BackgroundScheduler()
-        self.engine = create_engine(DATABASE_URL)
-        Base.metadata.create_all(self.engine)
+        self.engine = init_db(DATABASE_URL)
+        # A job never runs twice at once, and runs missed while the process was down are merged into one.
+        # start() adds the database job store as 'default' when this worker gets the table; jobs every
+        # worker must run for itself stay in 'memory'
+        self.scheduler = BackgroundScheduler(
+            jobstores={'memory': MemoryJobStore()},
+            job_defaults={'coalesce': True, 'max_instances': 1, 'misfire_grace_time': SCHEDULER_MISFIRE_GRACE_SECONDS}
+        )
+        self.jobs_persisted = False
         self.Session = sessionmaker(bind=self.engine)
         
-        # Initialize scrapers
-        self.facebook_scraper = None
-        self.nextdoor_scraper = None
+        # Verified logins shared by every browser of both platforms
+        self.login_sessions = SessionManager()
+        
+        # Page load and scroll budget shared by every browser of every worker, per platform and per account
+        self.rate_limiter = RateLimiter.from_settings(self.engine)
+        
+        # Alternate backend: one Chromium with many contexts, created on first use
+        self.backend = SCRAPER_BACKEND
+        
+        # Claims on sources, so several worker processes can share one database
+        self.leases = SourceLeases()
+        # Claim on the job store table, which only one running worker may use
+        self.jobs_lease = JobStoreLease(SCHEDULER_JOBS_TABLE, self.leases.owner)
+        
+        # Browsers per platform grow while scrapes succeed and are cut on timeouts,
+        # CAPTCHAs and login failures; the level survives restarts
+        self.concurrency = {
+            'facebook': AIMDController('facebook', self._max_concurrency(FACEBOOK_MAX_CONCURRENCY)),
+            'nextdoor': AIMDController('nextdoor', self._max_concurrency(NEXTDOOR_MAX_CONCURRENCY))
+        }
+        self._load_concurrency()
+        
+        # Initialize browser pools; browsers start on first use and share one budget
+        self.browser_budget = threading.BoundedSemaphore(max(1, SCRAPER_POOL_SIZE))
+        self.facebook_pool = ScraperPool(
+            'facebook', self._create_facebook_worker,
+            min(SCRAPER_POOL_SIZE, FACEBOOK_MAX_CONCURRENCY), self.browser_budget, self.concurrency['facebook']
+        )
+        self.nextdoor_pool = ScraperPool(
+            'nextdoor', self._create_nextdoor_worker,
+            min(SCRAPER_POOL_SIZE, NEXTDOOR_MAX_CONCURRENCY), self.browser_budget, self.concurrency['nextdoor']
+        )
+        self.playwright_scraper = None
+        
+        # Snapshot mode parses page_source on other cores while browsers move on
+        self.extraction_mode = SCRAPER_EXTRACTION_MODE
+        self.parse_pool = ParsePool()
+        
+        # Links cross-posted copies of a post to the first match so it is alerted once
+        self.duplicates = DuplicateFinder(DEDUP_WINDOW_HOURS, DEDUP_MIN_SIMILARITY)
+        
+        # One scrape at a time per platform, whether due or started from the dashboard
+        self.platform_locks = {platform: threading.Lock() for platform in PLATFORM_LABELS}
+        
+        # Alerts new matches as soon as they are stored, while the scheduler runs
+        self.dispatcher = AlertDispatcher(AlertSystem(self.engine))
     
     def start(self):
         """Start the scheduler"""
-        # Add jobs to the scheduler
-        self.scheduler.add_job(
-            self.run_facebook_scraper,
-            IntervalTrigger(minutes=SCRAPE_INTERVAL_MINUTES),
-            id='facebook_scraper',
-            replace_existing=True
-        )
+        global _active_scheduler
+        _active_scheduler = self
         
-        self.scheduler.add_job(
-            self.run_nextdoor_scraper,
-            IntervalTrigger(minutes=SCRAPE_INTERVAL_MINUTES),
-            id='nextdoor_scraper',
-            replace_existing=True
-        )
+        # Keep the schedule in the database, so a restart picks it up, unless another running
+        # worker already does; job stores cannot be shared, so the others keep theirs in memory
+        self.jobs_persisted = bool(self._claim_jobs_table())
+        if self.jobs_persisted:
+            self.scheduler.add_jobstore(SQLAlchemyJobStore(engine=self.engine, tablename=SCHEDULER_JOBS_TABLE), 'default')
+        else:
+            logger.warning(f"Another running worker uses {SCHEDULER_JOBS_TABLE}, keeping this worker's schedule in memory")
+        
+        # Load the saved jobs without running any until they are all in place
+        self.scheduler.start(paused=True)
+        
+        # One due-queue job; each source's next scrape time adapts to how often it gets new posts
+        self._schedule(run_due_sources_job, 'due_sources', SCHEDULER_TICK_SECONDS, 'default' if self.jobs_persisted else 'memory')
         
-        # Start the scheduler
-        self.scheduler.start()
-        logger.info(f"Scheduler started. Running scrapers every {SCRAPE_INTERVAL_MINUTES} minutes.")
+        # Keep this worker's leases alive while its scrapes run; every worker runs its own heartbeat
+        if self.jobs_persisted and self.scheduler.get_job('lease_heartbeat', 'default'):
+            self.scheduler.remove_job('lease_heartbeat', 'default')
+        self._schedule(renew_leases_job, 'lease_heartbeat', LEASE_HEARTBEAT_SECONDS, 'memory')
+        
+        self.dispatcher.start()
+        self.scheduler.resume()
+        logger.info(f"Scheduler started as worker {self.leases.owner}. Checking for due sources every {SCHEDULER_TICK_SECONDS} seconds.")
+    
+    def _schedule(self, func, job_id, seconds, jobstore='default'):
+        """
+        Add an interval job, keeping the next run time saved by the last run
+        
+        A saved job with the same interval resumes on its own schedule and
+        runs right away if it was missed while the process was down. A new or
+        changed job runs right away and then every `seconds`.
+        
+        Args:
+            func (callable): Module-level job function
+            job_id (str): Job ID
+            seconds (float): Interval between runs
+            jobstore (str): 'default', the database table when this worker holds it, or 'memory'
+        """
+        trigger = IntervalTrigger(seconds=seconds)
+        job = self.scheduler.get_job(job_id, jobstore)
+        if job and getattr(job.trigger, 'interval', None) == trigger.interval:
+            logger.info(f"Resuming job {job_id}, next run at {job.next_run_time}")
+            return job
+        return self.scheduler.add_job(
+            func, trigger, id=job_id, jobstore=jobstore, replace_existing=True, next_run_time=datetime.now(self.scheduler.timezone)
+        )
     
     def stop(self):
         """Stop the scheduler"""
+        global _active_scheduler
         self.scheduler.shutdown()
+        if _active_scheduler is self:
+            _active_scheduler = None
         logger.info("Scheduler stopped.")
         
-        # Close scrapers
-        if self.facebook_scraper:
-            self.facebook_scraper.close()
+        # Send the alerts already queued
+        self.dispatcher.stop()
         
-        if self.nextdoor_scraper:
-            self.nextdoor_scraper.close()
-    
-    def run_facebook_scraper(self):
-        """Run the Facebook scraper for all active sources"""
-        logger.info("Running Facebook scraper job")
+        # Hand unfinished sources to other workers now rather than when the leases expire
+        self.release_leases()
         
+        # Close browsers
+        self.facebook_pool.close()
+        self.nextdoor_pool.close()
+        
+        if self.playwright_scraper:
+            self.playwright_scraper.close()
+        
+        self.parse_pool.close()
+    
+    def _max_concurrency(self, platform_limit):
+        """Most browsers, or Playwright contexts, one platform may use at once"""
+        if self.backend == 'playwright':
+            return PLAYWRIGHT_MAX_CONTEXTS
+        return min(SCRAPER_POOL_SIZE, platform_limit)
+    
+    def _load_concurrency(self):
+        """Resume each platform's concurrency at the level saved by the last run"""
+        session = self.Session()
         try:
-            # Create a new session
-            session = self.Session()
+            for controller in self.concurrency.values():
+                load_state(session, controller)
+        except Exception as e:
+            logger.error(f"Error loading concurrency state: {str(e)}")
+        finally:
+            session.close()
+    
+    def _create_facebook_worker(self, index):
+        """Start a logged-in Facebook browser for the pool"""
+        scraper = FacebookScraper(
+            profile_dir=profile_dir('facebook', FACEBOOK_EMAIL, index, worker=WORKER_ID), session_manager=self.login_sessions,
+            rate_limiter=self.rate_limiter
+        )
+        if not scraper.login():
+            scraper.close()
+            raise RuntimeError("Failed to log in to Facebook")
+        return scraper
+    
+    def _create_nextdoor_worker(self, index):
+        """Start a logged-in Nextdoor browser for the pool"""
+        scraper = NextdoorScraper(
+            profile_dir=profile_dir('nextdoor', NEXTDOOR_EMAIL, index, worker=WORKER_ID), session_manager=self.login_sessions,
+            rate_limiter=self.rate_limiter
+        )
+        if not scraper.login():
+            scraper.close()
+            raise RuntimeError("Failed to log in to Nextdoor")
+        return scraper
+    
+    def _scrape_jobs(self, sources):
+        """
+        Build plain work items for the pool
+        
+        Worker threads must not touch ORM instances owned by the job's session,
+        so they only get the values they need.
+        """
+        return [
+            {'source_id': source.id, 'name': source.name, 'url': source.url, 'cursor': cursor_for_source(source)}
+            for source in sources
+        ]
+    
+    def _scrape_pipeline(self, platform, matcher):
+        """
+        Build the fetch, parse and store pipeline for one platform
+        
+        The fetch stage drives browsers from the configured backend, as many
+        at once as the platform's concurrency controller allows. In
+        snapshot mode it only takes page_source, and a parse stage with one
+        thread per parse pool process turns snapshots into matched posts;
+        the other modes extract and match in the browser task. The store
+        stage is the job thread's sink. The fetch stage stamps each job's
+        seen_at, which alert latency is measured from.
+        
+        Args:
+            platform (str): 'facebook' or 'nextdoor'
+            matcher (KeywordMatcher): Active keywords, compiled once for the job
             
-            # Get all active Facebook sources
-            sources = session.query(Source).filter_by(source_type='facebook', is_active=True).all()
+        Returns:
+            Pipeline: Pipeline whose last stage yields (matched posts, cursor, outcome) per work item;
+                the outcome is the scraper's, one of the app.scraper.concurrency outcome constants
+        """
+        name, _ = PLATFORM_LABELS[platform]
+        
+        if self.backend == 'playwright':
+            if not self.playwright_scraper:
+                self.playwright_scraper = PlaywrightScraper(rate_limiter=self.rate_limiter)
+            scraper = self.playwright_scraper
+            controller = self.concurrency[platform]
             
-            if not sources:
-                logger.info("No active Facebook sources found")
-                session.close()
-                return
+            def fetch(job, _):
+                with controller.slot() as slot:
+                    matched_posts, cursor, slot.outcome = scraper.scrape_source(platform, job, matcher)
+                job['seen_at'] = datetime.utcnow()
+                return matched_posts, cursor, slot.outcome
             
-            # Get all active keywords
-            keywords = session.query(Keyword).filter_by(is_active=True).all()
-            keyword_texts = [keyword.text for keyword in keywords]
+            return Pipeline(name, [Stage('fetch', fetch, controller.maximum)])
+        
+        snapshot = self.extraction_mode == 'snapshot'
+        
+        def scrape(scraper, job):
+            if platform == 'facebook':
+                logger.info(f"Scraping Facebook group: {job['name']}")
+                if snapshot:
+                    return scraper.snapshot_group(job['url'], cursor=job['cursor']), scraper.last_outcome
+                matched_posts = scraper.scrape_group(job['url'], matcher, cursor=job['cursor'])
+            else:
+                logger.info(f"Scraping Nextdoor neighborhood: {job['name']}")
+                if snapshot:
+                    return scraper.snapshot_neighborhood(job['url'], cursor=job['cursor']), scraper.last_outcome
+                matched_posts = scraper.scrape_neighborhood(job['url'], matcher, cursor=job['cursor'])
+            return matched_posts, scraper.last_cursor, scraper.last_outcome
+        
+        def parse(job, snapshot_result):
+            html, outcome = snapshot_result
+            if html is None:
+                return [], job['cursor'], outcome
+            # The browser has already moved on to the next source
+            matched_posts, cursor = self.parse_pool.submit(platform, html, job['url'], matcher, cursor=job['cursor']).result()
+            return matched_posts, cursor, outcome
+        
+        pool = self.facebook_pool if platform == 'facebook' else self.nextdoor_pool
+        
+        def fetch(job, _):
+            result = pool.run_one(scrape, job)
+            job['seen_at'] = datetime.utcnow()
+            return result
+        
+        return Pipeline(name, [
+            Stage('fetch', fetch, pool.size),
+            Stage('parse', parse, self.parse_pool.workers) if snapshot else None
+        ])
+    
+    def _store_matches(self, session, source, matched_posts, keywords, scorer=None, seen_at=None):
+        """
+        Add new matches for a source to the session
+        
+        Every keyword found in a post is recorded as a MatchKeyword with its
+        spans; the first one is also the match's keyword. Existing post IDs
+        are looked up in one query, new posts are scored together when a
+        lead model has been trained, and the rows are written with one bulk
+        insert per table, so a source costs the same few round trips however
+        many posts it returned. Near-duplicates of recent matches from any
+        source are linked to the earlier match and not alerted again.
+        
+        Args:
+            session (Session): Database session owned by the job
+            source (Source): Source the posts came from
+            matched_posts (list): Matched post dictionaries returned by a scraper
+            keywords (list): Active Keyword objects
+            scorer (LeadScorer): Active lead model, or None to leave matches unscored
+            seen_at (datetime): When the posts were loaded, defaults to now
             
-            if not keyword_texts:
-                logger.info("No active keywords found")
-                session.close()
-                return
+        Returns:
+            list: IDs of the new matches to alert, leaving out duplicates
+        """
+        keywords_by_text = {}
+        for keyword in keywords:
+            keywords_by_text.setdefault(keyword.text.lower(), keyword)
+        
+        # Check which posts already exist in the database
+        post_ids = {post['id'] for post in matched_posts if post['id']}
+        seen_post_ids = set()
+        if post_ids:
+            seen_post_ids = {
+                post_id for (post_id,) in session.query(Match.post_id).filter(
+                    Match.source_id == source.id,
+                    Match.post_id.in_(post_ids)
+                )
+            }
+        
+        rows = []
+        row_keywords = []
+        for post in matched_posts:
+            post_id = post['id'] or None
+            if post_id and post_id in seen_post_ids:
+                continue
             
-            # Initialize Facebook scraper if needed
-            if not self.facebook_scraper:
-                self.facebook_scraper = FacebookScraper()
-                
-            # Login to Facebook
-            if not self.facebook_scraper.login():
-                logger.error("Failed to log in to Facebook")
-                session.close()
-                return
+            # Resolve every keyword that matched, keeping the first one per keyword row
+            found = post.get('matched_keywords') or [{'keyword': post.get('matched_keyword', ''), 'spans': None}]
+            match_keywords = {}
+            matched_text = None
+            for item in found:
+                keyword = keywords_by_text.get(item['keyword'].lower())
+                if keyword and keyword.id not in match_keywords:
+                    match_keywords[keyword.id] = {'keyword_id': keyword.id, 'spans': item['spans']}
+                    matched_text = matched_text or item['keyword']
             
-            # Scrape each source
-            for source in sources:
-                try:
-                    logger.info(f"Scraping Facebook group: {source.name}")
-                    
-                    # Scrape the group
-                    matched_posts = self.facebook_scraper.scrape_group(source.url, keyword_texts)
-                    
-                    # Process matches
-                    for post in matched_posts:
-                        # Check if this match already exists in the database
-                        existing_match = None
-                        if post['id']:
-                            existing_match = session.query(Match).filter_by(
-                                source_id=source.id,
-                                post_id=post['id']
-                            ).first()
-                        
-                        if not existing_match:
-                            # Find the keyword that matched
-                            keyword = next((k for k in keywords if k.text.lower() == post.get('matched_keyword', '').lower()), None)
-                            
-                            if keyword:
-                                # Create a new match
-                                match = Match(
-                                    source_id=source.id,
-                                    keyword_id=keyword.id,
-                                    post_id=post['id'],
-                                    post_url=post['url'],
-                                    post_text=post['text'],
-                                    post_author=post['author'],
-                                    post_date=post['date'],
-                                    matched_text=post['matched_keyword'],
-                                    is_notified=False,
-                                    created_at=datetime.utcnow()
-                                )
-                                
-                                session.add(match)
-                    
-                    # Update last scraped timestamp
-                    source.last_scraped = datetime.utcnow()
-                    session.commit()
-                    
-                except Exception as e:
-                    logger.error(f"Error scraping Facebook group {source.name}: {str(e)}")
-                    session.rollback()
+            if match_keywords:
+                rows.append({
+                    'source_id': source.id,
+                    'keyword_id': next(iter(match_keywords)),
+                    'post_id': post_id,
+                    'post_url': post['url'],
+                    'post_text': post['text'],
+                    'post_author': post['author'],
+                    'post_date': post['date'],
+                    'matched_text': matched_text,
+                    'is_notified': False,
+                    'score': None,
+                    'fingerprint': fingerprint(post['text']),
+                    'seen_at': seen_at or datetime.utcnow(),
+                    'created_at': datetime.utcnow()
+                })
+                row_keywords.append(list(match_keywords.values()))
+                if post_id:
+                    seen_post_ids.add(post_id)
+        
+        if not rows:
+            return []
+        
+        if scorer:
+            for row, score in zip(rows, scorer.score([row['post_text'] for row in rows])):
+                row['score'] = float(score)
+        
+        new_matches = []
+        keyword_rows = []
+        for match, match_keywords in zip(self._insert_matches(session, rows), row_keywords):
+            if match is None:
+                continue
+            new_matches.append(match)
+            keyword_rows.extend(dict(item, match_id=match.id) for item in match_keywords)
+        
+        if keyword_rows:
+            session.execute(insert(MatchKeyword), keyword_rows)
+        
+        if new_matches:
+            self.duplicates.link(session, new_matches)
+        return [match.id for match in new_matches if not match.is_notified]
+    
+    def _insert_matches(self, session, rows):
+        """
+        Insert match rows in bulk
+        
+        Posts with an ID go in one INSERT ... ON CONFLICT DO NOTHING against
+        the (source_id, post_id) unique index, so a post another job stored
+        since the existence check is skipped instead of failing the whole
+        source. Posts without an ID cannot conflict and go in one plain INSERT.
+        
+        Args:
+            session (Session): Database session owned by the job
+            rows (list): Match column values, one dictionary per post
             
+        Returns:
+            list: The stored Match for each row, None where the post was already stored
+        """
+        dialect = session.get_bind().dialect.name
+        if dialect not in UPSERT_INSERTS:
+            # No ON CONFLICT here; the existence check leaves only concurrent jobs to collide
+            matches = [Match(**row) for row in rows]
+            session.add_all(matches)
+            session.flush()
+            return matches
+        
+        stored = [None] * len(rows)
+        with_ids = [index for index, row in enumerate(rows) if row['post_id'] is not None]
+        without_ids = [index for index, row in enumerate(rows) if row['post_id'] is None]
+        
+        if with_ids:
+            statement = (
+                UPSERT_INSERTS[dialect](Match)
+                .on_conflict_do_nothing(index_elements=['source_id', 'post_id'])
+                .returning(Match)
+            )
+            inserted = {match.post_id: match for match in session.scalars(statement, [rows[index] for index in with_ids])}
+            for index in with_ids:
+                stored[index] = inserted.get(rows[index]['post_id'])
+        
+        if without_ids:
+            # RETURNING order is not guaranteed; rows with the same URL and text are interchangeable
+            pending = {}
+            for index in without_ids:
+                pending.setdefault((rows[index]['post_url'], rows[index]['post_text']), []).append(index)
+            for match in session.scalars(insert(Match).returning(Match), [rows[index] for index in without_ids]):
+                stored[pending[(match.post_url, match.post_text)].pop(0)] = match
+        
+        return stored
+    
+    def _claim_jobs_table(self):
+        """Take or renew the lease on the job store table; False if another running worker holds it, None on errors"""
+        session = self.Session()
+        try:
+            return self.jobs_lease.claim(session)
+        except Exception as e:
+            logger.error(f"Error claiming the job store table: {str(e)}")
+            session.rollback()
+            return None
+        finally:
             session.close()
-            
+    
+    def renew_leases(self):
+        """Extend the leases on sources this worker is still scraping, and on the job store table"""
+        session = self.Session()
+        try:
+            self.leases.heartbeat(session)
+            session.commit()
         except Exception as e:
-            logger.error(f"Error in Facebook scraper job: {str(e)}")
-            try:
-                session.close()
-            except:
-                pass
+            logger.error(f"Error renewing source leases: {str(e)}")
+            session.rollback()
+        finally:
+            session.close()
+        
+        if self.jobs_persisted and self._claim_jobs_table() is False:
+            # The lease expired and another worker took the table; stop using it
+            logger.warning(f"Lost {SCHEDULER_JOBS_TABLE} to another worker, keeping this worker's schedule in memory")
+            self.jobs_persisted = False
+            self.scheduler.remove_jobstore('default')
+            self._schedule(run_due_sources_job, 'due_sources', SCHEDULER_TICK_SECONDS, 'memory')
     
-    def run_nextdoor_scraper(self):
-        """Run the Nextdoor scraper for all active sources"""
-        logger.info("Running Nextdoor scraper job")
+    def release_leases(self):
+        """Release every lease this worker holds"""
+        session = self.Session()
+        try:
+            self.leases.release(session)
+            if self.jobs_persisted:
+                self.jobs_lease.release(session)
+            session.commit()
+        except Exception as e:
+            logger.error(f"Error releasing source leases: {str(e)}")
+            session.rollback()
+        finally:
+            session.close()
+    
+    def run_due_sources(self):
+        """Start scraping the due sources of every platform that is not already scraping"""
+        for platform in PLATFORM_LABELS:
+            if self.platform_locks[platform].locked():
+                continue
+            threading.Thread(target=self.run_platform, args=(platform, True, False), name=f"{platform}-due", daemon=True).start()
+    
+    def run_platform(self, platform, due_only=False, wait=True):
+        """
+        Scrape active sources of one platform and store the matches
+        
+        Scheduled and manual runs share the platform's lock, so they never
+        drive the platform's browsers at the same time.
+        
+        Args:
+            platform (str): 'facebook' or 'nextdoor'
+            due_only (bool): Only scrape sources whose next scrape is due, most overdue first
+            wait (bool): Wait for a run already in progress to finish; otherwise skip this run
+            
+        Returns:
+            bool: False if the run was skipped because the platform was busy
+        """
+        lock = self.platform_locks[platform]
+        if not lock.acquire(blocking=wait):
+            logger.info(f"Skipping {PLATFORM_LABELS[platform][0]} run, one is already in progress")
+            return False
+        try:
+            self._run_platform(platform, due_only)
+        finally:
+            lock.release()
+        return True
+    
+    def _run_platform(self, platform, due_only):
+        """Scrape a platform's sources while holding its lock"""
+        name, source_label = PLATFORM_LABELS[platform]
         
         try:
             # Create a new session
             session = self.Session()
             
-            # Get all active Nextdoor sources
-            sources = session.query(Source).filter_by(source_type='nextdoor', is_active=True).all()
+            # Lease the first batch of active sources; other workers skip them until they are released
+            sources = self.leases.claim(session, platform, LEASE_BATCH_SIZE, due_only)
             
             if not sources:
-                logger.info("No active Nextdoor sources found")
+                if not due_only:
+                    logger.info(f"No active {name} sources found")
                 session.close()
                 return
             
             # Get all active keywords
             keywords = session.query(Keyword).filter_by(is_active=True).all()
             keyword_texts = [keyword.text for keyword in keywords]
+            # Load the lead model once per job
+            scorer = load_scorer(session)
             
             if not keyword_texts:
                 logger.info("No active keywords found")
+                self.leases.release(session, [source.id for source in sources])
+                session.commit()
                 session.close()
                 return
             
-            # Initialize Nextdoor scraper if needed
-            if not self.nextdoor_scraper:
-                self.nextdoor_scraper = NextdoorScraper()
-                
-            # Login to Nextdoor
-            if not self.nextdoor_scraper.login():
-                logger.error("Failed to log in to Nextdoor")
-                session.close()
-                return
+            # Forget fingerprints of posts too old to be cross-posted again
+            self.duplicates.evict(session)
+            session.commit()
             
-            # Scrape each source
-            for source in sources:
+            sources_by_id = {}
+            controller = self.concurrency[platform]
+            
+            def store(job, result, error):
+                outcome = result[2] if result else None
+                if error or outcome != SUCCESS:
+                    if error:
+                        logger.error(f"Error scraping {source_label} {job['name']}: {str(error)}")
+                    else:
+                        # A blocked or broken scrape says nothing about how busy the source is,
+                        # so its post rate, last scrape time and cursor are left alone
+                        logger.warning(f"Scrape of {source_label} {job['name']} failed ({outcome or 'error'}), retrying after its usual interval")
+                    record_failure(sources_by_id[job['source_id']])
+                    self.leases.release(session, [job['source_id']])
+                    save_state(session, controller, self.leases.owner)
+                    self.rate_limiter.save_stats(session, self.leases.owner)
+                    session.commit()
+                    return
+                
                 try:
-                    logger.info(f"Scraping Nextdoor neighborhood: {source.name}")
-                    
-                    # Scrape the neighborhood
-                    matched_posts = self.nextdoor_scraper.scrape_neighborhood(source.url, keyword_texts)
-                    
-                    # Process matches
-                    for post in matched_posts:
-                        # Check if this match already exists in the database
-                        existing_match = None
-                        if post['id']:
-                            existing_match = session.query(Match).filter_by(
-                                source_id=source.id,
-                                post_id=post['id']
-                            ).first()
-                        
-                        if not existing_match:
-                            # Find the keyword that matched
-                            keyword = next((k for k in keywords if k.text.lower() == post.get('matched_keyword', '').lower()), None)
-                            
-                            if keyword:
-                                # Create a new match
-                                match = Match(
-                                    source_id=source.id,
-                                    keyword_id=keyword.id,
-                                    post_id=post['id'],
-                                    post_url=post['url'],
-                                    post_text=post['text'],
-                                    post_author=post['author'],
-                                    post_date=post['date'],
-                                    matched_text=post['matched_keyword'],
-                                    is_notified=False,
-                                    created_at=datetime.utcnow()
-                                )
-                                
-                                session.add(match)
+                    source = sources_by_id[job['source_id']]
+                    matched_posts, cursor, _ = result
+                    new_match_ids = self._store_matches(session, source, matched_posts, keywords, scorer, job.get('seen_at'))
                     
-                    # Update last scraped timestamp
-                    source.last_scraped = datetime.utcnow()
+                    # Update the post rate, next due time and the newest post seen
+                    record_scrape(source, cursor)
+                    apply_cursor_to_source(source, cursor)
+                    self.leases.release(session, [source.id])
+                    # The source's outcome has already moved the concurrency level
+                    save_state(session, controller, self.leases.owner)
+                    self.rate_limiter.save_stats(session, self.leases.owner)
                     session.commit()
+                    # Alert the committed matches now rather than on the next sweep
+                    self.dispatcher.publish(new_match_ids)
                     
                 except Exception as e:
-                    logger.error(f"Error scraping Nextdoor neighborhood {source.name}: {str(e)}")
+                    logger.error(f"Error saving {source_label} {job['name']}: {str(e)}")
                     session.rollback()
+                    record_failure(sources_by_id[job['source_id']])
+                    self.leases.release(session, [job['source_id']])
+                    save_state(session, controller, self.leases.owner)
+                    self.rate_limiter.save_stats(session, self.leases.owner)
+                    session.commit()
+            
+            # Compile each version of the keyword set once; every source of the job shares it
+            matcher = compile_keywords(keyword_texts)
+            pipeline = self._scrape_pipeline(platform, matcher)
+            while sources:
+                logger.info(f"Running {name} scraper job for {len(sources)} sources")
+                sources_by_id.update((source.id, source) for source in sources)
+                # Later sources load while earlier ones are parsed and stored here
+                pipeline.run(self._scrape_jobs(sources), store)
+                # Claim the next batch, leaving the sources claimed meanwhile to the workers that hold them
+                sources = self.leases.claim(session, platform, LEASE_BATCH_SIZE, due_only, exclude=sources_by_id)
             
             session.close()
             
         except Exception as e:
-            logger.error(f"Error in Nextdoor scraper job: {str(e)}")
+            logger.error(f"Error in {name} scraper job: {str(e)}")
             try:
                 session.close()
             except:
                 pass
     
+    def run_facebook_scraper(self):
+        """Run the Facebook scraper for all active sources"""
+        self.run_platform('facebook')
+    
+    def run_nextdoor_scraper(self):
+        """Run the Nextdoor scraper for all active sources"""
+        self.run_platform('nextdoor')
+    
     def run_scrapers_now(self):
         """Run both scrapers immediately"""
         self.run_facebook_scraper()
         self.run_nextdoor_scraper()
+
+
+def main():
+    """Run the scheduler in the foreground until the process is told to stop"""
+    scheduler = ScraperScheduler()
+    scheduler.start()
+    
+    stopped = threading.Event()
+    for signal_number in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signal_number, lambda *args: stopped.set())
+    stopped.wait()
+    
+    # Release leases and close browsers so a redeploy hands sources over at once
+    scheduler.stop()
@@ -0,0 +1,286 @@
+import logging
+from collections import namedtuple
+
+import numpy as np
+
+from app.models.models import Match, LeadModel
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Hashed feature space; a power of two so buckets are the top bits of a product
+N_FEATURES = 2 ** 18
+
+# Multipliers for combining word values and for multiplicative (Fibonacci) hashing
+WORD_MULTIPLIER = 1099511628211
+BIGRAM_MULTIPLIER = 0xC2B2AE3D27D4EB4F
+FIBONACCI_MULTIPLIER = 0x9E3779B97F4A7C15
+
+# Bytes that belong to words: ASCII letters and digits (text is lowercased first)
+# and every byte of a non-ASCII UTF-8 character
+WORD_BYTES = np.zeros(256, dtype=bool)
+WORD_BYTES[ord('a'):ord('z') + 1] = True
+WORD_BYTES[ord('0'):ord('9') + 1] = True
+WORD_BYTES[128:] = True
+WORD_BYTE_TABLE = bytes(WORD_BYTES.astype(np.uint8))  # For bytes.translate, much faster than indexing WORD_BYTES
+
+# Masks keeping the first n bytes of a little-endian 8-byte read
+LENGTH_MASKS = np.array([(1 << (8 * n)) - 1 for n in range(8)] + [2 ** 64 - 1], dtype=np.uint64)
+
+# Posts scored or rescored per NumPy batch
+SCORE_BATCH_SIZE = 10000
+
+# Sparse binary features of a batch of posts: post rows[i] has feature columns[i]
+# (repeated for repeated n-grams), and each post's features are multiplied by scale[post]
+FeatureBatch = namedtuple('FeatureBatch', ['rows', 'columns', 'scale', 'size'])
+
+
+def extract_features(texts, n_features=N_FEATURES):
+    """
+    Turn post texts into hashed word unigram and bigram features
+
+    The whole batch is joined into one byte array and split into words,
+    hashed and bucketed with array operations, so no Python code runs per
+    word. Words are runs of ASCII letters and digits or non-ASCII bytes. A
+    word's value is its bytes read as one integer; words longer than 8 bytes
+    combine their first and last 8 bytes with their length. Each post's
+    features are scaled by 1/sqrt(feature count) so long posts do not
+    dominate.
+
+    Args:
+        texts (list): Post texts
+        n_features (int): Size of the hashed feature space, a power of two
+
+    Returns:
+        FeatureBatch: Sparse features, one row per post
+    """
+    encoded = [(text or "").lower().encode('utf-8', 'ignore') for text in texts]
+    size = len(encoded)
+    empty = FeatureBatch(np.zeros(0, np.int64), np.zeros(0, np.int64), np.zeros(size), size)
+    joined = b"\n".join(encoded)
+    if not joined:
+        return empty
+
+    # Words start and end where the byte class changes
+    is_word = np.frombuffer(joined.translate(WORD_BYTE_TABLE), dtype=bool)
+    edges = np.flatnonzero(is_word[1:] != is_word[:-1]) + 1
+    if is_word[0]:
+        edges = np.concatenate(([0], edges))
+    if is_word[-1]:
+        edges = np.concatenate((edges, [len(joined)]))
+    if not len(edges):
+        return empty
+    starts, ends = edges[0::2], edges[1::2]
+
+    # Overlapping little-endian 8-byte reads at every offset (padded past the end)
+    words_at = np.ndarray(shape=(len(joined),), dtype='<u8', buffer=joined + bytes(8), strides=(1,))
+    lengths = ends - starts
+    words = words_at[starts] & LENGTH_MASKS[np.minimum(lengths, 8)]
+    long_words = np.flatnonzero(lengths > 8)
+    words[long_words] = (
+        words[long_words] * np.uint64(WORD_MULTIPLIER) ^ words_at[ends[long_words] - 8]
+    ) + lengths[long_words].astype(np.uint64)
+
+    # Post of each word: find each post's first word, then repeat post numbers by word count
+    post_lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=size) + 1
+    post_starts = np.concatenate(([0], np.cumsum(post_lengths)[:-1]))
+    first_words = np.searchsorted(starts, post_starts)
+    rows = np.repeat(np.arange(size), np.diff(np.append(first_words, len(starts))))
+
+    # Bigrams of neighbouring words within a post
+    same_post = np.flatnonzero(rows[1:] == rows[:-1])
+    bigrams = words[same_post] * np.uint64(BIGRAM_MULTIPLIER) + words[same_post + 1]
+
+    # Bucket by the top bits of a multiplicative hash
+    shift = np.uint64(64 - (n_features.bit_length() - 1))
+    columns = ((np.concatenate((words, bigrams)) * np.uint64(FIBONACCI_MULTIPLIER)) >> shift).astype(np.int64)
+    rows = np.concatenate((rows, rows[same_post]))
+
+    counts = np.bincount(rows, minlength=size)
+    scale = 1.0 / np.sqrt(np.maximum(counts, 1))
+    return FeatureBatch(rows, columns, scale, size)
+
+
+def _sigmoid(z):
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -30, 30)))
+
+
+class LeadScorer:
+    """
+    Logistic regression over hashed n-gram features.
+
+    Scores are probabilities between 0 and 1 that a matched post is a good
+    lead, learned from the posts marked good or bad in the dashboard.
+    """
+
+    def __init__(self, weights, bias=0.0):
+        """
+        Args:
+            weights (numpy.ndarray): One weight per hashed feature
+            bias (float): Intercept
+        """
+        self.weights = np.asarray(weights, dtype=np.float32)
+        self.bias = float(bias)
+
+    @property
+    def n_features(self):
+        return len(self.weights)
+
+    def score(self, texts):
+        """
+        Score a batch of post texts
+
+        Args:
+            texts (list): Post texts
+
+        Returns:
+            numpy.ndarray: Lead probability per post
+        """
+        features = extract_features(texts, self.n_features)
+        z = np.bincount(features.rows, weights=self.weights[features.columns], minlength=features.size)
+        return _sigmoid(z * features.scale + self.bias)
+
+    @classmethod
+    def train(cls, texts, labels, n_features=N_FEATURES, epochs=100, learning_rate=0.5, l2=1e-4):
+        """
+        Fit weights to labeled posts with full-batch Adagrad
+
+        Adagrad gives every feature its own step size, so rare n-grams learn
+        as quickly as common ones.
+
+        Args:
+            texts (list): Post texts
+            labels (list): 1 for a good lead, 0 for a bad one
+            n_features (int): Size of the hashed feature space
+            epochs (int): Gradient steps
+            learning_rate (float): Base step size
+            l2 (float): L2 penalty on the weights
+
+        Returns:
+            LeadScorer: Trained scorer
+        """
+        y = np.asarray(labels, dtype=np.float64)
+        features = extract_features(texts, n_features)
+        weights = np.zeros(n_features)
+        bias = 0.0
+
+        # Only features that occur get gradient, so update just those columns
+        columns, inverse = np.unique(features.columns, return_inverse=True)
+        squared = np.zeros(len(columns))
+        bias_squared = 0.0
+        for _ in range(epochs):
+            z = np.bincount(features.rows, weights=weights[features.columns], minlength=features.size)
+            error = _sigmoid(z * features.scale + bias) - y
+            gradient = np.bincount(inverse, weights=(error * features.scale)[features.rows], minlength=len(columns))
+            gradient = gradient / len(y) + l2 * weights[columns]
+            squared += gradient * gradient
+            weights[columns] -= learning_rate * gradient / (np.sqrt(squared) + 1e-8)
+
+            bias_gradient = error.mean()
+            bias_squared += bias_gradient * bias_gradient
+            bias -= learning_rate * bias_gradient / (np.sqrt(bias_squared) + 1e-8)
+        return cls(weights, bias)
+
+    def to_bytes(self):
+        """Serialize the weights for a LeadModel row"""
+        return self.weights.astype('<f4').tobytes()
+
+    @classmethod
+    def from_model(cls, model):
+        """
+        Load a scorer from a stored LeadModel
+
+        Args:
+            model (LeadModel): Stored model
+
+        Returns:
+            LeadScorer: Scorer with the stored weights
+        """
+        return cls(np.frombuffer(model.weights, dtype='<f4'), model.bias)
+
+
+def load_scorer(session):
+    """
+    Load the active lead model
+
+    Args:
+        session (Session): Database session
+
+    Returns:
+        LeadScorer: Scorer for the newest active model, or None if none has been trained
+    """
+    model = session.query(LeadModel).filter_by(is_active=True).order_by(LeadModel.id.desc()).first()
+    return LeadScorer.from_model(model) if model else None
+
+
+def rescore_matches(session, scorer):
+    """
+    Score every stored match with a scorer, one batch at a time
+
+    Args:
+        session (Session): Database session
+        scorer (LeadScorer): Scorer to apply
+
+    Returns:
+        int: Number of matches scored
+    """
+    scored = 0
+    last_id = 0
+    while True:
+        # Page by ID so only one batch of post texts is in memory at a time
+        batch = (
+            session.query(Match.id, Match.post_text)
+            .filter(Match.id > last_id)
+            .order_by(Match.id)
+            .limit(SCORE_BATCH_SIZE)
+            .all()
+        )
+        if not batch:
+            return scored
+        scores = scorer.score([text for _, text in batch])
+        session.bulk_update_mappings(Match, [
+            {'id': match_id, 'score': float(score)} for (match_id, _), score in zip(batch, scores)
+        ])
+        scored += len(batch)
+        last_id = batch[-1][0]
+
+
+def train_lead_model(session):
+    """
+    Train a lead model from the labeled matches and make it the active one
+
+    All matches are rescored with the new model, and the models it replaces
+    are deleted. The caller commits.
+
+    Args:
+        session (Session): Database session
+
+    Returns:
+        LeadModel: The stored model
+
+    Raises:
+        ValueError: If there are not both good and bad examples to learn from
+    """
+    labeled = session.query(Match.post_text, Match.label).filter(Match.label.isnot(None)).all()
+    labels = [label for _, label in labeled]
+    if 1 not in labels or 0 not in labels:
+        raise ValueError("Mark at least one match as a good lead and one as a bad lead before training")
+
+    scorer = LeadScorer.train([text for text, _ in labeled], labels)
+    predictions = scorer.score([text for text, _ in labeled]) >= 0.5
+    accuracy = float(np.mean(predictions == np.asarray(labels, dtype=bool)))
+
+    # Each model holds a full weight vector, so drop the old ones instead of deactivating them
+    session.query(LeadModel).delete()
+    model = LeadModel(
+        weights=scorer.to_bytes(),
+        bias=scorer.bias,
+        n_features=scorer.n_features,
+        trained_on=len(labels),
+        accuracy=accuracy,
+        is_active=True
+    )
+    session.add(model)
+    scored = rescore_matches(session, scorer)
+    logger.info(f"Trained lead model on {len(labels)} labeled matches (training accuracy {accuracy:.2f}), rescored {scored} matches")
+    return model
@@ -0,0 +1,78 @@
+import logging
+import threading
+import time
+
+from app.config.settings import SESSION_TTL_SECONDS
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+
+class SessionManager:
+    """
+    Remembers when each platform's login was last verified.
+
+    One manager is shared by all scrapers of both platforms. While a session
+    is fresh, scrapers skip the logged-in DOM probe and go straight to the
+    feed; after SESSION_TTL_SECONDS, or as soon as a scraper reports an auth
+    failure, the next scrape checks again and logs in if needed.
+    """
+
+    def __init__(self, ttl_seconds=SESSION_TTL_SECONDS, clock=time.monotonic):
+        """
+        Initialize the manager
+
+        Args:
+            ttl_seconds (float): How long a verified login is trusted
+            clock (callable): Monotonic time source, replaceable in tests
+        """
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._verified = {}
+        self._lock = threading.Lock()
+
+    def is_fresh(self, key):
+        """
+        Check whether a login was verified within the TTL
+
+        Args:
+            key (tuple): (platform, account) the session belongs to
+
+        Returns:
+            bool: True if the session can be used without checking
+        """
+        with self._lock:
+            verified_at = self._verified.get(key)
+        return verified_at is not None and self.clock() - verified_at < self.ttl_seconds
+
+    def mark_valid(self, key):
+        """Record that a login was just verified"""
+        with self._lock:
+            self._verified[key] = self.clock()
+
+    def invalidate(self, key):
+        """Forget a session after an auth failure so the next scrape checks it"""
+        with self._lock:
+            self._verified.pop(key, None)
+        logger.info(f"Session for {key[0]} invalidated")
+
+    def ensure(self, scraper):
+        """
+        Make sure a scraper is logged in, checking only when the session is stale
+
+        Args:
+            scraper: FacebookScraper or NextdoorScraper
+
+        Returns:
+            bool: True if the scraper can scrape
+        """
+        key = scraper.session_key
+        if self.is_fresh(key):
+            return True
+
+        if scraper._is_logged_in() or scraper.login():
+            self.mark_valid(key)
+            return True
+
+        self.invalidate(key)
+        return False
@@ -0,0 +1,431 @@
+import os
+import re
+import json
+import time
+import random
+import threading
+from datetime import datetime, timezone
+from html import escape
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+# Post texts for synthetic feeds; some contain the keywords the benchmark searches for
+POST_TEXTS = [
+    "Can anyone recommend a good house cleaner? Ours just moved away.",
+    "Looking for a reliable maid service for a move-out clean next week.",
+    "Found a set of keys near the park entrance, message me to describe them.",
+    "Does anyone know a plumber who can come out on a weekend?",
+    "Our block party is on Saturday, everyone is welcome to bring a dish.",
+    "Recommendations for a deep cleaning company? Need carpets done too.",
+    "Lost cat, grey tabby, answers to Milo. Last seen on Oak Street.",
+    "Selling a barely used couch, pick up only, make an offer.",
+    "Who do you all use for weekly cleaning? Looking for someone trustworthy.",
+    "Road closure on Main Street tomorrow morning for utility work."
+]
+
+AUTHORS = ["Alex Morgan", "Sam Lee", "Jordan Smith", "Taylor Brown", "Casey Jones", "Riley Chen"]
+
+# Loads the next page of the feed when the viewport nears the bottom, like the real sites.
+# The first page is always rendered into the HTML by the server.
+INFINITE_SCROLL_JS = """
+(function () {
+    var feed = document.getElementById('feed');
+    var page = 1;
+    var loading = false;
+    var done = %(done)s;
+    %(render)s
+    function loadNext() {
+        loading = true;
+        fetch('%(feed_url)s' + page).then(function (response) {
+            return response.text();
+        }).then(function (text) {
+            var html = render(text);
+            if (html.trim()) {
+                feed.insertAdjacentHTML('beforeend', html);
+                page += 1;
+            } else {
+                done = true;
+            }
+            loading = false;
+        });
+    }
+    window.addEventListener('scroll', function () {
+        if (loading || done) {
+            return;
+        }
+        if (window.innerHeight + window.scrollY < document.body.scrollHeight - window.innerHeight) {
+            return;
+        }
+        loadNext();
+    });
+})();
+"""
+
+# Feed fragments are already HTML
+RENDER_HTML_JS = "function render(text) { return text; }"
+
+# Renders a Facebook GraphQL page with the same markup as facebook_article
+RENDER_FACEBOOK_JS = """
+function escapeHtml(text) {
+    var element = document.createElement('div');
+    element.textContent = text;
+    return element.innerHTML;
+}
+function render(text) {
+    var payload = JSON.parse(text.replace(/^for \\(;;\\);/, ''));
+    return payload.data.node.group_feed.edges.map(function (edge) {
+        var story = edge.node;
+        return '<div role="article" class="post"><strong>' + escapeHtml(story.actors[0].name) + '</strong>' +
+            '<a href="' + story.url + '"><abbr data-utime="' + story.creation_time + '">1h</abbr></a>' +
+            '<div dir="auto">' + escapeHtml(story.comet_sections.content.story.message.text) + '</div></div>';
+    }).join('');
+}
+"""
+
+# Renders a Nextdoor GraphQL page with the same markup as nextdoor_item
+RENDER_NEXTDOOR_JS = """
+function escapeHtml(text) {
+    var element = document.createElement('div');
+    element.textContent = text;
+    return element.innerHTML;
+}
+function render(text) {
+    var payload = JSON.parse(text);
+    return payload.data.feed.feedItems.map(function (item) {
+        var post = item.post;
+        return '<div class="post-list-item post"><div class="post-byline">' +
+            '<a href="/profile/' + post.id + '/">' + escapeHtml(post.author.displayName) + '</a>' +
+            '<time datetime="' + post.createdAt.asDateTime + '">1 hr ago</time></div>' +
+            '<a href="' + post.permalinkUrl + '">View post</a>' +
+            '<div class="post-content">' + escapeHtml(post.body) + '</div></div>';
+    }).join('');
+}
+"""
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head><meta charset="utf-8"><title>%(title)s</title>
+<style>.post { min-height: 240px; border-bottom: 1px solid #ddd; }</style></head>
+<body>
+<div aria-label="Your profile"></div>
+<button aria-label="User menu"></button>
+<div id="feed" role="feed">
+%(posts)s
+</div>
+<script>%(script)s</script>
+</body>
+</html>
+"""
+
+
+def synthetic_posts(name, count, seed=0, newest=None):
+    """
+    Build a deterministic feed, newest post first
+
+    Args:
+        name (str): Group or neighborhood name, used as part of the seed
+        count (int): Number of posts in the feed
+        seed (int): Extra seed so different runs can use different feeds
+        newest (int): Unix timestamp of the newest post
+
+    Returns:
+        list: Dictionaries with id, text, author and utime
+    """
+    rng = random.Random(f"{name}:{seed}")
+    newest = newest or 1700000000
+    return [
+        {
+            'id': str(1000000 + count - i),
+            'text': rng.choice(POST_TEXTS),
+            'author': rng.choice(AUTHORS),
+            'utime': newest - i * 600
+        }
+        for i in range(count)
+    ]
+
+
+def facebook_article(group, post):
+    """Render one post the way the Facebook scraper's selectors expect"""
+    return (
+        '<div role="article" class="post">'
+        f'<strong>{escape(post["author"])}</strong>'
+        f'<a href="/groups/{group}/posts/{post["id"]}/"><abbr data-utime="{post["utime"]}">1h</abbr></a>'
+        f'<div dir="auto">{escape(post["text"])}</div>'
+        '</div>'
+    )
+
+
+def nextdoor_item(neighborhood, post):
+    """Render one post the way the Nextdoor scraper's selectors expect"""
+    posted = datetime.fromtimestamp(post['utime'], tz=timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+    return (
+        '<div class="post-list-item post">'
+        f'<div class="post-byline"><a href="/profile/{post["id"]}/">{escape(post["author"])}</a>'
+        f'<time datetime="{posted}">1 hr ago</time></div>'
+        f'<a href="/p/post/{post["id"]}/">View post</a>'
+        f'<div class="post-content">{escape(post["text"])}</div>'
+        '</div>'
+    )
+
+
+def facebook_story(base_url, group, post):
+    """Build one group feed story the way Facebook's GraphQL responses nest it"""
+    return {
+        '__typename': 'Story',
+        'post_id': post['id'],
+        'url': f"{base_url}/groups/{group}/posts/{post['id']}/",
+        'creation_time': post['utime'],
+        'actors': [{'__typename': 'User', 'name': post['author']}],
+        'comet_sections': {'content': {'story': {'message': {'text': post['text']}}}}
+    }
+
+
+def nextdoor_post(base_url, post):
+    """Build one feed item the way Nextdoor's GraphQL responses nest it"""
+    posted = datetime.fromtimestamp(post['utime'], tz=timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+    return {
+        'post': {
+            'id': post['id'],
+            'body': post['text'],
+            'author': {'displayName': post['author']},
+            'createdAt': {'asDateTime': posted},
+            'permalinkUrl': f"{base_url}/p/post/{post['id']}/"
+        }
+    }
+
+
+class FeedRequestHandler(BaseHTTPRequestHandler):
+    """Serves feed pages, their infinite-scroll fragments and the JSON feed API"""
+
+    ROUTES = [
+        (re.compile(r'^/groups/([^/]+)/?$'), 'facebook', False),
+        (re.compile(r'^/groups/([^/]+)/feed$'), 'facebook', True),
+        (re.compile(r'^/neighborhood/([^/]+)/?$'), 'nextdoor', False),
+        (re.compile(r'^/neighborhood/([^/]+)/feed$'), 'nextdoor', True)
+    ]
+
+    # JSON endpoints and the query parameter naming the feed
+    API_ROUTES = {
+        '/api/graphql/': ('facebook', 'group'),
+        '/api/gql/feed': ('nextdoor', 'neighborhood')
+    }
+
+    def do_GET(self):
+        """Route a request to a recording, a feed page, a feed fragment or the feed API"""
+        server = self.server.feed_server
+        parsed = urlparse(self.path)
+        query = parse_qs(parsed.query)
+        page = int(query.get('page', ['0'])[0])
+        server.record_request(parsed.path)
+        if server.latency_ms:
+            time.sleep(server.latency_ms / 1000.0)
+
+        recording = server.recording_for(parsed.path, page)
+        if recording is not None:
+            return self._send(*recording)
+
+        if parsed.path in ('/', '/login'):
+            return self._send(PAGE_TEMPLATE % {'title': 'Home', 'posts': '', 'script': ''})
+
+        if parsed.path in self.API_ROUTES:
+            platform, parameter = self.API_ROUTES[parsed.path]
+            name = query.get(parameter, ['test'])[0]
+            return self._send(server.payload(platform, name, page), 'application/json')
+
+        for pattern, platform, fragment in self.ROUTES:
+            match = pattern.match(parsed.path)
+            if match:
+                return self._send(server.render(platform, match.group(1), page if fragment else 0, fragment))
+
+        self.send_error(404)
+
+    def _send(self, body, content_type='text/html'):
+        """Write a response"""
+        data = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', f'{content_type}; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        """Keep benchmark and test output quiet"""
+        pass
+
+
+class FeedServer:
+    """
+    Local HTTP server with Facebook-group and Nextdoor-feed fixtures.
+
+    Pages are synthetic unless a recording exists: a request for
+    /groups/test is answered with <recordings_dir>/groups_test.html when
+    that file is present, and API responses with api_graphql.<page>.json
+    or api_graphql.json. Synthetic feeds paginate like the real sites,
+    appending page_size posts each time the page is scrolled near the
+    bottom, and every response is delayed by latency_ms.
+
+    With api=True the first page is rendered into the HTML and later pages
+    load from the JSON feed API, the way the real feeds do, so network
+    extraction has responses to read and posts only the page has.
+    """
+
+    def __init__(self, posts=200, page_size=10, latency_ms=0, recordings_dir=None, seed=0,
+                 api=False, host='127.0.0.1', port=0):
+        """
+        Initialize the server
+
+        Args:
+            posts (int): Posts in every synthetic feed
+            page_size (int): Posts per page, on first load and per scroll
+            latency_ms (int): Delay added to every response
+            recordings_dir (str): Directory of recorded HTML pages
+            seed (int): Seed for the synthetic feeds
+            api (bool): Load posts from the JSON feed API instead of HTML fragments
+            host (str): Interface to listen on
+            port (int): Port to listen on, 0 picks a free one
+        """
+        self.posts = posts
+        self.page_size = max(1, page_size)
+        self.latency_ms = latency_ms
+        self.recordings_dir = recordings_dir
+        self.seed = seed
+        self.api = api
+        self.host = host
+        self.port = port
+        self.requests = []
+        self._feeds = {}
+        self._lock = threading.Lock()
+        self._httpd = None
+        self._thread = None
+
+    @property
+    def base_url(self):
+        """Root URL of the running server"""
+        return f"http://{self.host}:{self.port}"
+
+    def url(self, path):
+        """Absolute URL of a path on the server"""
+        return self.base_url + path
+
+    def facebook_group_url(self, name='test'):
+        """URL of a synthetic Facebook group"""
+        return self.url(f"/groups/{name}/")
+
+    def nextdoor_feed_url(self, name='test'):
+        """URL of a synthetic Nextdoor neighborhood"""
+        return self.url(f"/neighborhood/{name}/")
+
+    def feed(self, name):
+        """Synthetic posts of a group or neighborhood, built once per name"""
+        with self._lock:
+            if name not in self._feeds:
+                self._feeds[name] = synthetic_posts(name, self.posts, self.seed)
+            return self._feeds[name]
+
+    def render(self, platform, name, page=0, fragment=False):
+        """
+        Render a feed page or the fragment loaded by one scroll
+
+        Args:
+            platform (str): 'facebook' or 'nextdoor'
+            name (str): Group or neighborhood name
+            page (int): Page number, 0 is the first load
+            fragment (bool): Return only the posts, as fetched by the scroll script
+
+        Returns:
+            str: HTML
+        """
+        posts = self.feed(name)[page * self.page_size:(page + 1) * self.page_size]
+        render_post = facebook_article if platform == 'facebook' else nextdoor_item
+        html = "\n".join(render_post(name, post) for post in posts)
+        if fragment:
+            return html
+
+        if self.api:
+            # The first page is rendered by the server; scrolling fetches the rest from the feed API
+            if platform == 'facebook':
+                feed_url, render = f"/api/graphql/?group={name}&page=", RENDER_FACEBOOK_JS
+            else:
+                feed_url, render = f"/api/gql/feed?neighborhood={name}&page=", RENDER_NEXTDOOR_JS
+        else:
+            prefix = 'groups' if platform == 'facebook' else 'neighborhood'
+            feed_url, render = f"/{prefix}/{name}/feed?page=", RENDER_HTML_JS
+
+        script = INFINITE_SCROLL_JS % {
+            'feed_url': feed_url,
+            'render': render,
+            'done': 'true' if len(self.feed(name)) <= self.page_size else 'false'
+        }
+        return PAGE_TEMPLATE % {'title': escape(name), 'posts': html, 'script': script}
+
+    def payload(self, platform, name, page=0):
+        """
+        Render one page of the JSON feed API
+
+        Args:
+            platform (str): 'facebook' or 'nextdoor'
+            name (str): Group or neighborhood name
+            page (int): Page number
+
+        Returns:
+            str: Response body; Facebook's carries the for (;;); guard like the real one
+        """
+        posts = self.feed(name)[page * self.page_size:(page + 1) * self.page_size]
+        has_next = (page + 1) * self.page_size < len(self.feed(name))
+        if platform == 'facebook':
+            edges = [{'node': facebook_story(self.base_url, name, post)} for post in posts]
+            body = {'data': {'node': {'group_feed': {'edges': edges, 'page_info': {'has_next_page': has_next}}}}}
+            return 'for (;;);' + json.dumps(body)
+        items = [nextdoor_post(self.base_url, post) for post in posts]
+        return json.dumps({'data': {'feed': {'feedItems': items, 'pageInfo': {'hasNextPage': has_next}}}})
+
+    def recording_for(self, path, page=0):
+        """
+        Return a recorded response for a path
+
+        Returns:
+            tuple: (body, content type), or None if nothing was recorded
+        """
+        if not self.recordings_dir:
+            return None
+        slug = path.strip('/').replace('/', '_') or 'index'
+        candidates = [
+            (f"{slug}.{page}.json", 'application/json'),
+            (f"{slug}.json", 'application/json'),
+            (f"{slug}.html", 'text/html')
+        ]
+        for name, content_type in candidates:
+            filename = os.path.join(self.recordings_dir, name)
+            if os.path.isfile(filename):
+                with open(filename, 'r', encoding='utf-8') as f:
+                    return f.read(), content_type
+        return None
+
+    def record_request(self, path):
+        """Remember a served path so tests and benchmarks can count page loads"""
+        with self._lock:
+            self.requests.append(path)
+
+    def start(self):
+        """Start serving on a background thread"""
+        self._httpd = ThreadingHTTPServer((self.host, self.port), FeedRequestHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.feed_server = self
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='feed-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the server"""
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
@@ -0,0 +1,134 @@
+"""
+Keyword matching micro-benchmark.
+
+Compares the scrapers' original post x keyword loop, which lowercases the
+post once per keyword, with the compiled Aho-Corasick matcher, for growing
+keyword sets.
+
+Usage:
+    python -m benchmarks.keyword_benchmark --keywords 10 100 1000 --posts 2000
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.scraper.matcher import KeywordMatcher
+
+WORDS = [
+    "house", "cleaner", "cleaning", "maid", "service", "weekly", "deep", "carpet", "window", "move",
+    "out", "office", "apartment", "recommend", "looking", "for", "need", "help", "today", "tomorrow",
+    "reliable", "affordable", "trusted", "local", "team", "company", "spring", "kitchen", "bathroom", "laundry"
+]
+
+
+def make_keywords(count, seed=0):
+    """Build count distinct two or three word keyword variants"""
+    rng = random.Random(seed)
+    keywords = []
+    seen = set()
+    while len(keywords) < count:
+        keyword = " ".join(rng.choice(WORDS) for _ in range(rng.choice((2, 3))))
+        if keyword not in seen:
+            seen.add(keyword)
+            keywords.append(keyword)
+    return keywords
+
+
+# Everyday neighborhood chatter that matches no cleaning keyword
+FILLER = [
+    "garage", "sale", "lost", "dog", "park", "road", "closure", "party", "pizza", "school",
+    "bus", "traffic", "neighbors", "fence", "tree", "storm", "power", "outage", "library", "event"
+]
+
+
+def make_posts(count, keywords, match_rate=0.05, seed=0):
+    """
+    Build count posts of realistic length
+
+    Most posts in a feed are unrelated, so only match_rate of them get a keyword.
+    """
+    rng = random.Random(seed)
+    posts = []
+    for _ in range(count):
+        words = [rng.choice(FILLER) for _ in range(rng.randint(20, 80))]
+        if keywords and rng.random() < match_rate:
+            words.insert(rng.randrange(len(words)), rng.choice(keywords))
+        posts.append(" ".join(words).capitalize())
+    return posts
+
+
+def match_loop(posts, keywords):
+    """The original matching: one lowercase and substring search per post and keyword"""
+    matched = []
+    for text in posts:
+        for keyword in keywords:
+            if text and keyword and keyword.lower() in text.lower():
+                matched.append(keyword)
+                break
+    return matched
+
+
+def match_automaton(posts, keywords):
+    """Matching with one compiled automaton and one scan per post, compile time included"""
+    matcher = KeywordMatcher(keywords)
+    return [keyword for keyword in (matcher.first_match(text) for text in posts) if keyword]
+
+
+def run(keyword_counts, post_count=2000, repeat=3):
+    """
+    Time both implementations for each keyword count
+
+    Returns:
+        list: Dictionaries with the keyword count and best-of-repeat seconds per implementation
+    """
+    results = []
+    for count in keyword_counts:
+        keywords = make_keywords(count)
+        posts = make_posts(post_count, keywords)
+        timings = {}
+        for name, implementation in (('loop', match_loop), ('automaton', match_automaton)):
+            best = None
+            for _ in range(repeat):
+                started = time.perf_counter()
+                matched = implementation(posts, keywords)
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+            timings[name] = (best, matched)
+
+        if timings['loop'][1] != timings['automaton'][1]:
+            raise AssertionError(f"Implementations disagree with {count} keywords")
+        results.append({
+            'keywords': count,
+            'posts': post_count,
+            'matched': len(timings['loop'][1]),
+            'loop_seconds': timings['loop'][0],
+            'automaton_seconds': timings['automaton'][0]
+        })
+    return results
+
+
+def main(argv=None):
+    """Run the benchmark from the command line"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--keywords', nargs='+', type=int, default=[10, 100, 1000])
+    parser.add_argument('--posts', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    results = run(args.keywords, args.posts, args.repeat)
+    print(f"{'keywords':>9}{'posts':>7}{'matched':>9}{'loop ms':>10}{'automaton ms':>14}{'speedup':>9}")
+    for result in results:
+        speedup = result['loop_seconds'] / result['automaton_seconds'] if result['automaton_seconds'] else 0.0
+        print(
+            f"{result['keywords']:>9}{result['posts']:>7}{result['matched']:>9}"
+            f"{result['loop_seconds'] * 1000:>10.1f}{result['automaton_seconds'] * 1000:>14.1f}{speedup:>8.1f}x"
+        )
+    return results
+
+
+if __name__ == '__main__':
+    main()
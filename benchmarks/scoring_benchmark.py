@@ -0,0 +1,79 @@
+"""
+Lead scoring micro-benchmark.
+
+Times hashed n-gram feature extraction plus linear scoring for batches of
+synthetic posts, and training on a labeled sample.
+
+Usage:
+    python -m benchmarks.scoring_benchmark --posts 10000 --repeat 5
+"""
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.scraper.scoring import LeadScorer, N_FEATURES
+from benchmarks.keyword_benchmark import make_keywords, make_posts
+
+
+def run(post_count=10000, repeat=5, train_count=500):
+    """
+    Time scoring a batch of posts and training on a labeled sample
+
+    Posts containing one of the synthetic keywords are labeled good leads,
+    so the trained model should separate them from the rest.
+
+    Returns:
+        dict: Best-of-repeat scoring seconds, training seconds and held-out accuracy
+    """
+    keywords = make_keywords(50)
+    posts = make_posts(post_count, keywords, match_rate=0.5)
+    labels = [int(any(keyword in post.lower() for keyword in keywords)) for post in posts]
+
+    scorer = LeadScorer(np.random.RandomState(0).normal(0, 0.1, N_FEATURES))
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        scorer.score(posts)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+
+    started = time.perf_counter()
+    trained = LeadScorer.train(posts[:train_count], labels[:train_count])
+    train_seconds = time.perf_counter() - started
+
+    held_out = posts[train_count:]
+    predictions = trained.score(held_out) >= 0.5
+    accuracy = float(np.mean(predictions == np.asarray(labels[train_count:], dtype=bool))) if held_out else 0.0
+    return {
+        'posts': post_count,
+        'score_seconds': best,
+        'train_posts': min(train_count, post_count),
+        'train_seconds': train_seconds,
+        'accuracy': accuracy
+    }
+
+
+def main(argv=None):
+    """Run the benchmark from the command line"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--posts', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--train', type=int, default=500)
+    args = parser.parse_args(argv)
+
+    result = run(args.posts, args.repeat, args.train)
+    print(f"Scored {result['posts']} posts in {result['score_seconds'] * 1000:.1f} ms")
+    print(
+        f"Trained on {result['train_posts']} posts in {result['train_seconds'] * 1000:.1f} ms, "
+        f"held-out accuracy {result['accuracy']:.3f}"
+    )
+    return result
+
+
+if __name__ == '__main__':
+    main()
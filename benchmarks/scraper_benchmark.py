@@ -0,0 +1,192 @@
+"""
+Scraper throughput benchmark against the local fixture feed server.
+
+Runs FacebookScraper and NextdoorScraper in real Chrome against synthetic
+feeds and reports posts per second, WebDriver round trips per post and wall
+time per scroll step for each extraction mode. Nothing leaves the machine,
+so results are comparable between runs and between branches.
+
+Usage:
+    python -m benchmarks.scraper_benchmark --modes script webdriver snapshot network --latency-ms 150
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+from collections import Counter
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.scraper.facebook_scraper import FacebookScraper
+from app.scraper.nextdoor_scraper import NextdoorScraper
+from app.scraper.resources import ResourcePolicy
+from app.scraper.session import SessionManager
+from benchmarks.feed_server import FeedServer
+
+KEYWORDS = ['house cleaner', 'maid service', 'deep cleaning', 'weekly cleaning']
+
+
+class RoundTripCounter:
+    """
+    Counts the WebDriver commands a driver sends.
+
+    Every driver and element call goes through WebDriver.execute, so wrapping
+    it on the instance counts each HTTP round trip to chromedriver.
+    """
+
+    def __init__(self, driver):
+        """Start counting commands sent by driver"""
+        self.driver = driver
+        self.commands = Counter()
+        self._execute = driver.execute
+
+        def execute(driver_command, params=None):
+            self.commands[driver_command] += 1
+            return self._execute(driver_command, params)
+
+        driver.execute = execute
+
+    @property
+    def count(self):
+        """Round trips since the last reset"""
+        return sum(self.commands.values())
+
+    def reset(self):
+        """Start a new measurement"""
+        self.commands = Counter()
+
+
+def _summarize_steps(steps):
+    """Mean, median and max of scroll step times in milliseconds"""
+    if not steps:
+        return {'scroll_steps': 0, 'scroll_step_ms_mean': 0.0, 'scroll_step_ms_median': 0.0, 'scroll_step_ms_max': 0.0}
+    millis = [step * 1000 for step in steps]
+    return {
+        'scroll_steps': len(millis),
+        'scroll_step_ms_mean': statistics.mean(millis),
+        'scroll_step_ms_median': statistics.median(millis),
+        'scroll_step_ms_max': max(millis)
+    }
+
+
+def benchmark_scraper(platform, server, mode, max_posts=50, repeat=3, headless=True):
+    """
+    Scrape a fixture feed repeatedly with one extraction mode
+
+    Args:
+        platform (str): 'facebook' or 'nextdoor'
+        server (FeedServer): Running fixture server
+        mode (str): Extraction mode passed to the scraper
+        max_posts (int): Posts to load per scrape
+        repeat (int): Number of scrapes, each of a different feed
+        headless (bool): Run Chrome headless
+
+    Returns:
+        dict: Throughput, round trips and scroll step timings
+    """
+    scraper_class = FacebookScraper if platform == 'facebook' else NextdoorScraper
+    scraper = scraper_class(
+        headless=headless, extraction_mode=mode, resource_policy=ResourcePolicy(enabled=False),
+        session_manager=SessionManager(ttl_seconds=24 * 3600)
+    )
+
+    # The fixture pages need no login; a fresh session keeps the scraper from looking for one
+    scraper.session_manager.mark_valid(scraper.session_key)
+
+    extracted = []
+    extract_posts = scraper._extract_posts
+
+    def counting_extract():
+        posts = extract_posts()
+        extracted.append(len(posts))
+        return posts
+
+    scraper._extract_posts = counting_extract
+
+    try:
+        scraper._setup_driver()
+        counter = RoundTripCounter(scraper.driver)
+        round_trips, steps, matched, elapsed = 0, [], 0, 0.0
+
+        for run in range(repeat):
+            # A new feed each run so the browser cache does not flatter later runs
+            name = f"{mode}-{run}"
+            url = server.facebook_group_url(name) if platform == 'facebook' else server.nextdoor_feed_url(name)
+
+            counter.reset()
+            started = time.perf_counter()
+            if platform == 'facebook':
+                matched += len(scraper.scrape_group(url, KEYWORDS, max_posts=max_posts))
+            else:
+                matched += len(scraper.scrape_neighborhood(url, KEYWORDS, max_posts=max_posts))
+            elapsed += time.perf_counter() - started
+
+            round_trips += counter.count
+            steps.extend(scraper.scrape_stats.get('scroll_waits', []))
+
+        posts = sum(extracted)
+        result = {
+            'platform': platform,
+            'mode': mode,
+            'runs': repeat,
+            'posts': posts,
+            'matched': matched,
+            'seconds': elapsed,
+            'posts_per_second': posts / elapsed if elapsed else 0.0,
+            'round_trips': round_trips,
+            'round_trips_per_post': round_trips / posts if posts else 0.0
+        }
+        result.update(_summarize_steps(steps))
+        return result
+    finally:
+        scraper.close()
+
+
+def format_results(results):
+    """Render benchmark results as a fixed-width table"""
+    header = f"{'platform':<10}{'mode':<10}{'posts':>7}{'posts/s':>10}{'rt/post':>9}{'steps':>7}{'step ms':>10}{'max ms':>9}"
+    lines = [header, '-' * len(header)]
+    for result in results:
+        lines.append(
+            f"{result['platform']:<10}{result['mode']:<10}{result['posts']:>7}"
+            f"{result['posts_per_second']:>10.1f}{result['round_trips_per_post']:>9.2f}"
+            f"{result['scroll_steps']:>7}{result['scroll_step_ms_mean']:>10.1f}{result['scroll_step_ms_max']:>9.1f}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    """Run the benchmark from the command line"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--platforms', nargs='+', default=['facebook', 'nextdoor'], choices=['facebook', 'nextdoor'])
+    parser.add_argument('--modes', nargs='+', default=['script', 'webdriver', 'snapshot', 'network'])
+    parser.add_argument('--posts', type=int, default=200, help="posts in each fixture feed")
+    parser.add_argument('--page-size', type=int, default=10, help="posts loaded per scroll")
+    parser.add_argument('--latency-ms', type=int, default=0, help="delay added to every response")
+    parser.add_argument('--max-posts', type=int, default=50, help="posts each scrape loads")
+    parser.add_argument('--repeat', type=int, default=3, help="scrapes per platform and mode")
+    parser.add_argument('--recordings', help="directory of recorded HTML pages to serve instead of synthetic ones")
+    parser.add_argument('--api', action='store_true', help="load posts after the first page from the JSON feed API (implied by the network mode)")
+    parser.add_argument('--no-headless', action='store_true', help="show the browser")
+    parser.add_argument('--json', help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    with FeedServer(posts=args.posts, page_size=args.page_size, latency_ms=args.latency_ms,
+                    recordings_dir=args.recordings, api=args.api or 'network' in args.modes) as server:
+        results = [
+            benchmark_scraper(platform, server, mode, args.max_posts, args.repeat, not args.no_headless)
+            for platform in args.platforms
+            for mode in args.modes
+        ]
+
+    print(format_results(results))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -2,17 +2,33 @@ import unittest
 import os
 import sys
 import json
+import socket
+import asyncio
+import threading
+import tempfile
+import subprocess
+from fnmatch import fnmatch
 from datetime import datetime, timedelta
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
+
+import requests
 
 # Add the parent directory to the path so we can import our app modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from app.models.models import Base, Source, Keyword, Match, NotificationSetting
+from app.models.models import Base, Source, Keyword, Match, NotificationSetting, upgrade_db
 from app.scraper.facebook_scraper import FacebookScraper
 from app.scraper.nextdoor_scraper import NextdoorScraper
+from app.scraper.probing import ElementProber, SCROLL_AND_WAIT_JS
+from app.scraper.cursor import filter_new_posts, advance_cursor
+from app.scraper import playwright_scraper, html_parser
+from app.scraper.concurrency import SUCCESS, TIMEOUT, CAPTCHA, AUTH_FAILURE
+from app.scraper.resources import ResourcePolicy, measure_transfer
+from app.scraper.profiles import profile_dir, apply_profile
+from app.scraper.session import SessionManager
 from app.alert.alert_system import AlertSystem
 from app.config.settings import DATABASE_URL
+from benchmarks.feed_server import FeedServer
 
 # Use an in-memory SQLite database for testing
 TEST_DATABASE_URL = "sqlite:///:memory:"
@@ -158,6 +174,23 @@ class TestModels(unittest.TestCase):
         self.assertEqual(queried_settings.email_address, "test@example.com")
         self.assertTrue(queried_settings.slack_enabled)
         self.assertEqual(queried_settings.slack_webhook, "https://hooks.slack.com/services/xxx/yyy/zzz")
+    
+    def test_upgrade_db_adds_missing_columns(self):
+        """Test that columns added to a model are created on existing tables"""
+        from sqlalchemy import create_engine, inspect, text
+        
+        engine = create_engine(TEST_DATABASE_URL)
+        with engine.begin() as connection:
+            connection.execute(text(
+                "CREATE TABLE sources (id INTEGER PRIMARY KEY, name VARCHAR(255), url VARCHAR(512), "
+                "source_type VARCHAR(50), is_active BOOLEAN, created_at DATETIME, last_scraped DATETIME)"
+            ))
+        
+        upgrade_db(engine)
+        
+        columns = {column['name'] for column in inspect(engine).get_columns('sources')}
+        self.assertIn('last_post_id', columns)
+        self.assertIn('last_post_date', columns)
 
 
 class TestFacebookScraper(unittest.TestCase):
@@ -190,6 +223,25 @@ class TestFacebookScraper(unittest.TestCase):
                 mock_driver.get.assert_called_with('https://www.facebook.com/')
                 mock_driver.add_cookie.assert_called()
     
+    @patch('app.scraper.facebook_scraper.webdriver.Chrome')
+    def test_login_with_warm_profile(self, mock_chrome):
+        """Test that a profile that is still logged in skips cookie injection"""
+        mock_driver = MagicMock()
+        mock_chrome.return_value = mock_driver
+        
+        with tempfile.TemporaryDirectory() as root, \
+             patch.object(FacebookScraper, '_is_logged_in', return_value=True):
+            path = profile_dir('facebook', 'me@example.com', 0, root=root)
+            os.makedirs(os.path.join(path, 'Default'))
+            
+            scraper = FacebookScraper(profile_dir=path)
+            
+            self.assertTrue(scraper.login())
+            mock_driver.add_cookie.assert_not_called()
+            self.assertTrue(scraper.startup_stats['warm_profile'])
+            self.assertIn('login_seconds', scraper.startup_stats)
+            self.assertIn(f'--user-data-dir={path}', mock_chrome.call_args[1]['options'].arguments)
+    
     @patch('app.scraper.facebook_scraper.webdriver.Chrome')
     def test_match_keyword(self, mock_chrome):
         """Test keyword matching"""
@@ -202,6 +254,523 @@ class TestFacebookScraper(unittest.TestCase):
         self.assertFalse(scraper._match_keyword("I'm looking for a plumber", "house cleaner"))
         self.assertFalse(scraper._match_keyword("", "house cleaner"))
         self.assertFalse(scraper._match_keyword("I need a cleaner", ""))
+    
+    def test_extract_posts_single_round_trip(self):
+        """Test that script extraction reads the page with one WebDriver call"""
+        scraper = FacebookScraper(extraction_mode='script')
+        scraper.driver = MagicMock()
+        scraper.driver.execute_script.return_value = [
+            {
+                'permalink': 'https://www.facebook.com/groups/test/posts/123456789/',
+                'url': 'https://www.facebook.com/groups/test/posts/123456789/',
+                'text': 'Can anyone recommend a house cleaner?',
+                'author': 'John Doe',
+                'utime': '1700000000'
+            },
+            {'permalink': '', 'url': '', 'text': '', 'author': '', 'utime': None}
+        ]
+        
+        posts = scraper._extract_posts()
+        
+        scraper.driver.execute_script.assert_called_once()
+        scraper.driver.find_elements.assert_not_called()
+        self.assertEqual(len(posts), 1)
+        self.assertEqual(posts[0]['id'], '123456789')
+        self.assertEqual(posts[0]['author'], 'John Doe')
+        self.assertEqual(posts[0]['date'], datetime.fromtimestamp(1700000000))
+        self.assertEqual(posts[0]['source_type'], 'facebook')
+    
+    def test_scroll_returns_as_soon_as_posts_load(self):
+        """Test that scrolling is driven by new posts instead of fixed sleeps"""
+        scraper = FacebookScraper()
+        scraper.driver = MagicMock()
+        scraper.driver.find_elements.return_value = [MagicMock()] * 5
+        scraper.driver.execute_async_script.side_effect = [
+            {'before': 5, 'count': 12, 'waited_ms': 300.0, 'timed_out': False},
+            {'before': 12, 'count': 20, 'waited_ms': 450.0, 'timed_out': False}
+        ]
+        
+        with patch('app.scraper.facebook_scraper.time.sleep') as mock_sleep:
+            scraper._scroll_to_load_posts(20)
+        
+        mock_sleep.assert_not_called()
+        self.assertEqual(scraper.driver.execute_async_script.call_count, 2)
+        self.assertEqual(scraper.prober.stats()['scroll_waits'], [0.3, 0.45])
+    
+    def test_scroll_stops_at_end_of_feed(self):
+        """Test that repeated timeouts without new posts end the scroll loop"""
+        scraper = FacebookScraper()
+        scraper.driver = MagicMock()
+        scraper.driver.find_elements.return_value = [MagicMock()] * 3
+        scraper.driver.execute_async_script.return_value = {'before': 3, 'count': 3, 'waited_ms': 5000.0, 'timed_out': True}
+        
+        scraper._scroll_to_load_posts(20)
+        
+        self.assertEqual(scraper.driver.execute_async_script.call_count, 2)
+
+
+class TestNextdoorScraper(unittest.TestCase):
+    """Test the Nextdoor scraper"""
+    
+    def test_extract_posts_single_round_trip(self):
+        """Test that script extraction reads the page with one WebDriver call"""
+        scraper = NextdoorScraper(extraction_mode='script')
+        scraper.driver = MagicMock()
+        scraper.driver.execute_script.return_value = [
+            {
+                'url': 'https://nextdoor.com/p/post/987654/',
+                'text': 'Looking for a reliable cleaning service',
+                'author': 'Jane Doe',
+                'datetime': '2024-01-02T03:04:05.000Z'
+            }
+        ]
+        
+        posts = scraper._extract_posts()
+        
+        scraper.driver.execute_script.assert_called_once()
+        self.assertEqual(posts, [{
+            'id': '987654',
+            'url': 'https://nextdoor.com/p/post/987654/',
+            'text': 'Looking for a reliable cleaning service',
+            'author': 'Jane Doe',
+            'date': datetime(2024, 1, 2, 3, 4, 5),
+            'source_type': 'nextdoor'
+        }])
+
+
+class FixturePage:
+    """
+    Stand-in for a Playwright page showing a feed from the benchmark fixture server
+    
+    Page scripts are answered from the served HTML: extraction uses the
+    snapshot parser, which returns the same records as EXTRACT_POSTS_JS,
+    and each scroll appends the next feed fragment like the page's own
+    infinite-scroll script.
+    """
+    
+    def __init__(self, logged_in=True):
+        self.url = 'about:blank'
+        self.html = ""
+        self.logged_in = logged_in
+        self.scrolls = 0
+        self.config = playwright_scraper.PLATFORMS['facebook']
+    
+    def _records(self):
+        return html_parser.facebook_records(self.html, self.url)
+    
+    async def goto(self, url):
+        self.url = url
+        self.html = requests.get(url).text
+    
+    async def wait_for_selector(self, selector, timeout=None):
+        if not self._records():
+            raise playwright_scraper.PlaywrightTimeoutError(f"Timeout waiting for {selector}")
+    
+    def locator(self, selector):
+        count = len(self._records()) if selector == self.config['post_selector'] else int(self.logged_in)
+        return MagicMock(count=AsyncMock(return_value=count))
+    
+    async def evaluate(self, script, args=None):
+        if script == playwright_scraper.page_function(self.config['known_post_js']):
+            return args[0] in [post['id'] for post in self.config['build_posts'](self._records())]
+        if script == playwright_scraper.async_page_function(SCROLL_AND_WAIT_JS):
+            before = len(self._records())
+            self.scrolls += 1
+            self.html += requests.get(f"{self.url}feed?page={self.scrolls}").text
+            count = len(self._records())
+            return {'count': count, 'before': before, 'timed_out': count <= before}
+        if script == playwright_scraper.page_function(self.config['extract_js']):
+            return self._records()
+        raise AssertionError("Unexpected page script")
+
+
+class FixtureBrowser:
+    """Stand-in for the shared Chromium; every context shows the same FixturePage"""
+    
+    def __init__(self, page):
+        self.page = page
+        self.contexts_closed = 0
+    
+    async def new_context(self, **kwargs):
+        browser = self
+        context = MagicMock()
+        context.route = AsyncMock()
+        context.new_page = AsyncMock(return_value=self.page)
+        context.new_cdp_session = AsyncMock(return_value=MagicMock(send=AsyncMock()))
+        
+        async def close():
+            browser.contexts_closed += 1
+        
+        context.close = close
+        return context
+
+
+class CountingBrowser(FixtureBrowser):
+    """Fixture browser whose pages take a moment to time out, counting the contexts open at once"""
+    
+    def __init__(self):
+        page = MagicMock()
+        
+        async def goto(url):
+            await asyncio.sleep(0.02)
+            raise playwright_scraper.PlaywrightTimeoutError("Timeout")
+        
+        page.goto = goto
+        super().__init__(page)
+        self.open = 0
+        self.peak = 0
+    
+    async def new_context(self, **kwargs):
+        context = await super().new_context(**kwargs)
+        self.open += 1
+        self.peak = max(self.peak, self.open)
+        close = context.close
+        
+        async def counted_close():
+            self.open -= 1
+            await close()
+        
+        context.close = counted_close
+        return context
+
+
+class TestPlaywrightScraper(unittest.TestCase):
+    """Test the Playwright backend helpers"""
+    
+    def test_selenium_cookies_to_storage_state(self):
+        """Test that saved Selenium cookies seed the shared storage state"""
+        state = playwright_scraper.selenium_cookies_to_storage_state([
+            {'name': 'c_user', 'value': '1', 'domain': '.facebook.com', 'path': '/', 'expiry': 1900000000, 'secure': True, 'httpOnly': False, 'sameSite': 'None'},
+            {'name': 'xs', 'value': '2', 'domain': '.facebook.com'}
+        ])
+        
+        self.assertEqual(state['origins'], [])
+        self.assertEqual(state['cookies'][0]['expires'], 1900000000)
+        self.assertEqual(state['cookies'][0]['sameSite'], 'None')
+        self.assertEqual(state['cookies'][1]['expires'], -1)
+        self.assertNotIn('sameSite', state['cookies'][1])
+    
+    def test_page_function_passes_selenium_arguments(self):
+        """Test that execute_script bodies are wrapped for page.evaluate"""
+        wrapped = playwright_scraper.page_function("return arguments[0];")
+        self.assertTrue(wrapped.startswith("(args) => (function () {return arguments[0];})"))
+    
+    def test_requires_playwright(self):
+        """Test that the backend fails clearly when Playwright is not installed"""
+        with patch.object(playwright_scraper, 'async_playwright', None):
+            with self.assertRaises(ImportError):
+                playwright_scraper.PlaywrightScraper()
+    
+    def fixture_scraper(self, page):
+        """Playwright backend whose browser shows a fixture server page"""
+        with patch.object(playwright_scraper, 'async_playwright', MagicMock()):
+            scraper = playwright_scraper.PlaywrightScraper()
+        scraper._browser = FixtureBrowser(page)
+        scraper._storage_states = {'facebook': None, 'nextdoor': None}
+        self.addCleanup(scraper.close)
+        return scraper
+    
+    def test_scrape_source_scrolls_until_known_post(self):
+        """Test that a scrape scrolls the fixture feed, stops at the cursor and reports success"""
+        with FeedServer(posts=40, page_size=10) as server:
+            url = server.facebook_group_url('cleaners')
+            page = FixturePage()
+            scraper = self.fixture_scraper(page)
+            
+            # First scrape: scrolls until max_posts are loaded
+            posts, cursor, outcome = scraper.scrape_source('facebook', {'url': url}, ['house cleaner', 'cleaning'], max_posts=20)
+            self.assertEqual(outcome, SUCCESS)
+            self.assertEqual(page.scrolls, 1)
+            self.assertEqual(cursor['post_id'], '1000040')
+            self.assertTrue(posts)
+            self.assertTrue(all(any(word in post['text'].lower() for word in ('house cleaner', 'cleaning')) for post in posts))
+            self.assertTrue(all(int(post['id']) > 1000020 for post in posts))
+            
+            # Second scrape: the cursor is on the first page, so nothing is scrolled and nothing is new
+            page.scrolls = 0
+            posts, next_cursor, outcome = scraper.scrape_source('facebook', {'url': url, 'cursor': cursor}, ['cleaning'])
+            self.assertEqual((posts, outcome, page.scrolls), ([], SUCCESS, 0))
+            self.assertEqual(next_cursor['post_id'], '1000040')
+            self.assertEqual(scraper._browser.contexts_closed, 2)
+    
+    def test_context_cap_holds_across_platforms(self):
+        """Test that both platforms' fetch threads together never open more than max_contexts contexts"""
+        with patch.object(playwright_scraper, 'async_playwright', MagicMock()):
+            scraper = playwright_scraper.PlaywrightScraper(max_contexts=2)
+        scraper._browser = CountingBrowser()
+        scraper._storage_states = {'facebook': None, 'nextdoor': None}
+        self.addCleanup(scraper.close)
+        
+        outcomes = []
+        threads = [
+            threading.Thread(target=lambda platform=platform: outcomes.append(
+                scraper.scrape_source(platform, {'url': f"https://example.com/{platform}/"}, ['cleaning'])[2]
+            ))
+            for platform in ['facebook', 'nextdoor'] * 4
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(outcomes, [TIMEOUT] * 8)
+        self.assertEqual(scraper._browser.contexts_closed, 8)
+        self.assertEqual(scraper._browser.peak, 2)
+    
+    def test_scrape_group_returns_its_cursor(self):
+        """Test that the blocking helpers return each call's cursor instead of sharing one attribute"""
+        with FeedServer(posts=10) as server:
+            scraper = self.fixture_scraper(FixturePage())
+            posts, cursor = scraper.scrape_group(server.facebook_group_url('cleaners'), ['cleaning'])
+            self.assertEqual(cursor['post_id'], '1000010')
+            self.assertFalse(hasattr(scraper, 'last_cursor'))
+            
+            # A failed scrape keeps the cursor it was given
+            with patch.object(scraper, '_scrape', side_effect=RuntimeError("Browser crashed")):
+                self.assertEqual(scraper.scrape_neighborhood('https://nextdoor.com/neighborhood/x/', ['cleaning'], cursor=cursor), ([], cursor))
+    
+    def test_scrape_source_reports_why_posts_did_not_load(self):
+        """Test the outcome reported when no posts appear"""
+        with FeedServer(posts=5) as server:
+            page = FixturePage()
+            scraper = self.fixture_scraper(page)
+            
+            self.assertEqual(scraper.scrape_source('facebook', {'url': server.url('/checkpoint/block/')}, ['cleaning'])[2], CAPTCHA)
+            self.assertEqual(scraper.scrape_source('facebook', {'url': server.url('/')}, ['cleaning'])[2], TIMEOUT)
+            
+            page.logged_in = False
+            with patch.object(playwright_scraper, 'handle_auth_failure') as auth_failure:
+                self.assertEqual(scraper.scrape_source('facebook', {'url': server.url('/')}, ['cleaning'])[2], AUTH_FAILURE)
+            auth_failure.assert_called_once()
+
+
+class TestResourcePolicy(unittest.TestCase):
+    """Test resource blocking while scraping"""
+    
+    def test_should_block(self):
+        """Test blocking by resource type and URL pattern with allow overrides"""
+        policy = ResourcePolicy(
+            blocked_types=['image', 'media', 'font'],
+            blocked_patterns=['*doubleclick.net*'],
+            allowed_patterns=['*static.xx.fbcdn.net/rsrc.php*']
+        )
+        
+        self.assertTrue(policy.should_block('image', 'https://scontent.xx.fbcdn.net/photo.jpg'))
+        self.assertTrue(policy.should_block('script', 'https://ad.doubleclick.net/tag.js'))
+        self.assertFalse(policy.should_block('script', 'https://www.facebook.com/groups/test'))
+        self.assertFalse(policy.should_block('image', 'https://static.xx.fbcdn.net/rsrc.php/sprite.png'))
+        self.assertFalse(ResourcePolicy(enabled=False, blocked_types=['image']).should_block('image', 'https://x/y.png'))
+    
+    def test_selenium_blocking_setup(self):
+        """Test the Chrome prefs and CDP patterns derived from the policy"""
+        policy = ResourcePolicy(blocked_types=['image', 'font'], blocked_patterns=['*sentry.io*'])
+        driver = MagicMock()
+        
+        policy.apply_to_driver(driver)
+        
+        patterns = driver.execute_cdp_cmd.call_args[0][1]['urls']
+        self.assertIn('*sentry.io*', patterns)
+        self.assertIn('*.woff2*', patterns)
+        self.assertEqual(policy.chrome_prefs(), {'profile.managed_default_content_settings.images': 2})
+    
+    def test_selenium_blocking_honours_allowed_patterns(self):
+        """Test that allowed URLs are not blocked by Chrome prefs or CDP patterns on Selenium"""
+        policy = ResourcePolicy(
+            blocked_types=['image', 'font', 'stylesheet'],
+            blocked_patterns=['*sentry.io*', '*facebook.com/tr/*'],
+            allowed_patterns=['*static.xx.fbcdn.net/rsrc.php*', '*facebook.com/tr/consent*']
+        )
+        driver = MagicMock()
+        options = MagicMock()
+        
+        policy.apply_to_options(options)
+        policy.apply_to_driver(driver)
+        
+        patterns = driver.execute_cdp_cmd.call_args[0][1]['urls']
+        self.assertEqual(patterns, ['*sentry.io*'])
+        allowed_url = 'https://static.xx.fbcdn.net/rsrc.php/v3/sprite.png'
+        self.assertFalse(any(fnmatch(allowed_url, pattern) for pattern in patterns))
+        options.add_experimental_option.assert_not_called()
+    
+    def test_measure_transfer(self):
+        """Test that bytes downloaded are totalled from the performance log"""
+        def entry(method, params):
+            return {'message': json.dumps({'message': {'method': method, 'params': params}})}
+        
+        driver = MagicMock()
+        driver.get_log.return_value = [
+            entry('Network.loadingFinished', {'encodedDataLength': 1000}),
+            entry('Network.loadingFinished', {'encodedDataLength': 250}),
+            entry('Network.loadingFailed', {'blockedReason': 'inspector'}),
+            entry('Page.frameNavigated', {})
+        ]
+        
+        self.assertEqual(measure_transfer(driver), {'bytes_downloaded': 1250, 'requests': 2, 'blocked_requests': 1})
+
+
+class TestProfiles(unittest.TestCase):
+    """Test persistent Chrome profiles"""
+    
+    def test_profile_dir(self):
+        """Test that every platform, account and worker gets its own profile"""
+        path = profile_dir('facebook', 'me@example.com', 2, root='/profiles')
+        self.assertEqual(path, os.path.join('/profiles', 'facebook', 'me_example.com', 'worker-2'))
+        self.assertEqual(profile_dir('nextdoor', '', 0, root='/profiles'), os.path.join('/profiles', 'nextdoor', 'default', 'worker-0'))
+        self.assertIsNone(profile_dir('facebook', 'me@example.com', 0, root=''))
+        self.assertEqual(
+            profile_dir('facebook', 'me@example.com', 0, root='/profiles', worker='scraper 1'),
+            os.path.join('/profiles', 'facebook', 'me_example.com', 'scraper_1', 'worker-0')
+        )
+    
+    def test_apply_profile_removes_stale_lock(self):
+        """Test warm profile detection and cleanup after a crashed browser"""
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, 'worker-0')
+            options = MagicMock()
+            
+            self.assertFalse(apply_profile(options, path))
+            options.add_argument.assert_any_call(f'--user-data-dir={path}')
+            
+            os.makedirs(os.path.join(path, 'Default'))
+            os.symlink('host-1234', os.path.join(path, 'SingletonLock'))
+            
+            self.assertTrue(apply_profile(options, path))
+            self.assertFalse(os.path.lexists(os.path.join(path, 'SingletonLock')))
+    
+    def test_apply_profile_keeps_live_lock(self):
+        """Test that a profile another running browser holds is neither unlocked nor used"""
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, 'worker-0')
+            os.makedirs(os.path.join(path, 'Default'))
+            lock = os.path.join(path, 'SingletonLock')
+            
+            # This test process stands in for the other worker's running Chrome
+            os.symlink(f"{socket.gethostname()}-{os.getpid()}", lock)
+            options = MagicMock()
+            self.assertFalse(apply_profile(options, path))
+            self.assertTrue(os.path.lexists(lock))
+            options.add_argument.assert_not_called()
+            
+            # Once that process has exited the lock is stale
+            finished = subprocess.Popen([sys.executable, '-c', 'pass'])
+            finished.wait()
+            os.remove(lock)
+            os.symlink(f"{socket.gethostname()}-{finished.pid}", lock)
+            self.assertTrue(apply_profile(options, path))
+            self.assertFalse(os.path.lexists(lock))
+
+
+class TestSessionManager(unittest.TestCase):
+    """Test the shared cache of verified logins"""
+    
+    def setUp(self):
+        """Create a manager with a controllable clock"""
+        self.now = 1000.0
+        self.sessions = SessionManager(ttl_seconds=60, clock=lambda: self.now)
+        self.scraper = MagicMock(session_key=('facebook', 'me@example.com'))
+    
+    def test_fresh_session_skips_login_check(self):
+        """Test that the login is only checked again after the TTL"""
+        self.scraper._is_logged_in.return_value = True
+        
+        self.assertTrue(self.sessions.ensure(self.scraper))
+        self.assertTrue(self.sessions.ensure(self.scraper))
+        self.assertEqual(self.scraper._is_logged_in.call_count, 1)
+        
+        self.now += 61
+        self.assertTrue(self.sessions.ensure(self.scraper))
+        self.assertEqual(self.scraper._is_logged_in.call_count, 2)
+        self.scraper.login.assert_not_called()
+    
+    def test_invalidate_forces_login(self):
+        """Test that an auth failure makes the next scrape log in again"""
+        self.sessions.mark_valid(self.scraper.session_key)
+        self.sessions.invalidate(self.scraper.session_key)
+        self.scraper._is_logged_in.return_value = False
+        self.scraper.login.return_value = False
+        
+        self.assertFalse(self.sessions.ensure(self.scraper))
+        self.scraper.login.assert_called_once()
+        self.assertFalse(self.sessions.is_fresh(self.scraper.session_key))
+    
+    def test_scrape_skips_probe_while_fresh(self):
+        """Test that a scraper with a fresh session goes straight to the group"""
+        scraper = FacebookScraper(session_manager=self.sessions)
+        scraper.driver = MagicMock()
+        self.sessions.mark_valid(scraper.session_key)
+        
+        with patch.object(FacebookScraper, '_is_logged_in') as mock_is_logged_in, \
+             patch.object(FacebookScraper, '_scroll_to_load_posts'):
+            self.assertTrue(scraper._load_group('https://www.facebook.com/groups/test', 'test', 20, None))
+        
+        mock_is_logged_in.assert_not_called()
+        scraper.driver.get.assert_called_once_with('https://www.facebook.com/groups/test')
+
+
+class TestCursor(unittest.TestCase):
+    """Test the per-source high-water mark"""
+    
+    def setUp(self):
+        """Create a feed with the newest post first"""
+        self.posts = [
+            {'id': '3', 'text': 'newest', 'date': datetime(2024, 1, 3)},
+            {'id': '2', 'text': 'middle', 'date': datetime(2024, 1, 2)},
+            {'id': '1', 'text': 'oldest', 'date': datetime(2024, 1, 1)}
+        ]
+    
+    def test_filter_new_posts_stops_at_known_post(self):
+        """Test that posts from the cursor onwards are dropped"""
+        cursor = {'post_id': '2', 'post_date': None}
+        self.assertEqual([post['id'] for post in filter_new_posts(self.posts, cursor)], ['3'])
+        
+        cursor = {'post_id': 'gone', 'post_date': datetime(2024, 1, 1)}
+        self.assertEqual([post['id'] for post in filter_new_posts(self.posts, cursor)], ['3', '2'])
+        
+        self.assertEqual(filter_new_posts(self.posts, None), self.posts)
+    
+    def test_advance_cursor(self):
+        """Test that the cursor moves to the newest post, never backwards, and counts new posts"""
+        cursor = advance_cursor(self.posts)
+        self.assertEqual(cursor, {'post_id': '3', 'post_date': datetime(2024, 1, 3), 'new_posts': 3})
+        
+        later = {'post_id': '9', 'post_date': datetime(2024, 2, 1)}
+        self.assertEqual(advance_cursor(self.posts, later), dict(later, new_posts=0))
+        self.assertEqual(advance_cursor([], later), dict(later, new_posts=0))
+        self.assertEqual(advance_cursor(self.posts, {'post_id': '2', 'post_date': None})['new_posts'], 1)
+
+
+class TestElementProber(unittest.TestCase):
+    """Test the fast-fail element prober"""
+    
+    def test_find_disables_implicit_wait(self):
+        """Test that probing a missing element does not pay the implicit wait"""
+        from unittest.mock import call
+        from selenium.webdriver.common.by import By
+        
+        driver = MagicMock()
+        driver.find_elements.return_value = []
+        prober = ElementProber(driver, implicit_wait=10)
+        
+        self.assertIsNone(prober.find(By.XPATH, "//abbr"))
+        self.assertFalse(prober.exists(By.XPATH, "//strong"))
+        self.assertEqual(driver.implicitly_wait.call_args_list, [call(0), call(10), call(0), call(10)])
+    
+    def test_wait_until_records_timeouts(self):
+        """Test that bounded waits are reported per scrape"""
+        from selenium.common.exceptions import TimeoutException
+        
+        prober = ElementProber(MagicMock(), implicit_wait=10)
+        
+        with self.assertRaises(TimeoutException):
+            prober.wait_until(lambda driver: False, 0.1, 'load_posts')
+        
+        stats = prober.stats()
+        self.assertGreaterEqual(stats['wait_seconds'], 0.1)
+        self.assertEqual(stats['waits'][0]['label'], 'load_posts')
+        self.assertTrue(stats['waits'][0]['timed_out'])
+        
+        prober.reset()
+        self.assertEqual(prober.stats(), {'wait_seconds': 0.0, 'waits': [], 'scroll_waits': []})
 
 
 class TestAlertSystem(unittest.TestCase):
@@ -0,0 +1,223 @@
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from unittest.mock import patch, MagicMock
+
+from selenium.common.exceptions import TimeoutException
+from sqlalchemy.orm import sessionmaker
+
+# Add the parent directory to the path so we can import our app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models.models import ConcurrencyState, init_db
+from app.scraper.concurrency import AIMDController, load_state, save_state, SUCCESS, TIMEOUT, CAPTCHA
+from app.scraper.pool import ScraperPool
+from app.scraper.scheduler import ScraperScheduler
+from app.scraper.facebook_scraper import FacebookScraper
+
+
+def finish(controller, outcome):
+    """Run one scrape with the given outcome through a controller"""
+    with controller.slot() as slot:
+        slot.outcome = outcome
+
+
+class TestAIMDController(unittest.TestCase):
+    """Test the additive-increase, multiplicative-decrease controller"""
+
+    def test_successes_add_about_one_browser_per_round(self):
+        """Test that the level grows by one after `limit` successes, up to the maximum"""
+        controller = AIMDController('facebook', maximum=4, initial=1)
+
+        finish(controller, SUCCESS)
+        self.assertEqual(controller.limit, 2)
+        finish(controller, SUCCESS)
+        self.assertEqual(controller.limit, 2)
+        finish(controller, SUCCESS)
+        self.assertEqual(controller.limit, 3)
+
+        for _ in range(20):
+            finish(controller, SUCCESS)
+        self.assertEqual(controller.level, 4.0)
+
+    def test_failures_halve_once_per_overload(self):
+        """Test that scrapes running together when the platform pushes back cut the level once"""
+        controller = AIMDController('facebook', maximum=8, initial=8, backoff=0.5)
+
+        slots = [controller.acquire() for _ in range(3)]
+        for slot in slots:
+            slot.outcome = CAPTCHA
+            controller.release(slot)
+        self.assertEqual(controller.limit, 4)
+
+        # A scrape started after the cut that fails again cuts again, down to the minimum
+        finish(controller, TIMEOUT)
+        self.assertEqual(controller.limit, 2)
+        finish(controller, TIMEOUT)
+        finish(controller, TIMEOUT)
+        self.assertEqual(controller.limit, 1)
+
+        # Scrapes that say nothing about load leave the level alone
+        finish(controller, None)
+        self.assertEqual(controller.limit, 1)
+
+    def test_acquire_waits_for_the_limit(self):
+        """Test that no more than `limit` scrapes run at once"""
+        controller = AIMDController('nextdoor', maximum=4, initial=2)
+        active = []
+        peak = []
+        lock = threading.Lock()
+
+        def scrape():
+            with controller.slot():
+                with lock:
+                    active.append(1)
+                    peak.append(len(active))
+                time.sleep(0.02)
+                with lock:
+                    active.pop()
+
+        threads = [threading.Thread(target=scrape) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(max(peak), 2)
+
+    def test_state_round_trip(self):
+        """Test that a saved level is loaded by a new controller and unchanged levels are not rewritten"""
+        Session = sessionmaker(bind=init_db("sqlite:///:memory:"))
+        session = Session()
+
+        controller = AIMDController('facebook', maximum=6, initial=1)
+        save_state(session, controller, 'worker-1')
+        self.assertEqual(session.query(ConcurrencyState).count(), 0)
+
+        controller.set_level(5.5)
+        finish(controller, SUCCESS)
+        save_state(session, controller, 'worker-1')
+        session.commit()
+
+        resumed = AIMDController('facebook', maximum=6, initial=1)
+        self.assertTrue(load_state(session, resumed))
+        self.assertEqual(resumed.level, controller.level)
+        self.assertFalse(load_state(session, AIMDController('nextdoor', maximum=6)))
+        session.close()
+
+    def test_workers_keep_their_own_levels(self):
+        """Test that workers do not overwrite each other's level and new ones resume at the lowest recent one"""
+        Session = sessionmaker(bind=init_db("sqlite:///:memory:"))
+        session = Session()
+        now = datetime(2024, 1, 2, 12, 0)
+
+        for worker, level, saved_at in (
+            ('old', 1.0, now - timedelta(days=2)),
+            ('busy', 5.5, now - timedelta(minutes=1)),
+            ('cut', 2.5, now - timedelta(minutes=5))
+        ):
+            controller = AIMDController('facebook', maximum=6)
+            controller.set_level(level)
+            controller.changed = True
+            save_state(session, controller, worker, now=saved_at)
+        session.commit()
+
+        resumed = AIMDController('facebook', maximum=6)
+        self.assertTrue(load_state(session, resumed, now=now))
+        self.assertEqual(resumed.level, 2.5)
+
+        # Saving prunes the levels of workers that stopped long ago
+        self.assertEqual(session.query(ConcurrencyState).filter_by(worker='old').count(), 0)
+        self.assertEqual(session.query(ConcurrencyState).count(), 2)
+
+        # With only old levels left, the newest one is used
+        resumed = AIMDController('facebook', maximum=6)
+        load_state(session, resumed, now=now + timedelta(days=3))
+        self.assertEqual(resumed.level, 5.5)
+        session.close()
+
+
+class TestConcurrencySignals(unittest.TestCase):
+    """Test that scrape outcomes reach the controller"""
+
+    def test_pool_reports_scraper_outcomes(self):
+        """Test that the pool passes each scraper's last_outcome to the controller"""
+        controller = AIMDController('facebook', maximum=4, initial=4)
+        scraper = MagicMock()
+        pool = ScraperPool('facebook', lambda index: scraper, size=4, controller=controller)
+
+        def task(scraper, item):
+            scraper.last_outcome = item
+            return item
+
+        pool.run_one(task, TIMEOUT)
+        self.assertEqual(controller.limit, 2)
+        pool.run_one(task, SUCCESS)
+        self.assertEqual(controller.level, 2.5)
+
+    def test_failed_login_is_reported(self):
+        """Test that a worker that cannot log in cuts the limit"""
+        controller = AIMDController('facebook', maximum=4, initial=4)
+
+        def factory(index):
+            raise RuntimeError("Failed to log in to Facebook")
+
+        pool = ScraperPool('facebook', factory, size=4, controller=controller)
+        with self.assertRaises(RuntimeError):
+            pool.run_one(lambda scraper, item: item, 'group')
+        self.assertEqual(controller.limit, 2)
+
+    def test_facebook_timeout_is_reported(self):
+        """Test that a group whose posts never load is reported as a timeout"""
+        scraper = FacebookScraper()
+        scraper.driver = MagicMock()
+        scraper.driver.current_url = 'https://www.facebook.com/groups/test'
+        scraper._ensure_logged_in = MagicMock(return_value=True)
+        scraper.prober.wait_until = MagicMock(side_effect=TimeoutException())
+
+        with patch('app.scraper.facebook_scraper.measure_transfer', return_value={}):
+            self.assertFalse(scraper._load_group('https://www.facebook.com/groups/test', 'test', 20, None))
+        self.assertEqual(scraper.last_outcome, TIMEOUT)
+
+    def test_facebook_checkpoint_counts_as_captcha(self):
+        """Test that being sent to a security checkpoint is reported like a CAPTCHA"""
+        scraper = FacebookScraper()
+        scraper.driver = MagicMock()
+        scraper.driver.current_url = 'https://www.facebook.com/checkpoint/block'
+        scraper._ensure_logged_in = MagicMock(return_value=True)
+        scraper.prober.wait_until = MagicMock(side_effect=TimeoutException())
+
+        with patch('app.scraper.facebook_scraper.measure_transfer', return_value={}):
+            scraper._load_group('https://www.facebook.com/groups/test', 'test', 20, None)
+        self.assertEqual(scraper.last_outcome, CAPTCHA)
+
+    def test_scheduler_resumes_saved_level(self):
+        """Test that a restarted scheduler picks up the level the last run settled on"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        database_url = f"sqlite:///{os.path.join(directory, 'test.db')}"
+
+        with patch('app.scraper.scheduler.DATABASE_URL', database_url), \
+                patch('app.scraper.scheduler.SCRAPER_POOL_SIZE', 4):
+            scheduler = ScraperScheduler()
+            self.assertEqual(scheduler.concurrency['facebook'].limit, 1)
+
+            scheduler.concurrency['facebook'].set_level(3.2)
+            finish(scheduler.concurrency['facebook'], SUCCESS)
+            session = scheduler.Session()
+            save_state(session, scheduler.concurrency['facebook'], scheduler.leases.owner)
+            session.commit()
+            session.close()
+
+            restarted = ScraperScheduler()
+            self.assertEqual(restarted.concurrency['facebook'].limit, 3)
+            self.assertEqual(restarted.concurrency['nextdoor'].limit, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
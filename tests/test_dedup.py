@@ -0,0 +1,99 @@
+import unittest
+import os
+import sys
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# Add the parent directory to the path so we can import our app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models.models import Base, Source, Keyword, Match, PostFingerprint
+from app.scraper.dedup import DuplicateFinder, minhash, band_keys, similarity, BANDS
+
+# Use an in-memory SQLite database for testing
+TEST_DATABASE_URL = "sqlite:///:memory:"
+
+POST = "Hi neighbors, can anyone recommend a reliable house cleaner for a 3 bedroom home in Oak Park? Every other week ideally."
+CROSS_POST = "Hi all! Can anyone recommend a reliable house cleaner for a 3 bedroom home in Oak Park? Every other week ideally, thanks"
+OTHER_REQUEST = "Can anyone recommend a good house cleaner in Oak Park? We need a one time deep clean before moving out next month."
+
+
+class TestMinHash(unittest.TestCase):
+    """Test MinHash signatures and LSH band keys"""
+
+    def test_similarity_tracks_shared_wording(self):
+        """Test that cross-posts score well above different requests on the same topic"""
+        post, cross_post, other = minhash(POST), minhash(CROSS_POST), minhash(OTHER_REQUEST)
+
+        self.assertEqual(similarity(post, minhash(POST.upper())), 1.0)
+        self.assertGreater(similarity(post, cross_post), 0.6)
+        self.assertLess(similarity(post, other), 0.6)
+        self.assertEqual(len(band_keys(post)), BANDS)
+        self.assertTrue(set(band_keys(post)) & set(band_keys(cross_post)))
+
+    def test_short_posts_are_not_fingerprinted(self):
+        """Test that posts too short to tell apart get no signature"""
+        self.assertIsNone(minhash("Need a house cleaner ASAP"))
+        self.assertIsNone(minhash(None))
+
+
+class TestDuplicateFinder(unittest.TestCase):
+    """Test linking duplicate matches through the fingerprint index"""
+
+    def setUp(self):
+        """Create a source and keyword on an in-memory database"""
+        self.engine = create_engine(TEST_DATABASE_URL)
+        Base.metadata.create_all(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+        self.source = Source(name="Test Group", url="https://www.facebook.com/groups/test", source_type="facebook")
+        self.keyword = Keyword(text="house cleaner")
+        self.session.add_all([self.source, self.keyword])
+        self.session.commit()
+        self.finder = DuplicateFinder(window_hours=72, min_similarity=0.6)
+
+    def tearDown(self):
+        """Clean up after tests"""
+        self.session.close()
+        Base.metadata.drop_all(self.engine)
+
+    def _match(self, post_id, text):
+        return Match(
+            source_id=self.source.id, keyword_id=self.keyword.id, post_id=post_id,
+            post_url=f"https://example.com/{post_id}", post_text=text, matched_text="house cleaner"
+        )
+
+    def _store(self, matches, now=None):
+        duplicates = self.finder.link(self.session, matches, now=now)
+        self.session.add_all(matches)
+        self.session.commit()
+        return duplicates
+
+    def test_links_duplicates_within_and_across_batches(self):
+        """Test that copies are linked to the first match and kept out of alerts"""
+        first, same_batch = self._match('1', POST), self._match('2', CROSS_POST)
+        self.assertEqual(self._store([first, same_batch]), 1)
+
+        later, other = self._match('3', CROSS_POST), self._match('4', OTHER_REQUEST)
+        self.assertEqual(self._store([later, other]), 1)
+
+        self.assertIsNone(first.duplicate_of)
+        self.assertEqual({match.post_id for match in first.duplicates}, {'2', '3'})
+        self.assertTrue(later.is_notified)
+        self.assertIsNone(other.duplicate_of)
+        self.assertFalse(other.is_notified)
+        # Only originals are indexed
+        self.assertEqual(self.session.query(PostFingerprint).count(), 2 * BANDS)
+
+    def test_evicted_posts_are_not_matched(self):
+        """Test that fingerprints older than the window are deleted and ignored"""
+        long_ago = datetime.utcnow() - timedelta(hours=100)
+        self._store([self._match('1', POST)], now=long_ago)
+
+        self.assertEqual(self.finder.evict(self.session), BANDS)
+        self.assertEqual(self._store([self._match('2', CROSS_POST)]), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,234 @@
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from sqlalchemy.orm import sessionmaker
+
+# Add the parent directory to the path so we can import our app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models.models import Source, Keyword, Match, NotificationSetting, init_db
+from app.alert.alert_system import AlertSystem
+from app.alert.dispatcher import AlertDispatcher, alert_latency, summarize_latencies
+
+
+class AlertTestCase(unittest.TestCase):
+    """Database with one source, one keyword and Slack alerts enabled"""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        # A file, so the dispatcher thread sees the same database
+        self.engine = init_db(f"sqlite:///{os.path.join(directory, 'alerts.db')}")
+        self.Session = sessionmaker(bind=self.engine)
+
+        session = self.Session()
+        session.add(Source(name="Test Group", url="https://www.facebook.com/groups/test", source_type="facebook"))
+        session.add(Keyword(text="house cleaner"))
+        session.add(NotificationSetting(email_enabled=False, slack_enabled=True, slack_webhook="https://hooks.slack.com/services/x"))
+        session.commit()
+        session.close()
+
+        self.sent = []
+        self.send_result = True
+        self.sent_lock = threading.Lock()
+
+    def send(self, webhook_url, match, source, keyword):
+        """Stand-in for the Slack request"""
+        with self.sent_lock:
+            self.sent.append(match.id)
+        return self.send_result
+
+    def alert_system(self):
+        """Alert system on the test database whose Slack sends are recorded"""
+        alert_system = AlertSystem(self.engine)
+        patcher = patch.object(alert_system, 'send_slack_notification', side_effect=self.send)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return alert_system
+
+    def add_match(self, post_id, seen_at=None):
+        """Store an unnotified match and return its ID"""
+        session = self.Session()
+        match = Match(
+            source_id=1, keyword_id=1, post_id=post_id, post_url=f"https://www.facebook.com/groups/test/posts/{post_id}",
+            post_text="Looking for a house cleaner", matched_text="house cleaner", is_notified=False, seen_at=seen_at
+        )
+        session.add(match)
+        session.commit()
+        match_id = match.id
+        session.close()
+        return match_id
+
+    def wait_for(self, count, timeout=5):
+        """Wait until `count` alerts were sent"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self.sent_lock:
+                if len(self.sent) >= count:
+                    return True
+            time.sleep(0.01)
+        return False
+
+
+class TestAlertClaims(AlertTestCase):
+    """Test that matches are claimed before their alerts are sent"""
+
+    def test_match_is_alerted_once(self):
+        """Test that two alert systems sending the same match alert it once"""
+        match_id = self.add_match('1', seen_at=datetime.utcnow() - timedelta(seconds=30))
+
+        latencies = self.alert_system().notify_matches([match_id])
+        self.assertEqual(self.alert_system().notify_matches([match_id]), [])
+        self.alert_system().process_new_matches()
+
+        self.assertEqual(self.sent, [match_id])
+        self.assertEqual(len(latencies), 1)
+        self.assertGreaterEqual(latencies[0], 30)
+
+        session = self.Session()
+        match = session.get(Match, match_id)
+        self.assertTrue(match.is_notified)
+        self.assertIsNotNone(match.notified_at)
+        session.close()
+
+    def test_failed_send_is_retried(self):
+        """Test that a match whose alerts all failed stays unnotified"""
+        match_id = self.add_match('1')
+        self.send_result = False
+        self.alert_system().notify_matches([match_id])
+
+        session = self.Session()
+        self.assertFalse(session.get(Match, match_id).is_notified)
+        session.close()
+
+        self.send_result = True
+        self.alert_system().process_new_matches()
+        self.assertEqual(self.sent, [match_id, match_id])
+
+    def test_failed_send_backs_off(self):
+        """Test that a failed send stops the pass and pauses sending"""
+        match_ids = [self.add_match(str(number)) for number in range(3)]
+        alert_system = self.alert_system()
+        self.send_result = False
+        alert_system.process_new_matches()
+        self.assertEqual(self.sent, [match_ids[0]])
+
+        # Nothing is claimed or sent until the backoff is over
+        self.send_result = True
+        with patch.object(alert_system, '_claim') as claim:
+            self.assertEqual(alert_system.notify_matches(match_ids), [])
+            alert_system.process_new_matches()
+        claim.assert_not_called()
+
+        with patch('app.alert.alert_system.time.monotonic', return_value=time.monotonic() + 61):
+            alert_system.process_new_matches()
+        self.assertEqual(self.sent, [match_ids[0]] + match_ids)
+
+    def test_nothing_is_claimed_without_a_channel(self):
+        """Test that matches are left alone while every channel is disabled"""
+        match_id = self.add_match('1')
+        session = self.Session()
+        session.query(NotificationSetting).update({'slack_enabled': False})
+        session.commit()
+        session.close()
+
+        alert_system = self.alert_system()
+        with patch.object(alert_system, '_claim') as claim:
+            alert_system.notify_matches([match_id])
+            alert_system.process_new_matches()
+        claim.assert_not_called()
+
+    def test_stale_claims_are_retried(self):
+        """Test that a match claimed by a process that died before sending is alerted by the sweep"""
+        now = datetime.utcnow()
+        stale, fresh, sent_before_claims = self.add_match('1'), self.add_match('2'), self.add_match('3')
+        session = self.Session()
+        session.query(Match).filter_by(id=stale).update({'is_notified': True, 'claimed_at': now - timedelta(hours=1)})
+        session.query(Match).filter_by(id=fresh).update({'is_notified': True, 'claimed_at': now})
+        session.query(Match).filter_by(id=sent_before_claims).update({'is_notified': True})
+        session.commit()
+        session.close()
+
+        self.alert_system().process_new_matches()
+        self.assertEqual(self.sent, [stale])
+
+        session = self.Session()
+        self.assertIsNotNone(session.get(Match, stale).notified_at)
+        session.close()
+
+
+class TestAlertDispatcher(AlertTestCase):
+    """Test the background dispatcher"""
+
+    def test_published_matches_are_alerted_without_a_sweep(self):
+        """Test that published matches go out right away and the first sweep sends older ones"""
+        older = self.add_match('1')
+        dispatcher = AlertDispatcher(self.alert_system(), sweep_seconds=3600)
+        dispatcher.start()
+        self.addCleanup(dispatcher.stop)
+        self.assertTrue(self.wait_for(1))
+
+        # Only publishing reaches the dispatcher before the next sweep, an hour away
+        started = time.monotonic()
+        new = self.add_match('2', seen_at=datetime.utcnow())
+        dispatcher.publish([new])
+        self.assertTrue(self.wait_for(2))
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertEqual(self.sent, [older, new])
+
+    def test_stop_sends_queued_matches(self):
+        """Test that matches published before stopping are still alerted"""
+        dispatcher = AlertDispatcher(self.alert_system(), sweep_seconds=3600)
+        dispatcher.start()
+        match_ids = [self.add_match(str(number)) for number in range(3)]
+        dispatcher.publish(match_ids)
+        dispatcher.stop()
+
+        self.assertEqual(sorted(self.sent), match_ids)
+        self.assertFalse(dispatcher.running)
+
+    def test_publish_is_ignored_while_stopped(self):
+        """Test that nothing queues up when no dispatcher thread is running"""
+        dispatcher = AlertDispatcher(self.alert_system())
+        dispatcher.publish([self.add_match('1')])
+        self.assertTrue(dispatcher._queue.empty())
+
+
+class TestAlertLatency(AlertTestCase):
+    """Test the seen-to-sent latency summary"""
+
+    def test_summary(self):
+        """Test the median, 95th percentile and maximum"""
+        summary = summarize_latencies([float(seconds) for seconds in range(1, 21)])
+        self.assertEqual(summary, {'count': 20, 'median': 10.5, 'p95': 19.0, 'max': 20.0})
+        self.assertIsNone(summarize_latencies([]))
+
+    def test_recent_alerts_only(self):
+        """Test that the dashboard figures cover the last day of alerts"""
+        now = datetime(2024, 1, 2, 12, 0)
+        session = self.Session()
+        for post_id, seen_at, notified_at in (
+            ('1', now - timedelta(seconds=10), now - timedelta(seconds=5)),
+            ('2', now - timedelta(days=2), now - timedelta(days=2) + timedelta(seconds=60)),
+            ('3', None, now)
+        ):
+            session.add(Match(
+                source_id=1, keyword_id=1, post_id=post_id, post_url=f"https://www.facebook.com/groups/test/posts/{post_id}",
+                post_text="Looking for a house cleaner", matched_text="house cleaner", is_notified=True,
+                seen_at=seen_at, notified_at=notified_at
+            ))
+        session.commit()
+
+        self.assertEqual(alert_latency(session, now=now), {'count': 1, 'median': 5.0, 'p95': 5.0, 'max': 5.0})
+        session.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import unittest
+import os
+import sys
+import time
+import tempfile
+from unittest.mock import MagicMock
+
+import requests
+
+# Add the parent directory to the path so we can import our app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.scraper.parse_pool import parse_posts
+from benchmarks.feed_server import FeedServer
+from benchmarks.scraper_benchmark import RoundTripCounter, format_results, _summarize_steps
+
+
+class TestFeedServer(unittest.TestCase):
+    """Test the local fixture feed server used by the benchmarks"""
+
+    def setUp(self):
+        """Start a server with a small feed"""
+        self.server = FeedServer(posts=25, page_size=10).start()
+
+    def tearDown(self):
+        """Stop the server"""
+        self.server.stop()
+
+    def test_facebook_feed_matches_scraper_selectors(self):
+        """Test that the first page parses into posts like a real group"""
+        url = self.server.facebook_group_url('cleaners')
+        posts = parse_posts('facebook', requests.get(url).text, url)
+
+        self.assertEqual(len(posts), 10)
+        self.assertEqual(posts[0]['id'], '1000025')
+        self.assertTrue(posts[0]['url'].startswith(self.server.url('/groups/cleaners/posts/')))
+        self.assertIsNotNone(posts[0]['date'])
+        self.assertGreater(posts[0]['date'], posts[1]['date'])
+
+    def test_nextdoor_infinite_scroll_pages(self):
+        """Test that feed fragments continue where the previous page stopped"""
+        url = self.server.nextdoor_feed_url('oak')
+        first = parse_posts('nextdoor', requests.get(url).text, url)
+        second = parse_posts('nextdoor', requests.get(self.server.url('/neighborhood/oak/feed?page=1')).text, url)
+        last = requests.get(self.server.url('/neighborhood/oak/feed?page=3')).text
+
+        self.assertEqual([post['id'] for post in first][-1], '1000016')
+        self.assertEqual([post['id'] for post in second][0], '1000015')
+        self.assertEqual(last.strip(), '')
+
+    def test_latency_and_recordings(self):
+        """Test that latency is added and recorded pages replace synthetic ones"""
+        self.server.stop()
+        with tempfile.TemporaryDirectory() as recordings:
+            with open(os.path.join(recordings, 'groups_recorded.html'), 'w') as f:
+                f.write('<html>recorded</html>')
+
+            with FeedServer(latency_ms=100, recordings_dir=recordings) as server:
+                started = time.perf_counter()
+                body = requests.get(server.url('/groups/recorded')).text
+
+                self.assertGreaterEqual(time.perf_counter() - started, 0.1)
+                self.assertEqual(body, '<html>recorded</html>')
+                self.assertEqual(server.requests, ['/groups/recorded'])
+
+
+class TestScraperBenchmark(unittest.TestCase):
+    """Test the benchmark's measurement helpers"""
+
+    def test_round_trip_counter(self):
+        """Test that every WebDriver command is counted"""
+        driver = MagicMock()
+        driver.execute.return_value = {'value': None}
+        counter = RoundTripCounter(driver)
+
+        driver.execute('get', {'url': 'http://localhost/'})
+        driver.execute('executeScript', {'script': 'return 1'})
+        driver.execute('executeScript', {'script': 'return 2'})
+
+        self.assertEqual(counter.count, 3)
+        self.assertEqual(counter.commands['executeScript'], 2)
+        counter.reset()
+        self.assertEqual(counter.count, 0)
+
+    def test_format_results(self):
+        """Test the summary of scroll steps and the results table"""
+        result = {
+            'platform': 'facebook', 'mode': 'script', 'posts': 50, 'posts_per_second': 25.0,
+            'round_trips_per_post': 0.4
+        }
+        result.update(_summarize_steps([0.2, 0.4]))
+
+        self.assertAlmostEqual(result['scroll_step_ms_mean'], 300.0)
+        self.assertIn('facebook', format_results([result]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+import unittest
+import os
+import sys
+import time
+import threading
+from datetime import datetime
+from unittest.mock import patch, MagicMock
+
+# Add the parent directory to the path so we can import our app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.scraper.parse_pool import ParsePool, parse_posts, parse_and_match
+
+FACEBOOK_HTML = """
+<html><body>
+<div role="feed">
+  <div role="article">
+    <h3 class="actor"><a href="/profile/1">John Doe</a></h3>
+    <a href="/groups/test/posts/111/"><abbr data-utime="1700000000">1h</abbr></a>
+    <div class="userContent"><p>Can anyone recommend a house cleaner?</p></div>
+  </div>
+  <div role="article">
+    <strong>Jane Roe</strong>
+    <a href="https://www.facebook.com/groups/test/permalink/222/">2h</a>
+    <div dir="auto">Selling a couch, barely used</div>
+  </div>
+  <div role="article">
+    <div dir="auto">short</div>
+  </div>
+</div>
+</body></html>
+"""
+
+NEXTDOOR_HTML = """
+<html><body>
+<div class="post-list-item">
+  <div class="post-byline"><a href="/profile/5">Sam Smith</a><time datetime="2024-01-02T03:04:05.000Z">2 hr ago</time></div>
+  <a href="/p/post/333/">View</a>
+  <div class="post-content">Looking for a weekly cleaning service in the area</div>
+</div>
+</body></html>
+"""
+
+
+class TestHtmlParser(unittest.TestCase):
+    """Test the offline BeautifulSoup parsing stage"""
+
+    def test_parse_facebook_snapshot(self):
+        """Test that snapshots produce the same post dictionaries as live extraction"""
+        posts = parse_posts('facebook', FACEBOOK_HTML, 'https://www.facebook.com/groups/test')
+
+        self.assertEqual(len(posts), 2)
+        self.assertEqual(posts[0], {
+            'id': '111',
+            'url': 'https://www.facebook.com/groups/test/posts/111/',
+            'text': 'Can anyone recommend a house cleaner?',
+            'author': 'John Doe',
+            'date': datetime.fromtimestamp(1700000000),
+            'source_type': 'facebook'
+        })
+        self.assertEqual(posts[1]['id'], '222')
+        self.assertEqual(posts[1]['author'], 'Jane Roe')
+        self.assertIsNone(posts[1]['date'])
+
+    def test_inline_tags_do_not_split_text(self):
+        """Test that a phrase split across inline tags reads and matches like innerText"""
+        html = """
+        <div role="article">
+          <strong>Jane <span>Roe</span></strong>
+          <a href="/groups/test/posts/444/"><abbr data-utime="1700000000">1h</abbr></a>
+          <div dir="auto">Need a <b>house</b>
+            <a href="/hashtag/clean">cleaner</a> on Friday.<br>Thanks,<div>Jane</div></div>
+        </div>
+        """
+        url = 'https://www.facebook.com/groups/test'
+
+        self.assertEqual(parse_posts('facebook', html, url)[0]['text'], 'Need a house cleaner on Friday.\nThanks,\nJane')
+        self.assertEqual(parse_posts('facebook', html, url)[0]['author'], 'Jane Roe')
+        matched_posts, _ = parse_and_match('facebook', html, url, ['house cleaner'])
+        self.assertEqual([post['id'] for post in matched_posts], ['444'])
+
+    def test_parse_nextdoor_snapshot(self):
+        """Test Nextdoor snapshots"""
+        posts = parse_posts('nextdoor', NEXTDOOR_HTML, 'https://nextdoor.com/neighborhood/test/')
+
+        self.assertEqual(posts, [{
+            'id': '333',
+            'url': 'https://nextdoor.com/p/post/333/',
+            'text': 'Looking for a weekly cleaning service in the area',
+            'author': 'Sam Smith',
+            'date': datetime(2024, 1, 2, 3, 4, 5),
+            'source_type': 'nextdoor'
+        }])
+
+    def test_parse_and_match(self):
+        """Test matching and cursor handling in the parsing stage"""
+        matched_posts, cursor = parse_and_match(
+            'facebook', FACEBOOK_HTML, 'https://www.facebook.com/groups/test', ['house cleaner', 'plumber']
+        )
+
+        self.assertEqual([post['id'] for post in matched_posts], ['111'])
+        self.assertEqual(matched_posts[0]['matched_keyword'], 'house cleaner')
+        self.assertEqual(cursor['post_id'], '111')
+
+    def test_parse_pool_runs_in_worker_process(self):
+        """Test that snapshots are parsed on the process pool"""
+        pool = ParsePool(workers=1)
+        try:
+            future = pool.submit('nextdoor', NEXTDOOR_HTML, 'https://nextdoor.com/', ['cleaning service'])
+            matched_posts, cursor = future.result(timeout=60)
+        finally:
+            pool.close()
+
+        self.assertEqual(matched_posts[0]['id'], '333')
+        self.assertEqual(cursor['post_id'], '333')
+
+    def test_concurrent_submits_start_one_executor(self):
+        """Test that parse-stage threads submitting at once share one process pool"""
+        def slow_executor(*args, **kwargs):
+            time.sleep(0.05)
+            return MagicMock()
+
+        pool = ParsePool(workers=2)
+        with patch('app.scraper.parse_pool.ProcessPoolExecutor', side_effect=slow_executor) as executor:
+            threads = [
+                threading.Thread(target=pool.submit, args=('nextdoor', NEXTDOOR_HTML, 'https://nextdoor.com/', ['cleaning service']))
+                for _ in range(4)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            pool.close()
+
+        self.assertEqual(executor.call_count, 1)
+        self.assertIsNone(pool._executor)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+import os
+import sys
+
+# Add the parent directory to the path so we can import our app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.scraper.keyword_query import QuerySet, is_query, check_query
+from app.scraper.matcher import KeywordMatcher
+
+
+def matching(query, text):
+    """Whether a single query matches text"""
+    return QuerySet([(0, query)]).first_index(text.lower()) == 0
+
+
+class TestKeywordQuery(unittest.TestCase):
+    """Test the keyword query language"""
+
+    def test_is_query(self):
+        """Test that plain keywords keep substring matching"""
+        self.assertFalse(is_query('recommend a house cleaner'))
+        self.assertFalse(is_query('not for hire'))
+        self.assertTrue(is_query('"house cleaner"'))
+        self.assertTrue(is_query('clean*'))
+        self.assertTrue(is_query('cleaner AND recommend'))
+        self.assertTrue(is_query('cleaner NEAR/2 recommend'))
+
+    def test_operators(self):
+        """Test phrases, AND, OR, NOT and grouping"""
+        query = '("house cleaner" OR maid) AND NOT "job wanted"'
+
+        self.assertTrue(matching(query, "Can anyone recommend a House Cleaner?"))
+        self.assertTrue(matching(query, "Need a maid for Friday"))
+        self.assertFalse(matching(query, "House cleaner job wanted, references available"))
+        self.assertFalse(matching(query, "Our mermaid costume is for sale"))
+        self.assertTrue(matching('house cleaner', "any good house cleaner?"))
+        self.assertFalse(matching('house cleaner', "any good house cleaners?"))
+
+    def test_near_and_prefix(self):
+        """Test NEAR/n in either order and word-boundary prefixes"""
+        self.assertTrue(matching('clean* NEAR/3 recommend', "Can anyone recommend a good cleaning service"))
+        self.assertTrue(matching('clean* NEAR/3 recommend', "Cleaners you would recommend?"))
+        self.assertFalse(matching('clean* NEAR/3 recommend', "I recommend the new pizza place, it is very clean"))
+        self.assertFalse(matching('clean*', "Spring unclean"))
+        self.assertTrue(matching('"deep clean*" NEAR/1 "move out"', "Need a move out deep cleaning"))
+
+    def test_rejects_malformed_queries(self):
+        """Test that malformed queries raise ValueError"""
+        for query in ['NOT job', 'cleaner AND', '"house cleaner', '(maid OR cleaner', 'a NEAR/2 (b OR c)', '* maid', 'maid )']:
+            with self.assertRaises(ValueError, msg=query):
+                check_query(query)
+
+    def test_match_spans(self):
+        """Test that spans cover the terms that made a query match"""
+        text = "Can anyone recommend a good cleaning service? Not a job wanted post".lower()
+        queries = QuerySet([(0, 'clean* NEAR/5 recommend'), (3, 'pizza OR service'), (7, 'recommend AND NOT wanted')])
+
+        self.assertEqual(queries.match_spans(text), {0: [(11, 20), (28, 36)], 3: [(37, 44)]})
+
+    def test_matcher_mixes_queries_and_plain_keywords(self):
+        """Test that queries and plain keywords share configured order in both matcher paths"""
+        text = "Looking for a maid, our house cleaner moved away"
+        for padding in (0, 100):
+            keywords = ['plumber', 'maid AND NOT "job wanted"', 'house cleaner'] + [f'unused {n}' for n in range(padding)]
+            matcher = KeywordMatcher(keywords)
+
+            self.assertEqual(matcher.first_match(text), 'maid AND NOT "job wanted"')
+            self.assertEqual([match.keyword for match in matcher.match_all(text)], keywords[1:3])
+            self.assertEqual(matcher.first_match("Mermaid for hire, house cleaner too"), 'house cleaner')
+            self.assertIsNone(matcher.first_match("maid job wanted"))
+
+    def test_malformed_query_matches_as_text(self):
+        """Test that a malformed stored query does not break matching"""
+        matcher = KeywordMatcher(['"house cleaner'])
+
+        self.assertEqual(matcher.first_match('Try "house cleaner on Main'), '"house cleaner')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,166 @@
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+import multiprocessing
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# Add the parent directory to the path so we can import our app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models.models import Source, init_db
+from app.scraper.leases import SourceLeases, JobStoreLease
+
+
+def scrape_worker(database_url, owner, results):
+    """Claim due sources in small batches until none are left, as a separate worker process would"""
+    Session = sessionmaker(bind=create_engine(database_url, connect_args={'timeout': 30}))
+    session = Session()
+    leases = SourceLeases(owner, lease_seconds=600)
+    claimed = []
+    while True:
+        sources = leases.claim(session, 'facebook', 3, due_only=True)
+        if not sources:
+            break
+        for source in sources:
+            claimed.append(source.id)
+            source.next_due_at = datetime.utcnow() + timedelta(hours=1)
+        leases.release(session, [source.id for source in sources])
+        session.commit()
+    session.close()
+    results.put((owner, claimed))
+
+
+class TestSourceLeases(unittest.TestCase):
+    """Test source leases on one database"""
+
+    def setUp(self):
+        """Create three due Facebook sources and one Nextdoor source"""
+        self.Session = sessionmaker(bind=init_db("sqlite:///:memory:"))
+        session = self.Session()
+        for number in range(3):
+            session.add(Source(name=f"Group {number}", url=f"https://www.facebook.com/groups/{number}", source_type="facebook"))
+        session.add(Source(name="Neighborhood", url="https://nextdoor.com/neighborhood/test", source_type="nextdoor"))
+        session.commit()
+        self.session = session
+        self.now = datetime(2024, 1, 1, 12, 0)
+
+    def tearDown(self):
+        self.session.close()
+
+    def claim_ids(self, leases, limit=10, now=None, **kwargs):
+        """Claim Facebook sources and return their IDs"""
+        return [source.id for source in leases.claim(self.session, 'facebook', limit, now=now or self.now, **kwargs)]
+
+    def test_claimed_sources_are_skipped_by_other_workers(self):
+        """Test that two workers get disjoint sources until leases are released"""
+        first = SourceLeases('worker-a', lease_seconds=600)
+        second = SourceLeases('worker-b', lease_seconds=600)
+
+        self.assertEqual(self.claim_ids(first, limit=2), [1, 2])
+        self.assertEqual(self.claim_ids(second), [3])
+        self.assertEqual(self.claim_ids(second), [3])  # A worker may claim its own sources again
+
+        # Releasing someone else's lease does nothing
+        self.assertEqual(second.release(self.session, [1, 2]), 0)
+        self.assertEqual(first.release(self.session, [1]), 1)
+        self.session.commit()
+        self.assertEqual(self.claim_ids(second), [1, 3])
+
+    def test_expired_leases_are_taken_over(self):
+        """Test that a dead worker's sources go to another worker once its leases expire"""
+        dead = SourceLeases('dead-worker', lease_seconds=600)
+        survivor = SourceLeases('survivor', lease_seconds=600)
+        self.claim_ids(dead)
+
+        self.assertEqual(self.claim_ids(survivor, now=self.now + timedelta(seconds=599)), [])
+        self.assertEqual(self.claim_ids(survivor, now=self.now + timedelta(seconds=601)), [1, 2, 3])
+
+    def test_heartbeat_keeps_leases(self):
+        """Test that renewed leases are not taken over"""
+        busy = SourceLeases('busy-worker', lease_seconds=600)
+        other = SourceLeases('other-worker', lease_seconds=600)
+        self.claim_ids(busy)
+
+        self.assertEqual(busy.heartbeat(self.session, now=self.now + timedelta(seconds=500)), 3)
+        self.session.commit()
+        self.assertEqual(self.claim_ids(other, now=self.now + timedelta(seconds=700)), [])
+
+    def test_due_and_excluded_sources(self):
+        """Test that due-only claims skip sources scheduled later and excluded IDs"""
+        source = self.session.get(Source, 2)
+        source.next_due_at = self.now + timedelta(hours=1)
+        self.session.commit()
+
+        leases = SourceLeases('worker', lease_seconds=600)
+        self.assertEqual(self.claim_ids(leases, due_only=True, exclude=[1]), [3])
+
+
+class TestJobStoreLease(unittest.TestCase):
+    """Test the claim on a scheduler job store table"""
+
+    def test_one_running_worker_holds_the_table(self):
+        """Test that a table goes to one worker until it is released or the lease expires"""
+        session = sessionmaker(bind=init_db("sqlite:///:memory:"))()
+        now = datetime(2024, 1, 1, 12, 0)
+        first = JobStoreLease('apscheduler_jobs', 'worker-a', lease_seconds=600)
+        second = JobStoreLease('apscheduler_jobs', 'worker-b', lease_seconds=600)
+
+        self.assertTrue(first.claim(session, now=now))
+        self.assertFalse(second.claim(session, now=now))
+        self.assertTrue(JobStoreLease('other_jobs', 'worker-b').claim(session, now=now))
+
+        # Renewing keeps the table, letting the lease run out hands it over
+        self.assertTrue(first.claim(session, now=now + timedelta(seconds=500)))
+        self.assertFalse(second.claim(session, now=now + timedelta(seconds=1000)))
+        self.assertTrue(second.claim(session, now=now + timedelta(seconds=1200)))
+        self.assertFalse(first.claim(session, now=now + timedelta(seconds=1200)))
+
+        self.assertEqual(first.release(session), 0)
+        self.assertEqual(second.release(session), 1)
+        session.commit()
+        self.assertTrue(first.claim(session, now=now + timedelta(seconds=1200)))
+        session.close()
+
+
+class TestMultiProcessClaims(unittest.TestCase):
+    """Test several worker processes sharing one SQLite file"""
+
+    def test_workers_split_sources_without_overlap(self):
+        """Test that every source is scraped exactly once by one of several processes"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        database_url = f"sqlite:///{os.path.join(directory, 'shared.db')}"
+
+        Session = sessionmaker(bind=init_db(database_url))
+        session = Session()
+        session.add_all([
+            Source(name=f"Group {number}", url=f"https://www.facebook.com/groups/{number}", source_type="facebook")
+            for number in range(40)
+        ])
+        session.commit()
+        session.close()
+
+        context = multiprocessing.get_context('spawn')
+        results = context.Queue()
+        workers = [
+            context.Process(target=scrape_worker, args=(database_url, f"worker-{number}", results))
+            for number in range(4)
+        ]
+        for worker in workers:
+            worker.start()
+        claimed = dict(results.get(timeout=60) for _ in workers)
+        for worker in workers:
+            worker.join(timeout=10)
+
+        all_claims = [source_id for ids in claimed.values() for source_id in ids]
+        self.assertEqual(sorted(all_claims), list(range(1, 41)))
+        self.assertEqual(len(claimed), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
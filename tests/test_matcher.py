@@ -0,0 +1,119 @@
+import unittest
+import os
+import sys
+import pickle
+import random
+
+# Add the parent directory to the path so we can import our app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.scraper.matcher import KeywordMatcher, Hit, KeywordMatch, compile_keywords, match_post, AUTOMATON_MIN_KEYWORDS
+from benchmarks.keyword_benchmark import make_keywords, make_posts, match_loop, run
+
+
+def naive_hits(text, keywords):
+    """Every occurrence of every keyword, found one keyword at a time"""
+    text_lower = text.lower()
+    hits = []
+    for index, keyword in enumerate(keywords):
+        if not keyword:
+            continue
+        start = text_lower.find(keyword.lower())
+        while start != -1:
+            hits.append((start + len(keyword), index, Hit(keyword, start, start + len(keyword))))
+            start = text_lower.find(keyword.lower(), start + 1)
+    return [hit for _, _, hit in sorted(hits)]
+
+
+class TestKeywordMatcher(unittest.TestCase):
+    """Test the Aho-Corasick keyword matcher"""
+
+    def test_find_all_reports_overlapping_hits_with_offsets(self):
+        """Test that every occurrence is found, including overlaps and suffixes"""
+        matcher = KeywordMatcher(['cleaning service', 'House Cleaning', 'clean', 'he', 'she', 'hers'])
+        text = "Need a house cleaning service - ushers welcome"
+
+        hits = matcher.find_all(text)
+
+        self.assertEqual(hits, naive_hits(text, matcher.keywords))
+        self.assertIn(Hit('House Cleaning', 7, 21), hits)
+        self.assertIn(Hit('cleaning service', 13, 29), hits)
+        self.assertEqual(text[7:21], 'house cleaning')
+
+    def test_first_match_follows_keyword_order(self):
+        """Test that the first configured keyword wins, wherever it occurs"""
+        matcher = KeywordMatcher(['cleaning service', 'house cleaner', ''])
+
+        self.assertEqual(matcher.first_match("House cleaner or a cleaning service?"), 'cleaning service')
+        self.assertEqual(matcher.first_match("Any HOUSE CLEANER around?"), 'house cleaner')
+        self.assertIsNone(matcher.first_match("Looking for a plumber"))
+        self.assertIsNone(matcher.first_match(""))
+        self.assertIsNone(KeywordMatcher([]).first_match("anything"))
+
+    def test_matches_original_loop(self):
+        """Test both the small-set and automaton paths against the scrapers' original loop"""
+        for count in (5, AUTOMATON_MIN_KEYWORDS, 300):
+            keywords = make_keywords(count, seed=count)
+            posts = make_posts(200, keywords, match_rate=0.3, seed=count)
+            matcher = KeywordMatcher(keywords)
+
+            matched = [keyword for keyword in (matcher.first_match(post) for post in posts) if keyword]
+
+            self.assertEqual(matched, match_loop(posts, keywords))
+
+    def test_match_all_returns_every_keyword_in_order(self):
+        """Test that both paths report every keyword with all of its spans"""
+        text = "Deep clean needed. House cleaner? Any house cleaner doing a deep clean?"
+        small = ['plumber', 'house cleaner', 'deep clean']
+        large = small + make_keywords(AUTOMATON_MIN_KEYWORDS, seed=1)
+
+        expected = [
+            KeywordMatch('house cleaner', [(19, 32), (38, 51)]),
+            KeywordMatch('deep clean', [(0, 10), (60, 70)])
+        ]
+        self.assertEqual(KeywordMatcher(small).match_all(text), expected)
+        self.assertEqual(KeywordMatcher(large).match_all(text), expected)
+        self.assertEqual(KeywordMatcher(small).match_all(""), [])
+
+    def test_match_post_tags_post(self):
+        """Test that a post keeps its first keyword and gains the full list"""
+        post = {'text': 'Deep clean by a house cleaner'}
+
+        keyword = match_post(KeywordMatcher(['house cleaner', 'deep clean']), post)
+
+        self.assertEqual(keyword, 'house cleaner')
+        self.assertEqual(post['matched_keyword'], 'house cleaner')
+        self.assertEqual(post['matched_keywords'], [
+            {'keyword': 'house cleaner', 'spans': [[16, 29]]},
+            {'keyword': 'deep clean', 'spans': [[0, 10]]}
+        ])
+        self.assertIsNone(match_post(KeywordMatcher(['plumber']), {'text': 'Deep clean'}))
+
+    def test_random_texts_match_naive_search(self):
+        """Test find_all on random texts over a tiny alphabet, where overlaps are common"""
+        rng = random.Random(7)
+        for _ in range(50):
+            keywords = ["".join(rng.choice('abA') for _ in range(rng.randint(1, 4))) for _ in range(6)]
+            text = "".join(rng.choice('abAB ') for _ in range(60))
+            self.assertEqual(KeywordMatcher(keywords).find_all(text), naive_hits(text, keywords))
+
+    def test_pickles_as_keywords(self):
+        """Test that parse pool workers receive the keywords and compile them once"""
+        matcher = KeywordMatcher(make_keywords(200))
+
+        first = pickle.loads(pickle.dumps(matcher))
+        second = pickle.loads(pickle.dumps(matcher))
+
+        self.assertLess(len(pickle.dumps(matcher)), 10000)
+        self.assertIs(first, second)
+        self.assertEqual(first.keywords, matcher.keywords)
+        self.assertIs(compile_keywords(matcher), matcher)
+
+    def test_benchmark_agrees(self):
+        """Test that the micro-benchmark runs and both implementations agree"""
+        results = run([10, 100], post_count=50, repeat=1)
+        self.assertEqual([result['keywords'] for result in results], [10, 100])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,167 @@
+import unittest
+import os
+import sys
+import json
+from unittest.mock import MagicMock
+
+import requests
+
+# Add the parent directory to the path so we can import our app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.scraper import facebook_scraper, nextdoor_scraper, html_parser
+from app.scraper.facebook_scraper import FacebookScraper
+from app.scraper.network_capture import (
+    capture_responses, load_payloads, merge_posts, facebook_payload_records, nextdoor_payload_records, FACEBOOK_FEED_PATTERNS
+)
+from app.scraper.parse_pool import parse_posts
+from benchmarks.feed_server import FeedServer
+
+
+def performance_entry(method, params):
+    """Build a performance log entry as returned by driver.get_log('performance')"""
+    return {'message': json.dumps({'message': {'method': method, 'params': params}})}
+
+
+class TestNetworkCapture(unittest.TestCase):
+    """Test building posts from recorded feed responses"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Serve recorded-style feed responses from the local stand-in"""
+        cls.server = FeedServer(posts=15, page_size=10, api=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        """Stop the stand-in"""
+        cls.server.stop()
+
+    def test_facebook_payload_matches_dom_extraction(self):
+        """Test that GraphQL stories give the same posts as the rendered page"""
+        body = requests.get(self.server.url('/api/graphql/?group=cleaners&page=0')).text
+        self.assertTrue(body.startswith('for (;;);'))
+
+        from_network = facebook_scraper.build_posts(facebook_payload_records([body]))
+        self.server.api = False
+        try:
+            url = self.server.facebook_group_url('cleaners')
+            from_dom = parse_posts('facebook', requests.get(url).text, url)
+        finally:
+            self.server.api = True
+
+        self.assertEqual(len(from_network), 10)
+        self.assertEqual(from_network, from_dom)
+
+    def test_nextdoor_payload_matches_dom_extraction(self):
+        """Test that Nextdoor feed items give the same posts as the rendered page"""
+        bodies = [
+            requests.get(self.server.url(f'/api/gql/feed?neighborhood=oak&page={page}')).text
+            for page in (0, 1)
+        ]
+
+        posts = nextdoor_scraper.build_posts(nextdoor_payload_records(bodies))
+
+        self.assertEqual(len(posts), 15)
+        self.assertEqual(posts[0]['id'], '1000015')
+        self.assertEqual(posts[0]['url'], self.server.url('/p/post/1000015/'))
+        self.assertIsNotNone(posts[0]['date'])
+        self.assertTrue(posts[0]['author'])
+
+    def test_load_payloads_handles_streams_and_nested_stories(self):
+        """Test streamed responses, duplicates and attached stories"""
+        story = {
+            'post_id': '42', 'url': 'https://www.facebook.com/groups/g/posts/42/', 'creation_time': 1700000000,
+            'actors': [{'name': 'Sam Lee'}],
+            'message': {'text': 'Looking for a house cleaner this weekend'},
+            'attached_story': {'post_id': '7', 'message': {'text': 'Shared post'}}
+        }
+        body = json.dumps({'data': {'node': story}}) + "\n" + json.dumps({'data': {'node': story}}) + "\nnot json"
+
+        self.assertEqual(len(load_payloads(body)), 2)
+        records = facebook_payload_records([body])
+        self.assertEqual([record['post_id'] for record in records], ['42'])
+        self.assertEqual(records[0]['author'], 'Sam Lee')
+        self.assertEqual(records[0]['text'], 'Looking for a house cleaner this weekend')
+
+    def test_capture_responses_reads_matching_bodies(self):
+        """Test that only finished feed responses are fetched over CDP"""
+        driver = MagicMock()
+        driver.get_log.return_value = [
+            performance_entry('Network.responseReceived', {'requestId': '1', 'response': {'url': 'https://www.facebook.com/api/graphql/'}}),
+            performance_entry('Network.responseReceived', {'requestId': '2', 'response': {'url': 'https://www.facebook.com/logo.png'}}),
+            performance_entry('Network.responseReceived', {'requestId': '3', 'response': {'url': 'https://www.facebook.com/api/graphql/'}}),
+            performance_entry('Network.loadingFinished', {'requestId': '1', 'encodedDataLength': 100}),
+            performance_entry('Network.loadingFinished', {'requestId': '2', 'encodedDataLength': 100})
+        ]
+        driver.execute_cdp_cmd.return_value = {'body': 'eyJvayI6IHRydWV9', 'base64Encoded': True}
+
+        bodies = capture_responses(driver, FACEBOOK_FEED_PATTERNS)
+
+        self.assertEqual(bodies, ['{"ok": true}'])
+        driver.execute_cdp_cmd.assert_called_once_with('Network.getResponseBody', {'requestId': '1'})
+
+    def test_first_page_is_server_rendered(self):
+        """Test that the API-mode fixture renders page one inline and only fetches later pages"""
+        url = self.server.facebook_group_url('cleaners')
+        page = requests.get(url).text
+
+        self.assertEqual(len(parse_posts('facebook', page, url)), 10)
+        self.assertIn('/api/graphql/?group=cleaners&page=', page)
+        self.assertNotIn('page === 0', page)
+
+    def network_scraper(self, page_html, response_pages):
+        """Network-mode scraper whose page shows page_html and whose log captured the given feed API pages"""
+        url = self.server.facebook_group_url('cleaners')
+        log = []
+        bodies = {}
+        for page in response_pages:
+            request_id = str(page)
+            response_url = self.server.url(f'/api/graphql/?group=cleaners&page={page}')
+            bodies[request_id] = requests.get(response_url).text
+            log.append(performance_entry('Network.responseReceived', {'requestId': request_id, 'response': {'url': response_url}}))
+            log.append(performance_entry('Network.loadingFinished', {'requestId': request_id, 'encodedDataLength': len(bodies[request_id])}))
+
+        scraper = FacebookScraper(extraction_mode='network')
+        scraper.driver = MagicMock()
+        scraper.driver.get_log.return_value = log
+        scraper.driver.execute_cdp_cmd.side_effect = lambda command, params: {'body': bodies[params['requestId']], 'base64Encoded': False}
+        scraper.driver.execute_script.return_value = html_parser.facebook_records(page_html, url)
+        return scraper
+
+    def test_scraper_network_mode_keeps_server_rendered_posts(self):
+        """Test that posts only the page has are merged with the ones from feed responses"""
+        url = self.server.facebook_group_url('cleaners')
+        first_page = requests.get(url).text
+        # The page's script renders each response below the server-rendered posts
+        scrolled_page = first_page + requests.get(self.server.url('/groups/cleaners/feed?page=1')).text
+        expected = [str(1000015 - index) for index in range(15)]
+
+        posts = self.network_scraper(scrolled_page, [1])._extract_posts()
+        self.assertEqual([post['id'] for post in posts], expected)
+
+        # Posts the page dropped while scrolling still come from the responses
+        scraper = self.network_scraper(first_page, [1])
+        posts = scraper._extract_posts()
+        self.assertEqual([post['id'] for post in posts], expected)
+        self.assertEqual(len(scraper._network_messages), 2)
+
+    def test_scraper_network_mode_without_responses(self):
+        """Test that network mode reads the page when nothing was captured"""
+        url = self.server.facebook_group_url('cleaners')
+        posts = self.network_scraper(requests.get(url).text, [])._extract_posts()
+
+        self.assertEqual(len(posts), 10)
+        self.assertEqual(posts[0]['id'], '1000015')
+
+    def test_merge_posts(self):
+        """Test that duplicates keep the network copy and undated feeds keep page order"""
+        page_posts = [{'id': '2', 'text': 'page', 'date': None}, {'id': None, 'text': 'no id', 'date': None}]
+        network_posts = [{'id': '2', 'text': 'network', 'date': None}, {'id': '1', 'text': 'older', 'date': None}]
+
+        merged = merge_posts(network_posts, page_posts)
+
+        self.assertEqual([post['text'] for post in merged], ['network', 'no id', 'older'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import unittest
+import os
+import sys
+import threading
+import time
+
+# Add the parent directory to the path so we can import our app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.scraper.pipeline import Pipeline, Stage
+
+
+class TestPipeline(unittest.TestCase):
+    """Test the staged scrape pipeline"""
+
+    def test_next_item_fetches_while_previous_is_stored(self):
+        """Test that the fetch stage does not wait for the store stage"""
+        second_fetch_started = threading.Event()
+
+        def fetch(item, value):
+            if item == 2:
+                second_fetch_started.set()
+            return item * 10
+
+        overlapped = []
+
+        def store(item, result, error):
+            if item == 1:
+                overlapped.append(second_fetch_started.wait(timeout=5))
+
+        Pipeline('test', [Stage('fetch', fetch, 1)]).run([1, 2], store)
+
+        self.assertEqual(overlapped, [True])
+
+    def test_bounded_queues_apply_backpressure(self):
+        """Test that a slow store stage keeps the fetch stage from running far ahead"""
+        fetched = []
+        ahead = []
+
+        def store(item, result, error):
+            ahead.append(len(fetched) - item)
+            time.sleep(0.005)
+
+        stages = [Stage('fetch', lambda item, value: fetched.append(item) or value, 1)]
+        Pipeline('test', stages, queue_size=1).run(list(range(30)), store)
+
+        # One item in the queue and one waiting to be put, besides the one being stored
+        self.assertLessEqual(max(ahead), 3)
+
+    def test_results_errors_and_stats(self):
+        """Test that results pass through every stage and failures skip the rest"""
+        def fetch(item, value):
+            if item == 3:
+                raise ValueError("page did not load")
+            return f"<html>{item}</html>"
+
+        parsed = []
+        results = {}
+
+        def parse(item, html):
+            parsed.append(item)
+            return html.upper()
+
+        def store(item, result, error):
+            results[item] = (result, str(error) if error else None)
+
+        stats = Pipeline('test', [Stage('fetch', fetch, 2), Stage('parse', parse, 3), None]).run([1, 2, 3], store)
+
+        self.assertEqual(results, {
+            1: ('<HTML>1</HTML>', None),
+            2: ('<HTML>2</HTML>', None),
+            3: (None, 'page did not load')
+        })
+        self.assertEqual(sorted(parsed), [1, 2])
+        self.assertEqual([stats[name]['items'] for name in ('fetch', 'parse', 'store')], [3, 3, 3])
+        self.assertEqual(Pipeline('test', [Stage('fetch', fetch, 1)]).run([], store)['store']['items'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,171 @@
+import unittest
+import os
+import sys
+import shutil
+import asyncio
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+
+from sqlalchemy.orm import sessionmaker
+
+# Add the parent directory to the path so we can import our app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models.models import RateLimitBucket, RequestStat, init_db
+from app.scraper.rate_limit import TokenBucket, RateLimiter, request_stats
+from app.scraper.facebook_scraper import FacebookScraper
+
+
+class FakeClock:
+    """Clock that only moves when told to"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTokenBucket(unittest.TestCase):
+    """Test the token bucket"""
+
+    def test_burst_then_spacing(self):
+        """Test that a bucket allows its burst and then spaces requests at its rate"""
+        clock = FakeClock()
+        bucket = TokenBucket(rate_per_minute=30, burst=2, clock=clock)
+
+        self.assertEqual([bucket.reserve() for _ in range(4)], [0.0, 0.0, 2.0, 4.0])
+
+        # Tokens refill with time, up to the burst
+        clock.now += 60
+        self.assertEqual([bucket.reserve() for _ in range(3)], [0.0, 0.0, 2.0])
+
+
+class TestRateLimiter(unittest.TestCase):
+    """Test the shared per-platform and per-account limiter"""
+
+    def test_concurrent_callers_share_the_budget(self):
+        """Test that browsers waiting at once are spaced over the platform's rate"""
+        clock = FakeClock()
+        delays = []
+        lock = threading.Lock()
+
+        def sleep(seconds):
+            with lock:
+                delays.append(seconds)
+
+        limiter = RateLimiter({'facebook': 60}, burst=1, clock=clock, sleep=sleep)
+        threads = [
+            threading.Thread(target=limiter.wait, args=(('facebook', 'me@example.com'), 'navigate'))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(delays), [1.0, 2.0, 3.0, 4.0])
+        stats = limiter.stats()['facebook']
+        self.assertEqual(stats['requests'], 5)
+        self.assertEqual(stats['throttled_seconds'], 10.0)
+        self.assertEqual(stats['rate_per_minute'], 60)
+
+    def test_account_bucket_and_jitter(self):
+        """Test that the stricter of the platform and account buckets wins, plus bounded jitter"""
+        clock = FakeClock()
+        limiter = RateLimiter({'nextdoor': 60}, account_rate=30, burst=1, jitter=0.5, clock=clock, sleep=MagicMock())
+
+        first = limiter.delay(('nextdoor', 'me@example.com'), 'navigate')
+        second = limiter.delay(('nextdoor', 'me@example.com'), 'scroll')
+        other_account = limiter.delay(('nextdoor', 'you@example.com'), 'scroll')
+
+        self.assertLessEqual(first, 0.5)
+        self.assertTrue(2.0 <= second <= 2.5)
+        self.assertTrue(2.0 <= other_account <= 2.5)  # Own account bucket is fresh, the platform one is not
+        self.assertEqual(limiter.stats()['nextdoor']['actions'], {'navigate': 1, 'scroll': 2})
+
+    def test_unlimited_and_async(self):
+        """Test that unconfigured platforms are not throttled and coroutines wait too"""
+        limiter = RateLimiter({'facebook': 0}, clock=FakeClock())
+
+        self.assertEqual(asyncio.run(limiter.wait_async(('facebook', ''), 'navigate')), 0.0)
+        self.assertEqual(limiter.wait(('facebook', ''), 'scroll'), 0.0)
+
+    def test_workers_share_the_database_budget(self):
+        """Test that limiters in different processes, sharing a database, split one budget"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        database_url = f"sqlite:///{os.path.join(directory, 'limits.db')}"
+        clock = FakeClock()
+
+        # Separate engines, as separate worker processes would have
+        workers = [
+            RateLimiter({'facebook': 60}, account_rate=30, burst=1, engine=init_db(database_url), clock=clock, sleep=MagicMock())
+            for _ in range(2)
+        ]
+        account = ('facebook', 'me@example.com')
+        delays = [workers[index % 2].delay(account, 'navigate') for index in range(4)]
+        self.assertEqual(delays, [0.0, 2.0, 4.0, 6.0])
+
+        # The platform bucket alone spaces a second account's requests
+        self.assertEqual(workers[0].delay(('facebook', 'you@example.com'), 'scroll'), 4.0)
+
+        clock.now += 60
+        self.assertEqual(asyncio.run(workers[1].wait_async(account, 'scroll')), 0.0)
+
+        session = sessionmaker(bind=init_db(database_url))()
+        self.assertEqual(
+            sorted(key for (key,) in session.query(RateLimitBucket.key)),
+            ['facebook', 'facebook/me@example.com', 'facebook/you@example.com']
+        )
+        session.close()
+
+    def test_saved_stats_cover_every_worker(self):
+        """Test that the dashboard's request stats add up what each worker saved over the last day"""
+        session = sessionmaker(bind=init_db("sqlite:///:memory:"))()
+        now = datetime(2024, 1, 2, 12, 30)
+        rates = {'facebook': 60}
+
+        for worker, actions in (('worker-1', ['navigate', 'scroll', 'scroll']), ('worker-2', ['navigate'])):
+            limiter = RateLimiter(rates, burst=1, clock=FakeClock(), sleep=MagicMock())
+            for action in actions:
+                limiter.wait(('facebook', 'me@example.com'), action)
+            limiter.save_stats(session, worker, now=now - timedelta(days=2))
+            for action in actions:
+                limiter.wait(('facebook', 'me@example.com'), action)
+            limiter.save_stats(session, worker, now=now)
+            # Saving again without new requests adds nothing
+            limiter.save_stats(session, worker, now=now)
+        session.commit()
+
+        # The clocks never move, so the recent requests of the first worker waited 3, 4 and 5 seconds
+        stats = request_stats(session, rates, now=now)
+        self.assertEqual(stats, {'facebook': {
+            'requests': 4, 'throttled_seconds': 3.0 + 4.0 + 5.0 + 1.0, 'actions': {'navigate': 2, 'scroll': 2}, 'rate_per_minute': 60
+        }})
+        self.assertEqual(request_stats(session, rates, now=now + timedelta(days=2)), {})
+
+        # Stats past the retention period are deleted on the next save
+        limiter.wait(('facebook', 'me@example.com'), 'navigate')
+        limiter.save_stats(session, 'worker-2', now=now + timedelta(days=8))
+        session.commit()
+        self.assertEqual(session.query(RequestStat).count(), 1)
+        session.close()
+
+    def test_scraper_records_throttle_waits(self):
+        """Test that a scraper's page loads go through the limiter and count as waits"""
+        limiter = MagicMock()
+        limiter.wait.return_value = 1.5
+        scraper = FacebookScraper(rate_limiter=limiter)
+        scraper.driver = MagicMock()
+
+        scraper._throttle('navigate')
+
+        limiter.wait.assert_called_once_with(scraper.session_key, 'navigate')
+        self.assertEqual(scraper.prober.stats()['wait_seconds'], 1.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
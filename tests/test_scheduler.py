@@ -0,0 +1,534 @@
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from unittest.mock import patch, MagicMock
+
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+from sqlalchemy import event
+
+# Add the parent directory to the path so we can import our app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models.models import Source, Keyword, Match, MatchKeyword, JobStoreOwner
+from app.scraper.pool import ScraperPool
+from app.scraper.scheduler import ScraperScheduler
+from app.scraper.concurrency import SUCCESS, TIMEOUT, CAPTCHA
+from app.scraper.polling import poll_interval, record_scrape, record_failure
+
+# Use an in-memory SQLite database for testing
+TEST_DATABASE_URL = "sqlite:///:memory:"
+
+class TestScraperPool(unittest.TestCase):
+    """Test the browser worker pool"""
+
+    def test_run_respects_pool_size(self):
+        """Test that sources are spread across at most `size` browsers"""
+        created = []
+        active = []
+        peak = []
+        lock = threading.Lock()
+
+        def factory(index):
+            scraper = MagicMock(name=f"worker-{index}")
+            created.append(scraper)
+            return scraper
+
+        def task(scraper, item):
+            with lock:
+                active.append(item)
+                peak.append(len(active))
+            time.sleep(0.05)
+            with lock:
+                active.remove(item)
+            return item * 2
+
+        pool = ScraperPool('facebook', factory, size=3)
+        results = {item: result for item, result, error in pool.run(list(range(9)), task)}
+
+        self.assertEqual(results, {item: item * 2 for item in range(9)})
+        self.assertLessEqual(len(created), 3)
+        self.assertLessEqual(max(peak), 3)
+        self.assertGreater(max(peak), 1)
+
+        pool.close()
+        for scraper in created:
+            scraper.close.assert_called_once()
+
+    def test_run_reports_errors_per_item(self):
+        """Test that one failing source does not stop the others"""
+        def task(scraper, item):
+            if item == 1:
+                raise ValueError("boom")
+            return item
+
+        pool = ScraperPool('nextdoor', lambda index: MagicMock(), size=2)
+        outcomes = {item: (result, error) for item, result, error in pool.run([0, 1, 2], task)}
+
+        self.assertEqual(outcomes[0], (0, None))
+        self.assertIsInstance(outcomes[1][1], ValueError)
+        self.assertEqual(outcomes[2], (2, None))
+
+
+class TestScraperScheduler(unittest.TestCase):
+    """Test the scraper scheduler"""
+
+    def setUp(self):
+        """Create a scheduler on an in-memory database"""
+        with patch('app.scraper.scheduler.DATABASE_URL', TEST_DATABASE_URL):
+            self.scheduler = ScraperScheduler()
+
+        session = self.scheduler.Session()
+        session.add(Source(name="Test Facebook Group", url="https://www.facebook.com/groups/test", source_type="facebook", is_active=True))
+        session.add(Keyword(text="house cleaner", is_active=True))
+        session.commit()
+        session.close()
+
+    def test_run_facebook_scraper_stores_results(self):
+        """Test that pool results are written back on the scheduler side"""
+        scraper = MagicMock()
+        scraper.scrape_group.return_value = [{
+            'id': '123',
+            'url': 'https://www.facebook.com/groups/test/posts/123',
+            'text': 'Looking for a house cleaner this week',
+            'author': 'John Doe',
+            'date': datetime(2024, 1, 1),
+            'source_type': 'facebook',
+            'matched_keyword': 'house cleaner'
+        }]
+        scraper.last_cursor = {'post_id': '123', 'post_date': datetime(2024, 1, 1)}
+        scraper.last_outcome = SUCCESS
+
+        self.scheduler.facebook_pool.factory = lambda index: scraper
+        self.scheduler.run_facebook_scraper()
+
+        session = self.scheduler.Session()
+        match = session.query(Match).one()
+        source = session.query(Source).one()
+        self.assertEqual(match.post_id, '123')
+        self.assertEqual(match.matched_text, 'house cleaner')
+        self.assertEqual(source.last_post_id, '123')
+        self.assertIsNotNone(source.last_scraped)
+        session.close()
+
+    def test_run_publishes_new_matches_for_alerting(self):
+        """Test that stored matches are handed to the alert dispatcher with the time they were seen"""
+        scraper = MagicMock()
+        scraper.scrape_group.return_value = [{
+            'id': '123',
+            'url': 'https://www.facebook.com/groups/test/posts/123',
+            'text': 'Looking for a house cleaner this week',
+            'author': 'John Doe',
+            'date': datetime(2024, 1, 1),
+            'matched_keyword': 'house cleaner'
+        }]
+        scraper.last_cursor = None
+        scraper.last_outcome = SUCCESS
+        published = []
+
+        def publish(match_ids):
+            # The matches must be committed before the dispatcher looks them up
+            session = self.scheduler.Session()
+            published.extend(session.query(Match.id).filter(Match.id.in_(match_ids)).all())
+            session.close()
+
+        self.scheduler.facebook_pool.factory = lambda index: scraper
+        started = datetime.utcnow()
+        with patch.object(self.scheduler.dispatcher, 'publish', side_effect=publish):
+            self.scheduler.run_facebook_scraper()
+
+        session = self.scheduler.Session()
+        match = session.query(Match).one()
+        self.assertEqual(published, [(match.id,)])
+        self.assertGreaterEqual(match.seen_at, started)
+        self.assertLessEqual(match.seen_at, match.created_at)
+        session.close()
+
+    def test_store_matches_records_every_keyword(self):
+        """Test that all matched keywords are stored in one batch and known posts are skipped"""
+        session = self.scheduler.Session()
+        session.add(Keyword(text="deep clean", is_active=True))
+        session.commit()
+        source = session.query(Source).one()
+        keywords = session.query(Keyword).all()
+
+        post = {
+            'id': '123',
+            'url': 'https://www.facebook.com/groups/test/posts/123',
+            'text': 'Need a house cleaner for a deep clean, house cleaner with references',
+            'author': 'John Doe',
+            'date': datetime(2024, 1, 1),
+            'matched_keyword': 'house cleaner',
+            'matched_keywords': [
+                {'keyword': 'house cleaner', 'spans': [[7, 20], [40, 53]]},
+                {'keyword': 'deep clean', 'spans': [[27, 37]]}
+            ]
+        }
+        self.scheduler._store_matches(session, source, [post, dict(post)], keywords)
+        session.commit()
+        self.scheduler._store_matches(session, source, [post], keywords)
+        session.commit()
+
+        match = session.query(Match).one()
+        self.assertEqual(match.keyword.text, 'house cleaner')
+        self.assertEqual(match.keyword_texts, ['house cleaner', 'deep clean'])
+        deep_clean = session.query(MatchKeyword).join(Keyword).filter(Keyword.text == 'deep clean').one()
+        self.assertEqual(deep_clean.spans, [[27, 37]])
+        self.assertIsNone(match.score)
+        session.close()
+
+    def test_store_matches_scores_new_matches(self):
+        """Test that new matches are scored in one batch when a lead model is loaded"""
+        session = self.scheduler.Session()
+        source = session.query(Source).one()
+        keywords = session.query(Keyword).all()
+        scorer = MagicMock()
+        scorer.score.return_value = [0.25, 0.75]
+        posts = [{
+            'id': str(post_id),
+            'url': f'https://www.facebook.com/groups/test/posts/{post_id}',
+            'text': f'Need a house cleaner ({post_id})',
+            'author': None,
+            'date': None,
+            'matched_keyword': 'house cleaner'
+        } for post_id in (1, 2)]
+
+        self.scheduler._store_matches(session, source, posts, keywords, scorer)
+        session.commit()
+
+        scorer.score.assert_called_once_with(['Need a house cleaner (1)', 'Need a house cleaner (2)'])
+        self.assertEqual([match.score for match in session.query(Match).order_by(Match.post_id)], [0.25, 0.75])
+        session.close()
+
+    def test_store_matches_uses_constant_round_trips(self):
+        """Test that storing a source's posts costs the same statements for 3 or 60 posts"""
+        session = self.scheduler.Session()
+        source = session.query(Source).one()
+        keywords = session.query(Keyword).all()
+        statements = []
+        event.listen(self.scheduler.engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+
+        counts = []
+        for first, count in ((0, 3), (100, 60)):
+            posts = [{
+                'id': str(post_id) if post_id % 2 else '',
+                'url': f'https://www.facebook.com/groups/test/posts/{post_id}',
+                'text': f'Need a house cleaner ({post_id})',
+                'author': None,
+                'date': None,
+                'matched_keyword': 'house cleaner'
+            } for post_id in range(first, first + count)]
+            del statements[:]
+            self.scheduler._store_matches(session, source, posts, keywords)
+            session.flush()
+            counts.append(len(statements))
+
+        self.assertEqual(counts[0], counts[1])
+        self.assertEqual(session.query(Match).count(), 63)
+        self.assertEqual(session.query(MatchKeyword).count(), 63)
+        self.assertEqual(session.query(Match).filter(Match.post_id == '').count(), 0)
+        session.close()
+
+    def test_insert_matches_skips_posts_stored_meanwhile(self):
+        """Test that a post stored by another job after the existence check is skipped"""
+        session = self.scheduler.Session()
+        source = session.query(Source).one()
+        keyword = session.query(Keyword).one()
+        row = {
+            'source_id': source.id,
+            'keyword_id': keyword.id,
+            'post_id': '123',
+            'post_url': 'https://www.facebook.com/groups/test/posts/123',
+            'post_text': 'Need a house cleaner',
+            'matched_text': 'house cleaner'
+        }
+        session.add(Match(**row))
+        session.commit()
+
+        stored = self.scheduler._insert_matches(session, [dict(row), dict(row, post_id='456'), dict(row, post_id=None)])
+        session.commit()
+
+        self.assertIsNone(stored[0])
+        self.assertEqual([stored[1].post_id, stored[2].post_id], ['456', None])
+        self.assertEqual(session.query(Match).count(), 3)
+        session.close()
+
+    def test_store_matches_links_cross_posts(self):
+        """Test that the same request posted to another group is linked and not alerted twice"""
+        session = self.scheduler.Session()
+        first_group = session.query(Source).one()
+        second_group = Source(name="Second Group", url="https://www.facebook.com/groups/second", source_type="facebook")
+        session.add(second_group)
+        session.commit()
+        keywords = session.query(Keyword).all()
+        text = "Can anyone recommend a house cleaner for a two bedroom flat near the park, every other Friday?"
+        published = []
+
+        for source, prefix in ((first_group, 'Hi all.'), (second_group, 'Hello neighbors!')):
+            new_match_ids = self.scheduler._store_matches(session, source, [{
+                'id': str(source.id),
+                'url': f'{source.url}/posts/{source.id}',
+                'text': f'{prefix} {text}',
+                'author': 'Jane Doe',
+                'date': None,
+                'matched_keyword': 'house cleaner'
+            }], keywords)
+            session.commit()
+            published.append(new_match_ids)
+
+        original, copy = session.query(Match).order_by(Match.id).all()
+        self.assertEqual(copy.duplicate_of_id, original.id)
+        self.assertTrue(copy.is_notified)
+        self.assertFalse(original.is_notified)
+        self.assertEqual(published, [[original.id], []])
+        session.close()
+
+    def test_failed_scrape_is_not_recorded_as_quiet(self):
+        """Test that a timed-out or blocked scrape leaves the source's post rate, last scrape and cursor alone"""
+        last_scraped = datetime.utcnow() - timedelta(hours=1)
+        cursor = {'post_id': '100', 'post_date': datetime(2024, 1, 1)}
+        scraper = MagicMock()
+        scraper.scrape_group.return_value = []
+        scraper.snapshot_group.return_value = None
+        scraper.last_cursor = cursor
+        self.scheduler.facebook_pool.factory = lambda index: scraper
+
+        for mode, outcome in (('script', TIMEOUT), ('snapshot', CAPTCHA)):
+            session = self.scheduler.Session()
+            source = session.query(Source).one()
+            source.post_rate = 2.0
+            source.last_scraped = last_scraped
+            source.last_post_id = '100'
+            source.next_due_at = None
+            session.commit()
+            session.close()
+
+            scraper.last_outcome = outcome
+            self.scheduler.extraction_mode = mode
+            self.scheduler.run_facebook_scraper()
+
+            session = self.scheduler.Session()
+            source = session.query(Source).one()
+            self.assertEqual(source.post_rate, 2.0)
+            self.assertEqual(source.last_scraped, last_scraped)
+            self.assertEqual(source.last_post_id, '100')
+            # Retried after the interval its post rate calls for, not pushed back as a quiet source
+            self.assertAlmostEqual(
+                (source.next_due_at - datetime.utcnow()).total_seconds(), poll_interval(source).total_seconds(), delta=60
+            )
+            self.assertIsNone(source.lease_owner)
+            session.close()
+
+    def test_due_run_scrapes_overdue_sources_first(self):
+        """Test that a due run skips sources that are not due and starts with the most overdue"""
+        session = self.scheduler.Session()
+        now = datetime.utcnow()
+        first = session.query(Source).one()
+        first.next_due_at = now - timedelta(minutes=1)
+        session.add_all([
+            Source(name="Quiet Group", url="https://www.facebook.com/groups/quiet", source_type="facebook",
+                   next_due_at=now + timedelta(hours=2)),
+            Source(name="Overdue Group", url="https://www.facebook.com/groups/overdue", source_type="facebook",
+                   next_due_at=now - timedelta(minutes=30))
+        ])
+        session.commit()
+        session.close()
+
+        scraped = []
+        scraper = MagicMock()
+        scraper.scrape_group.side_effect = lambda url, matcher, cursor=None: scraped.append(url) or []
+        scraper.last_cursor = {'post_id': None, 'post_date': None, 'new_posts': 0}
+        scraper.last_outcome = SUCCESS
+        self.scheduler.facebook_pool.factory = lambda index: scraper
+        self.scheduler.run_platform('facebook', due_only=True)
+
+        self.assertEqual(scraped, ['https://www.facebook.com/groups/overdue', 'https://www.facebook.com/groups/test'])
+        session = self.scheduler.Session()
+        for source in session.query(Source).filter(Source.name != "Quiet Group"):
+            self.assertGreater(source.next_due_at, datetime.utcnow())
+        session.close()
+
+    def test_run_skips_sources_leased_by_other_workers(self):
+        """Test that a source another worker holds a live lease on is left to it, and own leases are released"""
+        session = self.scheduler.Session()
+        session.add(Source(name="Leased Group", url="https://www.facebook.com/groups/leased", source_type="facebook",
+                           lease_owner="other-worker", lease_expires_at=datetime.utcnow() + timedelta(minutes=10)))
+        session.commit()
+        session.close()
+
+        scraped = []
+        scraper = MagicMock()
+        scraper.scrape_group.side_effect = lambda url, matcher, cursor=None: scraped.append(url) or []
+        scraper.last_cursor = {'post_id': None, 'post_date': None, 'new_posts': 0}
+        scraper.last_outcome = SUCCESS
+        self.scheduler.facebook_pool.factory = lambda index: scraper
+        self.scheduler.run_facebook_scraper()
+
+        self.assertEqual(scraped, ['https://www.facebook.com/groups/test'])
+        session = self.scheduler.Session()
+        owners = {source.name: source.lease_owner for source in session.query(Source)}
+        self.assertEqual(owners, {"Test Facebook Group": None, "Leased Group": "other-worker"})
+        session.close()
+
+    def test_run_claims_sources_in_batches(self):
+        """Test that a job keeps claiming batches until every source is scraped once"""
+        session = self.scheduler.Session()
+        session.add_all([
+            Source(name=f"Group {number}", url=f"https://www.facebook.com/groups/{number}", source_type="facebook")
+            for number in range(4)
+        ])
+        session.commit()
+        session.close()
+
+        scraped = []
+        scraper = MagicMock()
+        scraper.scrape_group.side_effect = lambda url, matcher, cursor=None: scraped.append(url) or []
+        scraper.last_cursor = {'post_id': None, 'post_date': None, 'new_posts': 0}
+        scraper.last_outcome = SUCCESS
+        self.scheduler.facebook_pool.factory = lambda index: scraper
+        with patch('app.scraper.scheduler.LEASE_BATCH_SIZE', 2):
+            self.scheduler.run_facebook_scraper()
+
+        self.assertEqual(len(scraped), 5)
+        self.assertEqual(len(set(scraped)), 5)
+
+    def test_run_platform_skips_when_busy(self):
+        """Test that a run that must not wait is skipped while another run holds the platform"""
+        self.scheduler._run_platform = MagicMock()
+
+        with self.scheduler.platform_locks['facebook']:
+            self.assertFalse(self.scheduler.run_platform('facebook', due_only=True, wait=False))
+        self.assertTrue(self.scheduler.run_platform('facebook', due_only=True, wait=False))
+        self.scheduler._run_platform.assert_called_once_with('facebook', True)
+
+
+class TestPersistentJobs(unittest.TestCase):
+    """Test that the schedule survives restarts"""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.database_url = f"sqlite:///{os.path.join(directory, 'jobs.db')}"
+
+    def start_scheduler(self):
+        """Start a scheduler on the shared database with its jobs' work mocked out"""
+        with patch('app.scraper.scheduler.DATABASE_URL', self.database_url):
+            scheduler = ScraperScheduler()
+        scheduler.run_due_sources = MagicMock()
+        scheduler.renew_leases = MagicMock()
+        scheduler.start()
+        self.addCleanup(lambda: scheduler.scheduler.running and scheduler.stop())
+        return scheduler
+
+    def wait_for_call(self, mock, timeout=5):
+        """Wait until a mocked job has run"""
+        deadline = time.monotonic() + timeout
+        while not mock.called and time.monotonic() < deadline:
+            time.sleep(0.05)
+        return mock.called
+
+    def test_restart_keeps_the_saved_schedule(self):
+        """Test that a restarted scheduler resumes its jobs' saved run times instead of starting over"""
+        first = self.start_scheduler()
+        self.assertTrue(self.wait_for_call(first.run_due_sources))  # A new job runs right away
+
+        next_run = (datetime.now(first.scheduler.timezone) + timedelta(minutes=30)).replace(microsecond=0)
+        first.scheduler.modify_job('due_sources', next_run_time=next_run)
+        first.stop()
+
+        second = self.start_scheduler()
+        self.assertEqual(second.scheduler.get_job('due_sources').next_run_time, next_run)
+        time.sleep(0.2)
+        second.run_due_sources.assert_not_called()
+
+    def test_missed_run_fires_once_after_restart(self):
+        """Test that runs missed while the process was down are made up at once, merged into one"""
+        first = self.start_scheduler()
+        self.wait_for_call(first.run_due_sources)
+        first.stop()
+
+        # The process was down when the job was due ten minutes ago
+        store = SQLAlchemyJobStore(url=self.database_url)
+        store.start(None, 'default')
+        job = store.lookup_job('due_sources')
+        job.next_run_time = datetime.now(job.trigger.timezone) - timedelta(minutes=10)
+        store.update_job(job)
+        store.shutdown()
+
+        second = self.start_scheduler()
+        self.assertTrue(self.wait_for_call(second.run_due_sources))
+        time.sleep(0.2)
+        second.run_due_sources.assert_called_once()
+
+    def test_workers_do_not_share_the_jobs_table(self):
+        """Test that a second running worker keeps its schedule in memory and every worker runs a heartbeat"""
+        first = self.start_scheduler()
+        second = self.start_scheduler()
+        self.assertTrue(first.jobs_persisted)
+        self.assertFalse(second.jobs_persisted)
+        self.assertTrue(self.wait_for_call(second.run_due_sources))
+        for scheduler in (first, second):
+            self.assertIsNotNone(scheduler.scheduler.get_job('lease_heartbeat', 'memory'))
+            self.assertTrue(self.wait_for_call(scheduler.renew_leases))
+
+        # The heartbeat is never saved in the table
+        store = SQLAlchemyJobStore(url=self.database_url)
+        store.start(None, 'default')
+        self.assertEqual([job.id for job in store.get_all_jobs()], ['due_sources'])
+        store.shutdown()
+
+        # A worker stopped normally hands the table over at once
+        first.stop()
+        self.assertTrue(self.start_scheduler().jobs_persisted)
+
+    def test_lost_table_moves_the_schedule_to_memory(self):
+        """Test that a worker whose lease on the table was taken over stops using it"""
+        scheduler = self.start_scheduler()
+        session = scheduler.Session()
+        session.query(JobStoreOwner).update({'owner': 'other-worker', 'expires_at': datetime.utcnow() + timedelta(hours=1)})
+        session.commit()
+        session.close()
+
+        ScraperScheduler.renew_leases(scheduler)
+        self.assertFalse(scheduler.jobs_persisted)
+        self.assertIsNotNone(scheduler.scheduler.get_job('due_sources', 'memory'))
+
+
+class TestAdaptivePolling(unittest.TestCase):
+    """Test per-source polling intervals"""
+
+    def test_busy_sources_are_polled_sooner(self):
+        """Test that the interval follows the smoothed post rate within the bounds"""
+        now = datetime(2024, 1, 1, 12)
+        busy = Source(last_scraped=now - timedelta(hours=1))
+        quiet = Source(last_scraped=now - timedelta(hours=1))
+        new = Source()
+
+        with patch('app.scraper.polling.MIN_SCRAPE_INTERVAL_MINUTES', 5), \
+             patch('app.scraper.polling.MAX_SCRAPE_INTERVAL_MINUTES', 360), \
+             patch('app.scraper.polling.TARGET_NEW_POSTS_PER_SCRAPE', 5), \
+             patch('app.scraper.polling.SCRAPE_INTERVAL_MINUTES', 60):
+            record_scrape(busy, {'new_posts': 20}, now)
+            record_scrape(quiet, {'new_posts': 0}, now)
+            record_scrape(new, {'new_posts': 20}, now)
+            self.assertEqual(busy.next_due_at - now, timedelta(minutes=15))
+            self.assertEqual(quiet.next_due_at - now, timedelta(minutes=360))
+            self.assertEqual(new.next_due_at - now, timedelta(minutes=60))
+            self.assertEqual(busy.last_new_post_at, now)
+            self.assertIsNone(quiet.last_new_post_at)
+
+            # A burst is smoothed rather than taken at face value
+            record_scrape(busy, {'new_posts': 300}, now + timedelta(minutes=15))
+            self.assertEqual(busy.post_rate, 610)
+            self.assertEqual(poll_interval(busy), timedelta(minutes=5))
+
+            record_failure(quiet, now)
+            self.assertEqual(quiet.next_due_at - now, timedelta(minutes=360))
+
+
+if __name__ == '__main__':
+    unittest.main()
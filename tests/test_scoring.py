@@ -0,0 +1,164 @@
+import unittest
+import os
+import sys
+from datetime import datetime
+from unittest.mock import patch
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# Add the parent directory to the path so we can import our app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models.models import Base, Source, Keyword, Match, LeadModel, NotificationSetting
+from app.scraper.scoring import extract_features, LeadScorer, load_scorer, rescore_matches, train_lead_model
+from app.alert.alert_system import AlertSystem
+from benchmarks.scoring_benchmark import run
+
+# Use an in-memory SQLite database for testing
+TEST_DATABASE_URL = "sqlite:///:memory:"
+
+GOOD_POSTS = [
+    "Can anyone recommend a house cleaner for our apartment?",
+    "Looking for a reliable cleaning lady, weekly visits",
+    "Need a recommendation for a deep clean before we move out",
+    "Who do you use for house cleaning? Recommend please",
+]
+BAD_POSTS = [
+    "Experienced house cleaner looking for work, call me",
+    "I clean houses, cleaning job wanted, references available",
+    "Cleaning lady available for hire this week",
+    "Looking for cleaning work, I am a reliable cleaner",
+]
+
+
+class TestFeatures(unittest.TestCase):
+    """Test hashed n-gram feature extraction"""
+
+    def test_features_are_stable_per_word(self):
+        """Test that words map to the same columns regardless of case, post or batch"""
+        first = extract_features(["Hello world"])
+        second = extract_features(["", "...", "HELLO   world!"])
+
+        self.assertEqual(sorted(first.columns), sorted(second.columns))
+        self.assertEqual(list(second.rows), [2, 2, 2])
+        self.assertEqual(len(first.columns), 3)  # two words and one bigram
+        self.assertEqual(list(second.scale[:2]), [1.0, 1.0])
+
+    def test_long_and_non_ascii_words(self):
+        """Test that long words are told apart by more than their first 8 bytes"""
+        features = extract_features(["internationalization", "internationally", "ünïcode café"])
+
+        self.assertNotEqual(features.columns[0], features.columns[1])
+        self.assertEqual(list(features.rows), [0, 1, 2, 2, 2])
+        self.assertEqual(extract_features([]).size, 0)
+
+
+class TestLeadScorer(unittest.TestCase):
+    """Test training and scoring lead models"""
+
+    def test_train_separates_labels(self):
+        """Test that a trained model ranks good leads above bad ones"""
+        scorer = LeadScorer.train(GOOD_POSTS + BAD_POSTS, [1] * 4 + [0] * 4)
+
+        scores = scorer.score(GOOD_POSTS + BAD_POSTS)
+
+        self.assertTrue(all(score > 0.5 for score in scores[:4]))
+        self.assertTrue(all(score < 0.5 for score in scores[4:]))
+        self.assertGreater(
+            scorer.score(["Please recommend a house cleaner"])[0],
+            scorer.score(["House cleaner looking for work"])[0]
+        )
+
+    def test_benchmark_runs(self):
+        """Test that the scoring benchmark runs on a small batch"""
+        result = run(post_count=300, repeat=1, train_count=200)
+        self.assertEqual(result['posts'], 300)
+        self.assertGreater(result['accuracy'], 0.5)
+
+
+class TestLeadModelStorage(unittest.TestCase):
+    """Test training from labeled matches and gating alerts on scores"""
+
+    def setUp(self):
+        """Create labeled matches on an in-memory database"""
+        self.engine = create_engine(TEST_DATABASE_URL)
+        Base.metadata.create_all(self.engine)
+        self.Session = sessionmaker(bind=self.engine)
+        self.session = self.Session()
+
+        source = Source(name="Test Group", url="https://www.facebook.com/groups/test", source_type="facebook")
+        keyword = Keyword(text="clean")
+        self.session.add_all([source, keyword, NotificationSetting(slack_enabled=True, slack_webhook="https://hooks.slack.com/x", email_enabled=False)])
+        self.session.flush()
+        for index, text in enumerate(GOOD_POSTS + BAD_POSTS + ["Anyone know a good cleaning service?"]):
+            self.session.add(Match(
+                source_id=source.id, keyword_id=keyword.id, post_id=str(index), post_url=f"https://example.com/{index}",
+                post_text=text, matched_text="clean", label=(1 if index < 4 else 0) if index < 8 else None,
+                created_at=datetime.utcnow()
+            ))
+        self.session.commit()
+
+    def tearDown(self):
+        """Clean up after tests"""
+        self.session.close()
+        Base.metadata.drop_all(self.engine)
+
+    def test_train_lead_model_scores_every_match(self):
+        """Test that training stores an active model and rescores all matches"""
+        train_lead_model(self.session)
+        self.session.commit()
+        second = train_lead_model(self.session)
+        self.session.commit()
+
+        # The replaced model is deleted rather than kept inactive
+        self.assertEqual([model.id for model in self.session.query(LeadModel)], [second.id])
+        self.assertEqual(second.trained_on, 8)
+        self.assertEqual(second.accuracy, 1.0)
+        self.assertEqual(self.session.query(Match).filter(Match.score.is_(None)).count(), 0)
+
+        scorer = load_scorer(self.session)
+        stored = [match.score for match in self.session.query(Match).order_by(Match.id)]
+        self.assertAlmostEqual(float(scorer.score([GOOD_POSTS[0]])[0]), stored[0], places=5)
+
+    def test_rescore_pages_through_matches(self):
+        """Test that rescoring reads a batch of matches at a time and still scores them all"""
+        scorer = LeadScorer.train(GOOD_POSTS + BAD_POSTS, [1] * 4 + [0] * 4)
+        with patch('app.scraper.scoring.SCORE_BATCH_SIZE', 2), \
+             patch.object(scorer, 'score', wraps=scorer.score) as score:
+            self.assertEqual(rescore_matches(self.session, scorer), 9)
+        self.assertEqual([len(call.args[0]) for call in score.call_args_list], [2, 2, 2, 2, 1])
+        self.assertEqual(self.session.query(Match).filter(Match.score.is_(None)).count(), 0)
+
+    def test_train_requires_both_labels(self):
+        """Test that training refuses to run without good and bad examples"""
+        self.session.query(Match).filter(Match.label == 0).update({'label': None})
+        with self.assertRaises(ValueError):
+            train_lead_model(self.session)
+        self.assertIsNone(load_scorer(self.session))
+
+    def test_alerts_skip_low_scores(self):
+        """Test that matches scored below ALERT_MIN_SCORE are not alerted"""
+        train_lead_model(self.session)
+        self.session.commit()
+
+        alerted = set()
+
+        def send(webhook_url, match, source, keyword):
+            alerted.add(match.post_text)
+            return True
+
+        with patch('app.alert.alert_system.create_engine'), patch('app.alert.alert_system.sessionmaker'), \
+             patch('app.alert.alert_system.ALERT_MIN_SCORE', 0.5), \
+             patch.object(AlertSystem, 'send_slack_notification', side_effect=send):
+            alert_system = AlertSystem()
+            alert_system.Session = self.Session
+            alert_system.process_new_matches()
+
+        self.assertTrue(set(GOOD_POSTS) <= alerted)
+        self.assertFalse(alerted & set(BAD_POSTS))
+        self.assertEqual(self.session.query(LeadModel).count(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()